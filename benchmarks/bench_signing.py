@@ -0,0 +1,114 @@
+"""
+Signing benchmarks.
+
+Compares signing URLs one by one (``sign_url`` in a loop) with the batch
+API (``sign_urls``) and the parallel batch API (``ska.parallel.sign_urls``)
+for 1, 2, 4, ... worker processes (up to the number of CPUs).
+
+Usage:
+
+.. code-block:: sh
+
+    python benchmarks/bench_signing.py --num-urls 100000
+"""
+
+import argparse
+import os
+import time
+from functools import partial
+
+from ska import parallel, sign_url, sign_urls
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+
+SECRET_KEY = "your-secret-key"
+
+
+def make_specs(num_urls):
+    """Make signing specs."""
+    return [
+        {
+            "auth_user": f"user{index}",
+            "url": f"http://e.com/media/{index}/",
+            "extra": {
+                "email": f"user{index}@mail.example.com",
+                "campaign": "spring",
+                "provider": "cdn.example.com",
+            },
+        }
+        for index in range(num_urls)
+    ]
+
+
+def bench_sign_url(specs):
+    """Sign URLs one by one."""
+    return [
+        sign_url(
+            auth_user=spec["auth_user"],
+            secret_key=SECRET_KEY,
+            url=spec["url"],
+            extra=spec["extra"],
+        )
+        for spec in specs
+    ]
+
+
+def bench_sign_urls(specs):
+    """Sign URLs in bulk."""
+    return list(sign_urls(specs, secret_key=SECRET_KEY))
+
+
+def bench_parallel_sign_urls(specs, max_workers, chunk_size):
+    """Sign URLs in bulk, using worker processes."""
+    return list(
+        parallel.sign_urls(
+            specs,
+            secret_key=SECRET_KEY,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+        )
+    )
+
+
+def run(name, func, specs):
+    """Run a single benchmark and print the throughput."""
+    start = time.perf_counter()
+    func(specs)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<20} {elapsed:8.3f}s {len(specs) / elapsed:12.0f} urls/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signing benchmarks.")
+    parser.add_argument("--num-urls", type=int, default=100_000)
+    parser.add_argument(
+        "--chunk-size", type=int, default=parallel.DEFAULT_CHUNK_SIZE
+    )
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    specs = make_specs(args.num_urls)
+    baseline = run("sign_url (loop)", bench_sign_url, specs)
+    batch = run("sign_urls", bench_sign_urls, specs)
+    print(f"speed-up: {baseline / batch:.2f}x")
+
+    max_workers = 1
+    while max_workers <= args.max_workers:
+        elapsed = run(
+            f"parallel ({max_workers} proc)",
+            partial(
+                bench_parallel_sign_urls,
+                max_workers=max_workers,
+                chunk_size=args.chunk_size,
+            ),
+            specs,
+        )
+        print(f"speed-up: {baseline / elapsed:.2f}x")
+        max_workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from .base import (
     AbstractSignature,
+    BatchValidationResult,
     SignatureValidationResult,
 )
 from .defaults import (
@@ -11,9 +12,11 @@ from .defaults import (
     SIGNATURE_LIFETIME,
     TIMESTAMP_FORMAT,
 )
+from .schemas import SigningSchema
 from .shortcuts import (
     extract_signed_request_data,
     sign_url,
+    sign_urls,
     signature_to_dict,
     validate_signed_request_data,
 )
@@ -26,7 +29,9 @@ from .signatures import (
     HMACSHA512Signature,
     Signature,
 )
+from .signers import Signer, get_signer
 from .utils import RequestHelper
+from .validators import Validator
 
 __title__ = "ska"
 __version__ = "1.11.2"
@@ -35,6 +40,7 @@ __copyright__ = "2013-2025 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
     "AbstractSignature",
+    "BatchValidationResult",
     "HMACMD5Signature",
     "HMACSHA1Signature",
     "HMACSHA224Signature",
@@ -44,8 +50,13 @@ __all__ = (
     "RequestHelper",
     "Signature",
     "SignatureValidationResult",
+    "Signer",
+    "SigningSchema",
+    "Validator",
     "extract_signed_request_data",
+    "get_signer",
     "sign_url",
+    "sign_urls",
     "signature_to_dict",
     "validate_signed_request_data",
     "DEFAULT_AUTH_USER_PARAM",
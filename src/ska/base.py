@@ -1,21 +1,51 @@
 import time
+from array import array
 from base64 import b64encode
-from datetime import datetime, timedelta
-from typing import Any, Callable, Dict, List, Optional, Union
+from datetime import datetime
+from hmac import compare_digest
+from math import isfinite
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Type,
+    Union,
+)
 
-from . import error_codes
-from .defaults import SIGNATURE_LIFETIME, TIMESTAMP_FORMAT
+from . import clocks, error_codes
+from .defaults import (
+    BASE_STREAMING_THRESHOLD,
+    SIGNATURE_LIFETIME,
+    TIMESTAMP_FORMAT,
+)
 from .error_codes import ErrorCode
-from .helpers import sorted_urlencode
+from .exceptions import ImproperlyConfigured, InvalidData
+from .helpers import (
+    iter_sorted_urlencode,
+    make_valid_until,
+    sorted_urlencode,
+)
+from .schemas import SigningSchema
+from .signers import Signer, get_signer
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
     "AbstractSignature",
+    "BatchValidationResult",
     "SignatureValidationResult",
 )
 
+# ``make_hash`` implementations of the built-in signature classes, made by
+# the keyed signer (see ``_uses_signer``). Collected on first use.
+_SIGNER_MAKE_HASH_FUNCS: frozenset = frozenset()
+
 # ****************************************************************************
 # ****************************************************************************
 # ******************************* Signature **********************************
@@ -80,6 +110,73 @@ class SignatureValidationResult:
         return map(str, self.errors)
 
 
+class BatchValidationResult:
+    """Compact validation result of many signed payloads.
+
+    Holds a list of booleans (one per payload) and an array of integer
+    error codes (0 if the payload is valid, the ``code`` of the
+    ``ska.error_codes.ErrorCode`` otherwise).
+
+    >>> res = request_helper.validate_many(datas, 'your-secret-key')
+    >>> res[0]
+    True
+    >>> res.error_codes[1]
+    2
+    >>> res.errors(1)
+    [Signature timestamp expired!]
+    """
+
+    __slots__ = ("results", "error_codes")
+
+    def __init__(
+        self,
+        results: Optional[List[bool]] = None,
+        error_codes: Optional[array] = None,
+    ) -> None:
+        """Constructor."""
+        self.results = results if results is not None else []
+        self.error_codes = (
+            error_codes if error_codes is not None else array("B")
+        )
+
+    def __str__(self) -> str:
+        return str(self.results)
+
+    __repr__ = __str__
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __iter__(self) -> Iterator[bool]:
+        return iter(self.results)
+
+    def __getitem__(self, index: int) -> bool:
+        return self.results[index]
+
+    def __bool__(self) -> bool:
+        return all(self.results)
+
+    def append(self, result: bool, error_code: int = 0) -> None:
+        """Append a single validation result.
+
+        :param result:
+        :param error_code: Integer code of the error. 0 if valid.
+        """
+        self.results.append(result)
+        self.error_codes.append(error_code)
+
+    def errors(self, index: int) -> List[ErrorCode]:
+        """Errors of the payload at the index given.
+
+        :param index:
+        :return:
+        """
+        code = self.error_codes[index]
+        if not code:
+            return []
+        return [error_codes.ERROR_CODES[code]]
+
+
 class AbstractSignature:
     """Abstract class for signature generation and validation.
 
@@ -90,6 +187,11 @@ class AbstractSignature:
     :param valid_until:
     """
 
+    # Hash constructor (for instance, ``hashlib.sha1``) used by the keyed
+    # signer. Signature classes which implement ``make_hash`` in a different
+    # way may leave it empty.
+    digestmod: Optional[Callable] = None
+
     __slots__ = (
         "signature",
         "auth_user",
@@ -131,9 +233,16 @@ class AbstractSignature:
         return_object: bool = False,
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        full_diagnostics: bool = False,
+        clock: Optional[Callable[[], float]] = None,
+        schema: Optional[SigningSchema] = None,
     ) -> Union[SignatureValidationResult, bool]:
         """Validates the signature.
 
+        Expired signatures (as well as signatures with malformed
+        ``valid_until``) are rejected before the signature is computed,
+        unless ``full_diagnostics`` is set to True.
+
         :param signature:
         :param auth_user:
         :param secret_key:
@@ -143,6 +252,12 @@ class AbstractSignature:
             ``SignatureValidationResult`` is returned.
         :param value_dumper:
         :param quoter:
+        :param full_diagnostics: If set to True, signature of expired
+            signatures is checked as well, so that all errors are reported
+            (instead of the first one).
+        :param clock: Callable returning the current Unix timestamp. If not
+            given, the default clock (see ``ska.clocks``) is used.
+        :param schema: Compiled signing schema (see ``ska.schemas``).
         :return:
 
         :example:
@@ -154,6 +269,24 @@ class AbstractSignature:
         >>> )
         False
         """
+        timestamp = cls.parse_valid_until(valid_until)
+
+        if timestamp is None:
+            # Malformed ``valid_until``. Nothing to compute.
+            if not return_object:
+                return False
+            return SignatureValidationResult(
+                False, [error_codes.INVALID_SIGNATURE]
+            )
+
+        is_expired = timestamp <= (clock() if clock else clocks.now())
+
+        if is_expired and not full_diagnostics:
+            if not return_object:
+                return False
+            return SignatureValidationResult(
+                False, [error_codes.SIGNATURE_TIMESTAMP_EXPIRED]
+            )
 
         if isinstance(signature, str):
             signature = signature.encode()
@@ -161,33 +294,56 @@ class AbstractSignature:
         if not extra:
             extra = {}
 
-        sig = cls.generate_signature(
-            auth_user=auth_user,
-            secret_key=secret_key,
-            valid_until=valid_until,
-            extra=extra,
-            value_dumper=value_dumper,
-            quoter=quoter,
+        is_valid = compare_digest(
+            b64encode(
+                cls.make_hash(
+                    auth_user,
+                    secret_key,
+                    valid_until,
+                    extra,
+                    value_dumper=value_dumper,
+                    quoter=quoter,
+                    **_schema_kwargs(schema),
+                )
+            ),
+            signature,
         )
 
         if not return_object:
-            return sig.signature == signature and not sig.is_expired()
+            return is_valid and not is_expired
 
-        else:
-            result = sig.signature == signature and not sig.is_expired()
-            errors = []
-            if sig.signature != signature:
-                errors.append(error_codes.INVALID_SIGNATURE)
-            if sig.is_expired():
-                errors.append(error_codes.SIGNATURE_TIMESTAMP_EXPIRED)
+        errors = []
+        if not is_valid:
+            errors.append(error_codes.INVALID_SIGNATURE)
+        if is_expired:
+            errors.append(error_codes.SIGNATURE_TIMESTAMP_EXPIRED)
+
+        return SignatureValidationResult(not errors, errors)
 
-            return SignatureValidationResult(result, errors)
+    @staticmethod
+    def parse_valid_until(valid_until: Union[str, float]) -> Optional[float]:
+        """Parse the ``valid_until`` value into a Unix timestamp (float).
 
-    def is_expired(self) -> bool:
+        Returns None if ``valid_until`` is not a valid (finite) number.
+
+        :param valid_until:
+        :return:
+        """
+        try:
+            timestamp = float(valid_until)
+        except (TypeError, ValueError):
+            return None
+        if not isfinite(timestamp):
+            return None
+        return timestamp
+
+    def is_expired(self, clock: Optional[Callable[[], float]] = None) -> bool:
         """Checks if current signature is expired.
 
         Returns True if signature is expired and False otherwise.
 
+        :param clock: Callable returning the current Unix timestamp. If not
+            given, the default clock (see ``ska.clocks``) is used.
         :return:
 
         :example:
@@ -196,14 +352,13 @@ class AbstractSignature:
         >>> sig.is_expired()
         False
         """
-        now = datetime.now()
-        valid_util = self.__class__.unix_timestamp_to_date(self.valid_until)
+        timestamp = self.parse_valid_until(self.valid_until)
+        if timestamp is None:
+            return True
 
-        # Expires > now is a valid condition here.
-        res = valid_util > now
-
-        # But we actually check agains is expired, so it's the opposite.
-        return not res
+        # Expires > now is a valid condition here. But we actually check
+        # against is expired, so it's the opposite.
+        return not timestamp > (clock() if clock else clocks.now())
 
     @classmethod
     def get_base(
@@ -213,6 +368,7 @@ class AbstractSignature:
         extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        schema: Optional[SigningSchema] = None,
     ) -> bytes:
         """Get base string.
 
@@ -224,7 +380,12 @@ class AbstractSignature:
         :param extra:
         :param value_dumper:
         :param quoter:
+        :param schema: Compiled signing schema (see ``ska.schemas``). If
+            given, ``value_dumper`` and ``quoter`` of the schema are used.
         """
+        if schema is not None:
+            return schema.get_base(auth_user, timestamp, extra)
+
         if not extra:
             extra = {}
 
@@ -241,6 +402,53 @@ class AbstractSignature:
 
         return ("_".join(_base)).encode()
 
+    @classmethod
+    def iter_base(
+        cls,
+        auth_user: str,
+        timestamp: Union[float, str],
+        extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+        value_dumper: Optional[Callable] = None,
+        quoter: Optional[Callable] = None,
+        schema: Optional[SigningSchema] = None,
+    ) -> Iterator[bytes]:
+        """Get base string in chunks.
+
+        Same as ``get_base``, but if ``extra`` holds large values (dicts,
+        lists or long strings), the base string is quoted and encoded
+        chunk by chunk (see ``ska.helpers.iter_sorted_urlencode``) instead
+        of being built as a whole.
+
+        :param auth_user:
+        :param timestamp:
+        :param extra:
+        :param value_dumper:
+        :param quoter:
+        :param schema: Compiled signing schema (see ``ska.schemas``).
+        """
+        if (
+            schema is not None
+            or not extra
+            # Do not bypass custom implementations of ``get_base``.
+            or cls.get_base.__func__ is not AbstractSignature.get_base.__func__
+            or not _has_large_values(extra)
+        ):
+            yield cls.get_base(
+                auth_user,
+                timestamp,
+                extra=extra,
+                value_dumper=value_dumper,
+                quoter=quoter,
+                **_schema_kwargs(schema),
+            )
+            return
+
+        yield f"{timestamp}_{auth_user}_".encode()
+        for chunk in iter_sorted_urlencode(
+            extra, value_dumper=value_dumper, quoter=quoter
+        ):
+            yield chunk.encode()
+
     @staticmethod
     def make_secret_key(secret_key: str) -> bytes:
         """The secret key how its' supposed to be used in generate signature.
@@ -250,6 +458,22 @@ class AbstractSignature:
         """
         return secret_key.encode()  # return b64encode(secret_key)
 
+    @classmethod
+    def get_signer(cls, secret_key: str) -> Signer:
+        """Get the keyed signer for the secret key given.
+
+        Signers are cached (see ``ska.signers.get_signer``), so HMAC keying
+        happens once per secret key and algorithm.
+
+        :param secret_key:
+        :return:
+        """
+        if cls.digestmod is None:
+            raise ImproperlyConfigured(
+                f"{cls.__name__} does not define a `digestmod`"
+            )
+        return get_signer(cls.make_secret_key(secret_key), cls.digestmod)
+
     @classmethod
     def make_hash(
         cls,
@@ -259,6 +483,7 @@ class AbstractSignature:
         extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        schema: Optional[SigningSchema] = None,
     ) -> bytes:
         """Make hash.
 
@@ -270,6 +495,7 @@ class AbstractSignature:
         :param extra: Additional variables to be added.
         :param value_dumper:
         :param quoter:
+        :param schema: Compiled signing schema (see ``ska.schemas``).
         :return:
         """
         raise NotImplementedError("You should implement this method!")
@@ -284,6 +510,8 @@ class AbstractSignature:
         extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        schema: Optional[SigningSchema] = None,
+        clock: Optional[Callable[[], float]] = None,
     ) -> "AbstractSignature":
         """Generates the signature.
 
@@ -297,7 +525,12 @@ class AbstractSignature:
         :param extra: Additional variables to be added.
         :param value_dumper:
         :param quoter:
+        :param schema: Compiled signing schema (see ``ska.schemas``).
+        :param clock: Callable returning the current Unix timestamp. If not
+            given, the default clock (see ``ska.clocks``) is used.
         :return:
+        :raise ska.exceptions.InvalidData: If ``valid_until`` is not a valid
+            Unix timestamp.
 
         :example:
         >>> sig = Signature.generate_signature('user', 'your-secret-key')
@@ -307,14 +540,9 @@ class AbstractSignature:
             extra = {}
 
         if not valid_until:
-            valid_until = time.mktime(
-                (datetime.now() + timedelta(seconds=lifetime)).timetuple()
-            )
-        else:
-            try:
-                cls.unix_timestamp_to_date(valid_until)
-            except Exception:
-                return None  # Something went wrong
+            valid_until = make_valid_until(lifetime, clock=clock)
+        elif cls.parse_valid_until(valid_until) is None:
+            raise InvalidData(f"Invalid `valid_until` value: {valid_until}")
 
         signature = b64encode(
             cls.make_hash(
@@ -324,6 +552,7 @@ class AbstractSignature:
                 extra,
                 value_dumper=value_dumper,
                 quoter=quoter,
+                **_schema_kwargs(schema),
             )
         )
 
@@ -334,6 +563,85 @@ class AbstractSignature:
             extra=extra,
         )
 
+    @classmethod
+    def generate_signatures(
+        cls,
+        specs: Iterable[Mapping[str, Any]],
+        secret_key: str,
+        valid_until: Optional[Union[float, str]] = None,
+        lifetime: int = SIGNATURE_LIFETIME,
+        value_dumper: Optional[Callable] = None,
+        quoter: Optional[Callable] = None,
+        clock: Optional[Callable[[], float]] = None,
+        schema: Optional[SigningSchema] = None,
+    ) -> Iterator["AbstractSignature"]:
+        """Generates signatures in bulk.
+
+        All signatures of the batch share the same ``valid_until`` and the
+        same keyed signer. Signatures are generated lazily (one per spec).
+
+        :param specs: Iterable of mappings, each holding the ``auth_user``
+            and (optionally) the ``extra`` keys.
+        :param secret_key:
+        :param valid_until: Unix timestamp, valid until. Shared by all
+            signatures generated.
+        :param lifetime: Lifetime of the signatures in seconds.
+        :param value_dumper:
+        :param quoter:
+        :param clock: Callable returning the current Unix timestamp. If not
+            given, the default clock (see ``ska.clocks``) is used.
+        :param schema: Compiled signing schema (see ``ska.schemas``).
+        :return:
+
+        :example:
+        >>> sigs = Signature.generate_signatures(
+        >>>     [{'auth_user': 'user1'}, {'auth_user': 'user2'}],
+        >>>     'your-secret-key',
+        >>> )
+        """
+        if not valid_until:
+            valid_until = make_valid_until(lifetime, clock=clock)
+        elif cls.parse_valid_until(valid_until) is None:
+            raise InvalidData(f"Invalid `valid_until` value: {valid_until}")
+
+        if _uses_signer(cls):
+            make_digest = cls.get_signer(secret_key).digest_chunks
+        else:
+            make_digest = None
+
+        for spec in specs:
+            auth_user = spec["auth_user"]
+            extra = spec.get("extra") or {}
+
+            if make_digest is not None:
+                raw_hmac = make_digest(
+                    cls.iter_base(
+                        auth_user,
+                        valid_until,
+                        extra=extra,
+                        value_dumper=value_dumper,
+                        quoter=quoter,
+                        schema=schema,
+                    )
+                )
+            else:
+                raw_hmac = cls.make_hash(
+                    auth_user,
+                    secret_key,
+                    valid_until,
+                    extra,
+                    value_dumper=value_dumper,
+                    quoter=quoter,
+                    **_schema_kwargs(schema),
+                )
+
+            yield cls(
+                signature=b64encode(raw_hmac),
+                auth_user=auth_user,
+                valid_until=valid_until,
+                extra=extra,
+            )
+
     @staticmethod
     def datetime_to_timestamp(dtv: datetime) -> Optional[str]:
         """Human readable datetime according to the format specified.
@@ -401,3 +709,53 @@ class AbstractSignature:
                 raise err
             else:
                 return None
+
+
+def _uses_signer(signature_cls: Type["AbstractSignature"]) -> bool:
+    """Check if digests of the signature class given can be made by its
+    keyed signer directly, bypassing ``make_hash``.
+
+    True for the built-in signature classes (see ``ska.signatures``) and
+    their subclasses not overriding ``make_hash``.
+    """
+    global _SIGNER_MAKE_HASH_FUNCS
+
+    if signature_cls.digestmod is None:
+        return False
+
+    if not _SIGNER_MAKE_HASH_FUNCS:
+        # Imported here, since the signatures import this module.
+        from . import signatures
+
+        _SIGNER_MAKE_HASH_FUNCS = frozenset(
+            getattr(signatures, name).make_hash.__func__
+            for name in signatures.__all__
+        )
+    return signature_cls.make_hash.__func__ in _SIGNER_MAKE_HASH_FUNCS
+
+
+def _schema_kwargs(schema: Optional[SigningSchema]) -> Dict[str, Any]:
+    """Keyword arguments passing the ``schema`` to ``make_hash`` and
+    ``get_base``.
+
+    Empty if no schema is given, so that custom implementations of
+    ``make_hash`` and ``get_base`` not accepting the ``schema`` keep working.
+    """
+    if schema is None:
+        return {}
+    return {"schema": schema}
+
+
+def _has_large_values(
+    extra: Dict[str, Union[bytes, str, float, int]]
+) -> bool:
+    """Check if ``extra`` holds values worth hashing incrementally."""
+    for value in extra.values():
+        if isinstance(value, (dict, list)):
+            return True
+        if (
+            isinstance(value, (str, bytes))
+            and len(value) > BASE_STREAMING_THRESHOLD
+        ):
+            return True
+    return False
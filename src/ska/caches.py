@@ -0,0 +1,351 @@
+"""
+Caches of validation results.
+
+- ``ValidationCache``: Bounded (LRU) cache of successful validations. Each
+  entry expires at its own ``valid_until``, so a cached validation is
+  never served for an expired signature. A repeated validation of the same
+  signed data costs one key digest and one dict lookup instead of the full
+  canonicalization and HMAC.
+- ``NegativeCache``: Time-decaying cache of recently failed validations
+  (fingerprints of forged signatures). Repeated replays of the same forged
+  signature are rejected with one key digest and one dict lookup.
+
+Both caches are keyed on exact (128 bit) digests of the signed data and of
+the secret key (see ``make_key``), so a cached result is never served for
+different data or a different key.
+
+:example:
+
+>>> from ska import RequestHelper
+>>> from ska.caches import ValidationCache
+>>> validation_cache = ValidationCache(maxsize=10_000)
+>>> request_helper = RequestHelper()
+>>> validation_result = request_helper.validate_request_data(
+>>>     data=request.GET,
+>>>     secret_key='your-secret-key',
+>>>     cache=validation_cache,
+>>> )
+>>> validation_cache.info()
+CacheInfo(hits=0, misses=1, maxsize=10000, currsize=1)
+"""
+
+import heapq
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from . import clocks
+from .defaults import (
+    NEGATIVE_CACHE_SIZE,
+    NEGATIVE_CACHE_TTL,
+    SIGNER_CACHE_SIZE,
+    VALIDATION_CACHE_SIZE,
+)
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "CacheInfo",
+    "NegativeCache",
+    "ValidationCache",
+    "make_key",
+)
+
+
+class CacheInfo(NamedTuple):
+    """Cache statistics."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+@lru_cache(maxsize=SIGNER_CACHE_SIZE)
+def _get_key_id(secret_key: Union[str, bytes]) -> bytes:
+    """Identifier of the secret key (never the key itself)."""
+    if isinstance(secret_key, str):
+        secret_key = secret_key.encode()
+    return blake2b(secret_key, digest_size=16, person=b"ska-key-id").digest()
+
+
+def make_key(
+    signature: Union[str, bytes],
+    auth_user: str,
+    valid_until: Union[str, float],
+    extra: Optional[Dict[str, Any]],
+    secret_key: Union[str, bytes],
+    namespace: Iterable[Any] = (),
+) -> bytes:
+    """Make cache key of the signed data given.
+
+    :param signature:
+    :param auth_user:
+    :param valid_until:
+    :param extra: Signed extra data.
+    :param secret_key: Only an identifier of the key (a digest) is
+        part of the cache key.
+    :param namespace: Anything else the validation result depends on
+        (signature class, value dumper, quoter, etc).
+    :return:
+    """
+    material = repr(
+        (
+            tuple(namespace),
+            signature,
+            auth_user,
+            valid_until,
+            sorted(extra.items()) if extra else (),
+        )
+    ).encode()
+    return blake2b(
+        material, digest_size=16, key=_get_key_id(secret_key)
+    ).digest()
+
+
+class ValidationCache:
+    """Cache of successful validations.
+
+    Thread safe. Entries are keyed by a digest of the signed data (see
+    ``make_key``) and expire at their own ``valid_until``. The least
+    recently used entries are evicted, when the cache is full.
+
+    :param maxsize: Max number of entries.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = VALIDATION_CACHE_SIZE,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # Key -> valid until (Unix timestamp)
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        # (valid until, key) heap, to expire entries in time.
+        self._expiry: List[Tuple[float, bytes]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else clocks.now()
+
+    make_key = staticmethod(make_key)
+
+    def _expire(self, now: float) -> None:
+        """Drop expired entries. Shall be called with the lock held."""
+        expiry = self._expiry
+        entries = self._entries
+        while expiry and expiry[0][0] <= now:
+            valid_until, key = heapq.heappop(expiry)
+            if entries.get(key) == valid_until:
+                del entries[key]
+
+    def get(self, key: bytes) -> bool:
+        """Check if the validation (of the signed data) is cached.
+
+        :param key: Cache key (see ``make_key``).
+        :return: True if a successful (and not yet expired) validation is
+            cached.
+        """
+        now = self._now()
+        with self._lock:
+            valid_until = self._entries.get(key)
+            if valid_until is not None and valid_until > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+
+            self._expire(now)
+            self.misses += 1
+            return False
+
+    def set(self, key: bytes, valid_until: float) -> None:
+        """Cache a successful validation.
+
+        :param key: Cache key (see ``make_key``).
+        :param valid_until: Unix timestamp, at which the entry expires.
+        """
+        if self.maxsize <= 0:
+            return
+
+        now = self._now()
+        with self._lock:
+            self._expire(now)
+            if valid_until <= now:
+                return
+
+            entries = self._entries
+            entries[key] = valid_until
+            entries.move_to_end(key)
+            heapq.heappush(self._expiry, (valid_until, key))
+
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+            # Evicted entries stay in the heap until they expire. Do not
+            # let them pile up.
+            if len(self._expiry) > 2 * self.maxsize:
+                self._expiry = [
+                    (entry_valid_until, entry_key)
+                    for entry_key, entry_valid_until in entries.items()
+                ]
+                heapq.heapify(self._expiry)
+
+    def clear(self) -> None:
+        """Clear the cache (and the statistics)."""
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Cache statistics.
+
+        :return:
+        """
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, len(self._entries)
+            )
+
+
+class NegativeCache:
+    """Cache of recently failed validations.
+
+    Thread safe. Only signatures found invalid (not expired ones, which are
+    rejected cheaply anyway) are worth caching. Each entry expires after
+    ``ttl`` seconds or when the signature expires, whichever comes first.
+
+    Entries are kept in two generations of at most ``maxsize // 2`` entries
+    each. When the current generation is full (or older than ``ttl``), it
+    becomes the previous one and the previous one is dropped. Memory stays
+    bounded and adding an entry is O(1), no matter how many distinct forged
+    signatures come in.
+
+    :param maxsize: Max number of entries.
+    :param ttl: Max number of seconds an entry is kept.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = NEGATIVE_CACHE_SIZE,
+        ttl: float = NEGATIVE_CACHE_TTL,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # Key -> expires at (Unix timestamp)
+        self._current: Dict[bytes, float] = {}
+        self._previous: Dict[bytes, float] = {}
+        self._rotated_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else clocks.now()
+
+    make_key = staticmethod(make_key)
+
+    def _rotate(self, now: float, force: bool = False) -> None:
+        """Rotate generations if due. Shall be called with the lock held."""
+        if self._rotated_at is None:
+            self._rotated_at = now
+            return
+
+        age = now - self._rotated_at
+        if age >= 2 * self.ttl:
+            # Both generations are stale.
+            self._current = {}
+            self._previous = {}
+            self._rotated_at = now
+        elif force or age >= self.ttl:
+            self._previous = self._current
+            self._current = {}
+            self._rotated_at = now
+
+    def get(self, key: bytes) -> bool:
+        """Check if the validation (of the signed data) recently failed.
+
+        :param key: Cache key (see ``make_key``).
+        :return: True if a failed (and not yet expired) validation is
+            cached.
+        """
+        now = self._now()
+        with self._lock:
+            self._rotate(now)
+            expires_at = self._current.get(key)
+            if expires_at is None:
+                expires_at = self._previous.get(key)
+            if expires_at is not None and expires_at > now:
+                self.hits += 1
+                return True
+
+            self.misses += 1
+            return False
+
+    def set(self, key: bytes, valid_until: float) -> None:
+        """Cache a failed validation.
+
+        :param key: Cache key (see ``make_key``).
+        :param valid_until: Unix timestamp, at which the signature expires.
+        """
+        if self.maxsize <= 0:
+            return
+
+        now = self._now()
+        expires_at = min(now + self.ttl, valid_until)
+        if expires_at <= now:
+            return
+
+        with self._lock:
+            self._rotate(now)
+            if len(self._current) >= max(self.maxsize // 2, 1):
+                self._rotate(now, force=True)
+            self._current[key] = expires_at
+
+    def clear(self) -> None:
+        """Clear the cache (and the statistics)."""
+        with self._lock:
+            self._current = {}
+            self._previous = {}
+            self._rotated_at = None
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Cache statistics.
+
+        :return:
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
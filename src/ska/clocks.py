@@ -0,0 +1,132 @@
+"""
+Clocks.
+
+All time related computations of ``ska`` (making ``valid_until`` values,
+checking whether signatures are expired) are done on plain Unix timestamps
+(floats), obtained from a clock. A clock is any callable, which returns the
+current Unix timestamp.
+
+- ``system_clock``: The default. Current time (``time.time``).
+- ``CoarseClock``: Cached current time, refreshed in the background every
+  ``resolution`` seconds. Reading it costs an attribute lookup. Meant for
+  hot loops, where sub-second precision is not needed. The refresh thread
+  is restarted in forked processes (pre-fork servers), so that the clocks
+  inherited keep moving.
+- ``FrozenClock``: Always returns the same time. Useful in tests and in
+  batches, which shall share the same notion of "now".
+
+The default clock can be replaced with ``set_clock``.
+
+:example:
+
+>>> from ska.clocks import CoarseClock, set_clock
+>>> set_clock(CoarseClock(resolution=0.5))
+"""
+
+import os
+import threading
+import time
+import weakref
+from functools import partial
+from typing import Callable, Optional
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "CoarseClock",
+    "FrozenClock",
+    "get_clock",
+    "now",
+    "set_clock",
+    "system_clock",
+)
+
+system_clock = time.time
+
+
+class CoarseClock:
+    """Cached current time, refreshed in the background.
+
+    :param resolution: Refresh interval in seconds.
+    """
+
+    __slots__ = ("resolution", "_now", "_stopped", "_thread", "__weakref__")
+
+    def __init__(self, resolution: float = 1.0) -> None:
+        """Constructor."""
+        self.resolution = resolution
+        self._start()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(
+                after_in_child=partial(_restart_in_child, weakref.ref(self))
+            )
+
+    def _start(self) -> None:
+        self._now = time.time()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="ska-coarse-clock", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self) -> float:
+        return self._now
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.resolution):
+            self._now = time.time()
+
+    def stop(self) -> None:
+        """Stop refreshing the time."""
+        self._stopped.set()
+
+
+def _restart_in_child(clock_ref: "weakref.ref[CoarseClock]") -> None:
+    """Restart the refresh thread of the clock in a forked process.
+
+    Threads are not copied by ``fork``: without it, the clock would stop
+    at the time of the fork (and expired signatures be taken as valid).
+    """
+    clock = clock_ref()
+    if clock is not None and not clock._stopped.is_set():
+        clock._start()
+
+
+class FrozenClock:
+    """Clock that always returns the same time.
+
+    :param timestamp: Unix timestamp. Defaults to the current time.
+    """
+
+    __slots__ = ("timestamp",)
+
+    def __init__(self, timestamp: Optional[float] = None) -> None:
+        """Constructor."""
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def __call__(self) -> float:
+        return self.timestamp
+
+
+_clock: Callable[[], float] = system_clock
+
+
+def get_clock() -> Callable[[], float]:
+    """Get the default clock."""
+    return _clock
+
+
+def set_clock(clock: Optional[Callable[[], float]] = None) -> None:
+    """Set the default clock.
+
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the ``system_clock`` is restored.
+    """
+    global _clock
+    _clock = clock if clock is not None else system_clock
+
+
+def now() -> float:
+    """Current Unix timestamp, according to the default clock."""
+    return _clock()
@@ -12,3 +12,9 @@ class Config(AppConfig):
     name = "ska.contrib.django.ska"
     # label = 'ska_contrib_django_ska'
     label = "ska"
+
+    def ready(self):
+        """Resolve the user callbacks (fail fast on invalid ones)."""
+        from .callbacks import callback_registry
+
+        callback_registry.build()
@@ -1,33 +1,33 @@
+import inspect
 import logging
-from typing import Dict, Optional, Union
+from typing import Any, Callable, Dict, Optional, Union
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
-from django.db import IntegrityError
 from django.http import HttpRequest
 from rest_framework.request import Request
 
-from ..... import Signature, extract_signed_request_data
+from .....caches import NegativeCache
 from .....defaults import (
     DEFAULT_AUTH_USER_PARAM,
-    DEFAULT_EXTRA_PARAM,
     DEFAULT_SIGNATURE_PARAM,
     DEFAULT_VALID_UNTIL_PARAM,
 )
 from .....exceptions import ImproperlyConfigured, InvalidData
-from .....helpers import get_callback_func
-from ..models import Signature as SignatureModel
-from ..settings import (
-    DB_PERFORM_SIGNATURE_CHECK,
-    DB_STORE_SIGNATURES,
-    SECRET_KEY,
-    USER_CREATE_CALLBACK,
-    USER_GET_CALLBACK,
-    USER_INFO_CALLBACK,
-    USER_VALIDATE_CALLBACK,
+from .....replay import ReplayStore
+from .....validators import Validator
+from ..caches import negative_cache
+from ..callbacks import (
+    CallbackDispatcher,
+    callback_dispatcher,
+    callback_registry,
 )
-from ..utils import get_provider_data
+from ..context import get_validation_context
+from ..replay import replay_store
+from ..settings import SECRET_KEY
+from ..users import UserResolver, user_resolver
 
 LOGGER = logging.getLogger(__file__)
 
@@ -37,8 +37,41 @@ __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = ("BaseSkaAuthenticationBackend",)
 
 
+async def _acall(func: Callable, *args, **kwargs) -> Any:
+    """Await the async callback given, run the sync one in a thread."""
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await sync_to_async(func)(*args, **kwargs)
+
+
 class BaseSkaAuthenticationBackend(object):
-    """Base authentication backend."""
+    """Base authentication backend.
+
+    :attribute ska.caches.NegativeCache negative_cache: Cache of failed
+        validations. Replays of signatures recently found invalid are
+        rejected without being recomputed. Defaults to the shared cache
+        (enabled by ``SKA_NEGATIVE_CACHE_SIZE``).
+    :attribute ska.validators.Validator validator: Validator (param names,
+        signature class) the validators of each secret key are derived
+        from (see ``get_validator``).
+    :attribute ska.replay.ReplayStore replay_store: Replay store. Each
+        signature is accepted only once. Defaults to the store configured
+        in settings (see ``ska.contrib.django.ska.replay``).
+    :attribute ska.contrib.django.ska.users.UserResolver user_resolver:
+        Gets (or creates) the users. Defaults to the resolver configured in
+        settings (see ``ska.contrib.django.ska.users``).
+    :attribute ska.contrib.django.ska.callbacks.CallbackDispatcher
+        callback_dispatcher: If set, the user get, create and info
+        callbacks are run by the dispatcher (in a thread pool) instead of
+        inline. Defaults to the shared dispatcher (enabled by
+        ``SKA_DEFERRED_CALLBACKS``).
+    """
+
+    negative_cache: Optional[NegativeCache] = negative_cache
+    validator: Validator = Validator()
+    replay_store: Optional[ReplayStore] = replay_store
+    user_resolver: UserResolver = user_resolver
+    callback_dispatcher: Optional[CallbackDispatcher] = callback_dispatcher
 
     def get_settings(
         self,
@@ -68,10 +101,93 @@ class BaseSkaAuthenticationBackend(object):
             "You should implement this method in your authentication backend"
         )
 
+    async def aget_settings(
+        self,
+        request_data: Dict[str, Union[bytes, str, float, int]] = None,
+        request: HttpRequest = None,
+        **kwargs,
+    ):
+        """Get settings (async).
+
+        Shall not block the event loop. Defaults to ``get_settings``.
+
+        :return:
+        """
+        return self.get_settings(request_data, request, **kwargs)
+
+    async def aget_secret_key(
+        self,
+        request_data: Dict[str, Union[bytes, str, float, int]] = None,
+        request: HttpRequest = None,
+        **kwargs,
+    ) -> str:
+        """Get secret key (async).
+
+        Shall not block the event loop. Defaults to ``get_secret_key``.
+
+        :return:
+        """
+        return self.get_secret_key(request_data, request, **kwargs)
+
     def get_request_data(
         self, request: Union[HttpRequest, Request], **kwargs
     ) -> Dict[str, str]:
-        return request.GET.dict()
+        return get_validation_context(request).data
+
+    def get_validator(self, secret_key: str) -> Validator:
+        """Get validator for the secret key given.
+
+        Derived from ``validator`` (once per secret key and negative cache).
+
+        :param secret_key:
+        :return:
+        """
+        return self.validator.derive(
+            secret_key=secret_key, negative_cache=self.negative_cache
+        )
+
+    def get_signed_request_data(
+        self,
+        request_data: Dict[str, str],
+        secret_key: str,
+        request: Union[HttpRequest, Request, None] = None,
+    ) -> Optional[Dict[str, str]]:
+        """Validate the request data and extract the signed data.
+
+        If the request is given, the validation result is kept in (or taken
+        from) its validation context (see
+        ``ska.contrib.django.ska.context``).
+
+        :return: Signed request data or None on failure.
+        """
+        validator = self.get_validator(secret_key)
+        if request is not None:
+            return get_validation_context(request).extract_signed_data(
+                validator, data=request_data
+            )
+
+        try:
+            # If authentication/data validation failed.
+            return validator.extract(request_data)
+        except (ImproperlyConfigured, InvalidData) as err:
+            LOGGER.debug(str(err))
+            return None
+
+    @staticmethod
+    def get_user_create_kwargs(
+        auth_user: str, signed_request_data: Dict[str, str]
+    ) -> Dict[str, str]:
+        """Arguments of the user to create.
+
+        All specific data is taken from signed request data.
+        """
+        return {
+            "username": auth_user,
+            "email": signed_request_data.get("email", ""),
+            "password": make_password(password=None),
+            "first_name": signed_request_data.get("first_name", ""),
+            "last_name": signed_request_data.get("last_name", ""),
+        }
 
     def authenticate(
         self, request: Union[HttpRequest, Request], **kwargs
@@ -89,7 +205,9 @@ class BaseSkaAuthenticationBackend(object):
 
         provider_settings = self.get_settings(request_data, request, **kwargs)
 
-        provider_data = get_provider_data(request_data, provider_settings)
+        provider_data = get_validation_context(request).get_provider_data(
+            provider_settings, data=request_data
+        )
 
         if provider_data:
             secret_key = provider_data["SECRET_KEY"]
@@ -98,31 +216,14 @@ class BaseSkaAuthenticationBackend(object):
             if not secret_key:
                 secret_key = SECRET_KEY
 
-        try:
-            # If authentication/data validation failed.
-            signed_request_data = extract_signed_request_data(
-                data=request_data,
-                secret_key=secret_key,
-                signature_param=DEFAULT_SIGNATURE_PARAM,
-                auth_user_param=DEFAULT_AUTH_USER_PARAM,
-                valid_until_param=DEFAULT_VALID_UNTIL_PARAM,
-                extra_param=DEFAULT_EXTRA_PARAM,
-                validate=True,
-                fail_silently=False,
-            )
-        except (ImproperlyConfigured, InvalidData) as err:
-            LOGGER.debug(str(err))
+        signed_request_data = self.get_signed_request_data(
+            request_data, secret_key, request=request
+        )
+        if signed_request_data is None:
             return None
 
         # Get the username from request.
         auth_user = request_data.get(DEFAULT_AUTH_USER_PARAM)
-        signature = request_data.get(DEFAULT_SIGNATURE_PARAM)
-        valid_until = request_data.get(DEFAULT_VALID_UNTIL_PARAM)
-
-        # All other specific data is taken from signed request data
-        email = signed_request_data.get("email", "")
-        first_name = signed_request_data.get("first_name", "")
-        last_name = signed_request_data.get("last_name", "")
 
         # Validate request callback. Created to allow adding custom logic to
         # the incoming authentication requests. The main purpose is to provide
@@ -134,92 +235,156 @@ class BaseSkaAuthenticationBackend(object):
         # invalid. In that case, the authentication flow will halt. All
         # other exceptions would simply be ignored (but logged) and if no
         # exception was raised, the normal flow would be continued.
-        user_validate_callback = provider_data.get(
-            "USER_VALIDATE_CALLBACK", USER_VALIDATE_CALLBACK
+        callback_func = callback_registry.get_callback(
+            "USER_VALIDATE_CALLBACK", provider_data
         )
-        if user_validate_callback is not None:
-            callback_func = get_callback_func(user_validate_callback)
-            if callback_func:
+        if callback_func:
+            try:
+                user_validate_callback_resp = callback_func(  # noqa
+                    request=request,
+                    signed_request_data=signed_request_data,
+                )
+            except PermissionDenied as err:
+                LOGGER.debug(str(err))
+                raise err
+            except Exception as err:
+                LOGGER.debug(str(err))
+
+        # Storing the signatures (to database) if set to be so.
+        if self.replay_store is not None and not self.replay_store.add(
+            request_data.get(DEFAULT_SIGNATURE_PARAM),
+            auth_user,
+            request_data.get(DEFAULT_VALID_UNTIL_PARAM),
+        ):
+            # Token has already been used. Do not authenticate.
+            return None
+
+        # Try to get user. If it doesn't exist - create.
+        user, created = self.user_resolver.get_or_create(
+            auth_user,
+            self.get_user_create_kwargs(auth_user, signed_request_data),
+        )
+        callback_name = (
+            "USER_CREATE_CALLBACK" if created else "USER_GET_CALLBACK"
+        )
+
+        # User-get (or user-create) callback, followed by user-info callback
+        for name in (callback_name, "USER_INFO_CALLBACK"):
+            callback_func = callback_registry.get_callback(name, provider_data)
+            if callback_func and self.callback_dispatcher is not None:
+                self.callback_dispatcher.dispatch(
+                    callback_func,
+                    user,
+                    request=request,
+                    signed_request_data=signed_request_data,
+                )
+            elif callback_func:
                 try:
-                    user_validate_callback_resp = callback_func(  # noqa
+                    callback_func(
+                        user,
                         request=request,
                         signed_request_data=signed_request_data,
                     )
-                except PermissionDenied as err:
-                    LOGGER.debug(str(err))
-                    raise err
                 except Exception as err:
                     LOGGER.debug(str(err))
 
-        # Storing the signatures to database if set to be so.
-        if DB_STORE_SIGNATURES:
-            token = SignatureModel(
-                auth_user=auth_user,
-                signature=signature,
-                valid_until=Signature.unix_timestamp_to_date(valid_until),
-            )
-            try:
-                token.save()
-            except IntegrityError:
-                if DB_PERFORM_SIGNATURE_CHECK:
-                    # Token has already been used. Do not authenticate.
-                    return None
+        return user
 
-        # Try to get user. If it doesn't exist - create.
-        try:
-            user = User._default_manager.get(username=auth_user)
+    async def aauthenticate(
+        self, request: Union[HttpRequest, Request], **kwargs
+    ) -> Optional[User]:
+        """Authenticate (async).
 
-            # User-get callback
-            user_get_callback = provider_data.get(
-                "USER_GET_CALLBACK", USER_GET_CALLBACK
-            )
-            if user_get_callback is not None:
-                callback_func = get_callback_func(user_get_callback)
-                if callback_func:
-                    try:
-                        user_get_callback_resp = callback_func(  # noqa
-                            user,
-                            request=request,
-                            signed_request_data=signed_request_data,
-                        )
-                    except Exception as err:
-                        LOGGER.debug(str(err))
-
-        except User.DoesNotExist:
-            user = User._default_manager.create_user(
-                username=auth_user,
-                email=email,
-                password=make_password(password=None),
-                first_name=first_name,
-                last_name=last_name,
-            )
-            user.save()
+        Same as ``authenticate``, but uses the async ORM. Validation does no
+        I/O, so it runs in the event loop. Sync callbacks are run in a
+        thread (``sync_to_async``), async ones are awaited.
+
+        :param django.http.HttpRequest request:
+        :return django.contrib.auth.models.User: Instance or None on failure.
+        """
+        if request is None:
+            LOGGER.debug("Request is None, skipping")
+            return None
+
+        request_data = self.get_request_data(request, **kwargs)
+
+        provider_settings = await self.aget_settings(
+            request_data, request, **kwargs
+        )
+
+        provider_data = get_validation_context(request).get_provider_data(
+            provider_settings, data=request_data
+        )
 
-            # User-create callback
-            user_create_callback = provider_data.get(
-                "USER_CREATE_CALLBACK", USER_CREATE_CALLBACK
+        if provider_data:
+            secret_key = provider_data["SECRET_KEY"]
+        else:
+            secret_key = await self.aget_secret_key(
+                request_data, request, **kwargs
             )
-            if user_create_callback is not None:
-                callback_func = get_callback_func(user_create_callback)
-                if callback_func:
-                    try:
-                        user_create_callback_resp = callback_func(  # noqa
-                            user,
-                            request=request,
-                            signed_request_data=signed_request_data,
-                        )
-                    except Exception as err:
-                        LOGGER.debug(str(err))
-
-        # User-info callback
-        user_info_callback = provider_data.get(
-            "USER_INFO_CALLBACK", USER_INFO_CALLBACK
+            if not secret_key:
+                secret_key = SECRET_KEY
+
+        signed_request_data = self.get_signed_request_data(
+            request_data, secret_key, request=request
+        )
+        if signed_request_data is None:
+            return None
+
+        # Get the username from request.
+        auth_user = request_data.get(DEFAULT_AUTH_USER_PARAM)
+
+        # Validate request callback (see ``authenticate``).
+        callback_func = callback_registry.get_callback(
+            "USER_VALIDATE_CALLBACK", provider_data
+        )
+        if callback_func:
+            try:
+                await _acall(
+                    callback_func,
+                    request=request,
+                    signed_request_data=signed_request_data,
+                )
+            except PermissionDenied as err:
+                LOGGER.debug(str(err))
+                raise err
+            except Exception as err:
+                LOGGER.debug(str(err))
+
+        # Storing the signatures (to database) if set to be so.
+        if self.replay_store is not None and not await self.replay_store.aadd(
+            request_data.get(DEFAULT_SIGNATURE_PARAM),
+            auth_user,
+            request_data.get(DEFAULT_VALID_UNTIL_PARAM),
+        ):
+            # Token has already been used. Do not authenticate.
+            return None
+
+        # Try to get user. If it doesn't exist - create.
+        user, created = await self.user_resolver.aget_or_create(
+            auth_user,
+            self.get_user_create_kwargs(auth_user, signed_request_data),
         )
-        if user_info_callback is not None:
-            callback_func = get_callback_func(user_info_callback)
-            if callback_func:
+        callback_name = (
+            "USER_CREATE_CALLBACK" if created else "USER_GET_CALLBACK"
+        )
+
+        # User-get (or user-create) callback, followed by user-info callback
+        for name in (callback_name, "USER_INFO_CALLBACK"):
+            callback_func = callback_registry.get_callback(name, provider_data)
+            if callback_func and self.callback_dispatcher is not None:
+                # No transaction to wait for (each async ORM call runs in
+                # autocommit mode).
+                self.callback_dispatcher.submit(
+                    callback_func,
+                    user,
+                    request=request,
+                    signed_request_data=signed_request_data,
+                )
+            elif callback_func:
                 try:
-                    callback_func(
+                    await _acall(
+                        callback_func,
                         user,
                         request=request,
                         signed_request_data=signed_request_data,
@@ -235,7 +400,12 @@ class BaseSkaAuthenticationBackend(object):
         :param int user_id:
         :return django.contrib.auth.models.User:
         """
-        try:
-            return User._default_manager.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return self.user_resolver.get(user_id)
+
+    async def aget_user(self, user_id: int) -> Optional[User]:
+        """Get user (async).
+
+        :param int user_id:
+        :return django.contrib.auth.models.User:
+        """
+        return await self.user_resolver.aget(user_id)
@@ -1,11 +1,9 @@
-import json
 from typing import Dict, Optional, Union
 
-from constance import config
-from django.conf import settings
 from django.http import HttpRequest
 from rest_framework.request import Request
 
+from ..integration.constance_integration.caches import constance_settings
 from .base import BaseSkaAuthenticationBackend
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -25,18 +23,12 @@ class SkaAuthenticationConstanceBackend(BaseSkaAuthenticationBackend):
     ) -> Dict[str, Dict[str, str]]:
         """Get settings.
 
+        Read through the in-process cache of constance settings (see
+        ``ska.contrib.django.ska.integration.constance_integration.caches``).
+
         :return:
         """
-        parse_from_json = getattr(
-            settings, "SKA_CONSTANCE_SETTINGS_PARSE_FROM_JSON", False
-        )
-        if parse_from_json:
-            try:
-                _settings = json.loads(config.SKA_PROVIDERS)
-                return _settings
-            except ValueError:
-                pass
-        return config.SKA_PROVIDERS
+        return constance_settings.get_providers()
 
     def get_secret_key(
         self,
@@ -48,4 +40,28 @@ class SkaAuthenticationConstanceBackend(BaseSkaAuthenticationBackend):
 
         :return:
         """
-        return config.SKA_SECRET_KEY
+        return constance_settings.get_secret_key()
+
+    async def aget_settings(
+        self,
+        request_data: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+        request: Optional[Union[Request, HttpRequest]] = None,
+        **kwargs,
+    ) -> Dict[str, Dict[str, str]]:
+        """Get settings (async).
+
+        :return:
+        """
+        return await constance_settings.aget_providers()
+
+    async def aget_secret_key(
+        self,
+        request_data: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+        request: Optional[Union[Request, HttpRequest]] = None,
+        **kwargs,
+    ) -> str:
+        """Get secret key (async).
+
+        :return:
+        """
+        return await constance_settings.aget_secret_key()
@@ -0,0 +1,40 @@
+"""
+Shared caches.
+
+- ``validation_cache``: Cache of successful validations used by the
+  ``validate_signed_request`` and ``m_validate_signed_request`` decorators.
+  None, unless ``SKA_VALIDATION_CACHE_SIZE`` is set.
+- ``negative_cache``: Cache of failed validations used by the
+  ``validate_signed_request`` and ``m_validate_signed_request`` decorators
+  and the authentication backends. None, unless ``SKA_NEGATIVE_CACHE_SIZE``
+  is set.
+"""
+
+from typing import Optional
+
+from ....caches import NegativeCache, ValidationCache
+from .settings import (
+    NEGATIVE_CACHE_SIZE,
+    NEGATIVE_CACHE_TTL,
+    VALIDATION_CACHE_SIZE,
+)
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "negative_cache",
+    "validation_cache",
+)
+
+validation_cache: Optional[ValidationCache] = (
+    ValidationCache(maxsize=VALIDATION_CACHE_SIZE)
+    if VALIDATION_CACHE_SIZE
+    else None
+)
+
+negative_cache: Optional[NegativeCache] = (
+    NegativeCache(maxsize=NEGATIVE_CACHE_SIZE, ttl=NEGATIVE_CACHE_TTL)
+    if NEGATIVE_CACHE_SIZE
+    else None
+)
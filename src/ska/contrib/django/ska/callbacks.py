@@ -0,0 +1,366 @@
+"""
+Registry of the user callbacks.
+
+Callbacks (``USER_VALIDATE_CALLBACK``, ``USER_GET_CALLBACK``,
+``USER_CREATE_CALLBACK``, ``USER_INFO_CALLBACK``) are given as dotted paths,
+globally and per provider. The registry resolves them once (in
+``AppConfig.ready``), so that the authentication backends look callbacks up
+with a dict lookup, instead of importing them on each request. Invalid
+paths of callbacks defined in the ``settings`` module are reported at
+startup.
+
+Callbacks of providers defined elsewhere (for instance, in
+``django-constance``) are resolved on first use and added to the registry.
+
+The user get, create and info callbacks (which, for instance, send emails)
+can be run in a thread pool by a ``CallbackDispatcher`` instead of inline,
+so that they add no latency to the logins. The user validate callback
+(which may deny the login) is always run inline.
+
+- ``callback_registry``: Shared registry.
+- ``callback_dispatcher``: Shared dispatcher. None, unless
+  ``SKA_DEFERRED_CALLBACKS`` is set.
+"""
+
+import asyncio
+import atexit
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from django.db import close_old_connections, transaction
+
+from ....exceptions import ImproperlyConfigured
+from ....helpers import get_callback_func
+from . import settings as ska_settings
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "CALLBACK_NAMES",
+    "CallbackDispatcher",
+    "CallbackRegistry",
+    "DispatcherInfo",
+    "callback_dispatcher",
+    "callback_registry",
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# Names of the callback settings (global and per provider).
+CALLBACK_NAMES = (
+    "USER_VALIDATE_CALLBACK",
+    "USER_GET_CALLBACK",
+    "USER_CREATE_CALLBACK",
+    "USER_INFO_CALLBACK",
+)
+
+
+def _resolve(path: str) -> Callable:
+    """Resolve the callback path given. Raise if it's not valid."""
+    try:
+        callback = get_callback_func(path, fail_silently=False)
+    except ImportError as err:
+        raise ImproperlyConfigured(f"Invalid callback {path}: {err}") from err
+    if not callable(callback):
+        raise ImproperlyConfigured(f"Callback {path} is not callable")
+    return callback
+
+
+class CallbackRegistry:
+    """Registry of resolved callbacks, keyed by dotted path.
+
+    The lookup table is read only. It's replaced (never modified) when
+    callbacks are added, so lookups take no lock.
+    """
+
+    def __init__(self) -> None:
+        """Constructor."""
+        self._callbacks: Mapping[str, Optional[Callable]] = MappingProxyType({})
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._callbacks)
+
+    @staticmethod
+    def _iter_paths(
+        providers: Optional[Mapping[str, Mapping[str, Any]]],
+    ) -> Iterator[str]:
+        """Iterate dotted paths of the global and provider callbacks."""
+        for name in CALLBACK_NAMES:
+            value = getattr(ska_settings, name)
+            if isinstance(value, str):
+                yield value
+
+        for provider_data in (providers or {}).values():
+            for name in CALLBACK_NAMES:
+                value = provider_data.get(name)
+                if isinstance(value, str):
+                    yield value
+
+    def build(
+        self, providers: Optional[Mapping[str, Mapping[str, Any]]] = None
+    ) -> None:
+        """Resolve all global and provider callbacks.
+
+        Callbacks resolved on first use are dropped.
+
+        :param providers: Providers. Defaults to ``PROVIDERS``.
+        :raise ska.exceptions.ImproperlyConfigured: If any callback is not
+            valid.
+        """
+        if providers is None:
+            providers = ska_settings.PROVIDERS
+
+        callbacks = {}
+        for path in self._iter_paths(providers):
+            if path not in callbacks:
+                callbacks[path] = _resolve(path)
+
+        with self._lock:
+            self._callbacks = MappingProxyType(callbacks)
+
+    def invalidate(self, *args, **kwargs) -> None:
+        """Drop callbacks resolved on first use.
+
+        Can be connected to signals (for instance,
+        ``constance.signals.config_updated``).
+        """
+        self.build()
+
+    def get(self, func: Union[str, Callable, None]) -> Optional[Callable]:
+        """Get callback.
+
+        :param func: Dotted path or callable.
+        :return: Callable, or None if the path is not valid.
+        """
+        if func is None or callable(func):
+            return func
+
+        try:
+            return self._callbacks[func]
+        except KeyError:
+            pass
+
+        # Not known at startup (providers defined elsewhere).
+        callback = get_callback_func(func)
+        if callback is not None and not callable(callback):
+            callback = None
+        if callback is None:
+            LOGGER.warning("Invalid callback %s", func)
+
+        with self._lock:
+            callbacks: Dict[str, Optional[Callable]] = dict(self._callbacks)
+            callbacks[func] = callback
+            self._callbacks = MappingProxyType(callbacks)
+        return callback
+
+    def get_callback(
+        self, name: str, provider_data: Optional[Mapping[str, Any]] = None
+    ) -> Optional[Callable]:
+        """Get callback of the provider given (or the global one).
+
+        :param name: Name of the callback (for instance,
+            ``USER_GET_CALLBACK``).
+        :param provider_data: Provider settings.
+        :return:
+        """
+        if provider_data and name in provider_data:
+            return self.get(provider_data[name])
+        return self.get(getattr(ska_settings, name))
+
+
+callback_registry = CallbackRegistry()
+
+
+class DispatcherInfo(NamedTuple):
+    """Callback dispatcher statistics."""
+
+    submitted: int
+    completed: int
+    failed: int
+    slow: int
+    inline: int
+    pending: int
+
+
+class CallbackDispatcher:
+    """Runs callbacks in a bounded thread pool.
+
+    Callbacks dispatched within a transaction are submitted once it's
+    committed (and dropped if it's rolled back). Exceptions raised by the
+    callbacks are logged (and counted), never propagated. Callbacks
+    running longer than ``timeout`` seconds are reported (threads can't be
+    interrupted, though). When ``queue_size`` callbacks are pending,
+    further callbacks are run inline. Pending callbacks are waited for on
+    interpreter exit (at most ``timeout`` seconds).
+
+    :param workers: Number of threads.
+    :param queue_size: Max number of pending callbacks.
+    :param timeout: Number of seconds after which callbacks are reported as
+        slow.
+    """
+
+    def __init__(
+        self,
+        workers: int = ska_settings.DEFERRED_CALLBACKS_WORKERS,
+        queue_size: int = ska_settings.DEFERRED_CALLBACKS_QUEUE_SIZE,
+        timeout: float = ska_settings.DEFERRED_CALLBACKS_TIMEOUT,
+    ) -> None:
+        """Constructor."""
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.slow = 0
+        self.inline = 0
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        atexit.register(self.shutdown)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Started on first use, so that no threads are started before the
+        # (pre-forking) servers fork the workers.
+        if self._executor is None:
+            with self._condition:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="ska-callbacks",
+                    )
+        return self._executor
+
+    def _call(self, func: Callable, *args, **kwargs) -> bool:
+        """Call the callback. Log (and count) failures and slow calls."""
+        started_at = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(func):
+                asyncio.run(func(*args, **kwargs))
+            else:
+                func(*args, **kwargs)
+        except Exception as err:
+            LOGGER.exception("Callback %s failed: %s", func, err)
+            failed = True
+        else:
+            failed = False
+
+        duration = time.monotonic() - started_at
+        if duration > self.timeout:
+            LOGGER.warning(
+                "Callback %s took %.1f seconds (timeout is %s)",
+                func,
+                duration,
+                self.timeout,
+            )
+        with self._condition:
+            self.failed += failed
+            self.completed += not failed
+            self.slow += duration > self.timeout
+        return not failed
+
+    def _run(self, func: Callable, *args, **kwargs) -> None:
+        """Run the callback in a thread of the pool."""
+        try:
+            self._call(func, *args, **kwargs)
+        finally:
+            close_old_connections()
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    def submit(self, func: Callable, *args, **kwargs) -> None:
+        """Run the callback in the thread pool (right away).
+
+        :param func: Callback.
+        """
+        with self._condition:
+            self.submitted += 1
+            full = self._pending >= self.queue_size
+            if full:
+                self.inline += 1
+            else:
+                self._pending += 1
+
+        if full:
+            self._call(func, *args, **kwargs)
+            return
+
+        try:
+            self._get_executor().submit(self._run, func, *args, **kwargs)
+        except RuntimeError:
+            # Shut down already.
+            with self._condition:
+                self._pending -= 1
+                self.inline += 1
+                self._condition.notify_all()
+            self._call(func, *args, **kwargs)
+
+    def dispatch(self, func: Callable, *args, **kwargs) -> None:
+        """Run the callback in the thread pool, once the current
+        transaction (if any) is committed.
+
+        :param func: Callback.
+        """
+        transaction.on_commit(partial(self.submit, func, *args, **kwargs))
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the pending callbacks.
+
+        :param timeout: Max number of seconds to wait. Defaults to
+            ``timeout``.
+        :return: True if no callbacks are pending.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending == 0, timeout=timeout
+            )
+
+    def shutdown(self) -> None:
+        """Wait for the pending callbacks and stop the threads."""
+        if not self.drain():
+            LOGGER.warning(
+                "%s callbacks still pending on shutdown", self._pending
+            )
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def info(self) -> DispatcherInfo:
+        """Dispatcher statistics.
+
+        :return:
+        """
+        with self._condition:
+            return DispatcherInfo(
+                self.submitted,
+                self.completed,
+                self.failed,
+                self.slow,
+                self.inline,
+                self._pending,
+            )
+
+
+callback_dispatcher: Optional[CallbackDispatcher] = (
+    CallbackDispatcher() if ska_settings.DEFERRED_CALLBACKS else None
+)
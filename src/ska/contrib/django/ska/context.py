@@ -0,0 +1,148 @@
+"""
+Request-scoped validation context.
+
+A signed request passes several ``ska`` integration points (decorators,
+authentication backends, DRF permissions, login views). Each of them needs
+the request data, the provider settings and the validation result. The
+``ValidationContext`` is attached to the request on first use and computes
+each of them once: the request data is parsed once, the provider is looked
+up once and the signature is validated (canonicalized and hashed) once per
+validator key (secret key, param names and replay store, see
+``ska.validators``), no matter how many layers ask. Validators with a
+replay store do not reuse results of validators without one.
+
+Results are reused only for the request data of the context itself (as
+returned by ``ValidationContext.data``). Integration points overriding
+``get_request_data`` (for instance, to validate POST data) get fresh
+results.
+
+:example:
+
+>>> from ska import Validator
+>>> from ska.contrib.django.ska.context import get_validation_context
+>>> context = get_validation_context(request)
+>>> validation_result = context.validate(Validator('your-secret-key'))
+"""
+
+from typing import Any, Dict, Optional, Tuple, Union
+
+from django.http import HttpRequest
+
+from ....base import SignatureValidationResult
+from ....validators import Validator
+from .settings import PROVIDERS
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "REQUEST_ATTRIBUTE",
+    "ValidationContext",
+    "get_validation_context",
+)
+
+# Name of the request attribute holding the context.
+REQUEST_ATTRIBUTE = "_ska_validation_context"
+
+
+class ValidationContext:
+    """Validation state of a single request, computed once.
+
+    :param request: Django request.
+    """
+
+    def __init__(self, request: HttpRequest) -> None:
+        """Constructor."""
+        self.request = request
+        self._data: Optional[Dict[str, str]] = None
+        # id(provider settings) -> (provider settings, provider data)
+        self._provider_data: Dict[int, Tuple[Any, Optional[Dict]]] = {}
+        # validator key -> validation result
+        self._results: Dict[Tuple, SignatureValidationResult] = {}
+
+    @property
+    def data(self) -> Dict[str, str]:
+        """Request (GET) data. Shall not be modified."""
+        if self._data is None:
+            self._data = self.request.GET.dict()
+        return self._data
+
+    def get_provider_data(
+        self,
+        settings: Optional[Dict[str, Dict[str, str]]] = None,
+        data: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+    ) -> Optional[Dict[str, str]]:
+        """Get provider data (see ``utils.get_provider_data``).
+
+        :param settings: Providers. Defaults to ``PROVIDERS``.
+        :param data: Request data. Defaults to ``data``.
+        :return:
+        """
+        # Imported here, since ``utils`` imports the models, while this
+        # module is imported (by the decorators) from models.
+        from .utils import get_provider_data
+
+        if data is not None and data is not self.data:
+            return get_provider_data(data, settings)
+
+        if not settings or not isinstance(settings, dict):
+            settings = PROVIDERS
+        entry = self._provider_data.get(id(settings))
+        if entry is None or entry[0] is not settings:
+            entry = (settings, get_provider_data(self.data, settings))
+            self._provider_data[id(settings)] = entry
+        return entry[1]
+
+    def validate(
+        self,
+        validator: Validator,
+        data: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+    ) -> SignatureValidationResult:
+        """Validate the request.
+
+        :param validator: Validator (see ``ska.validators``). Results are
+            shared by validators with equal ``key``.
+        :param data: Request data. Defaults to ``data``.
+        :return:
+        """
+        if data is not None and data is not self.data:
+            return validator.validate(data)
+
+        validation_result = self._results.get(validator.key)
+        if validation_result is None:
+            validation_result = validator.validate(self.data)
+            self._results[validator.key] = validation_result
+        return validation_result
+
+    def extract_signed_data(
+        self,
+        validator: Validator,
+        data: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+    ) -> Optional[Dict[str, str]]:
+        """Validate the request and extract the signed data.
+
+        :param validator: Validator (see ``ska.validators``).
+        :param data: Request data. Defaults to ``data``.
+        :return: Signed data or None if the request is not valid.
+        """
+        if not self.validate(validator, data=data).result:
+            return None
+        return validator.extract_signed_data(
+            self.data if data is None else data
+        )
+
+
+def get_validation_context(request: HttpRequest) -> ValidationContext:
+    """Get validation context of the request (create on first use).
+
+    DRF requests share the context of the Django request they wrap.
+
+    :param request: Django or DRF request.
+    :return:
+    """
+    request = getattr(request, "_request", request)
+    context = request.__dict__.get(REQUEST_ATTRIBUTE)
+    if context is None:
+        context = ValidationContext(request)
+        request.__dict__[REQUEST_ATTRIBUTE] = context
+    return context
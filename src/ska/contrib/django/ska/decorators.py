@@ -13,6 +13,11 @@
       which holds the ``auth_user`` value.
   :param str valid_until_param: Name of the (foe example GET or POST) param
       name which holds the ``valid_until`` value.
+  :param ska.caches.ValidationCache cache: Cache of successful validations.
+      Defaults to the shared cache (enabled by ``SKA_VALIDATION_CACHE_SIZE``).
+  :param ska.caches.NegativeCache negative_cache: Cache of failed
+      validations. Defaults to the shared cache (enabled by
+      ``SKA_NEGATIVE_CACHE_SIZE``).
 
 - ``sign_url``: Method decorator (to be used in models). Signs the URL.
 
@@ -32,6 +37,7 @@
   :param str valid_until_param: Name of the GET param name which would hold
       the ``valid_until`` value.
 """
+import inspect
 from typing import Callable, Dict, Optional, Union
 
 from django.http import HttpRequest
@@ -39,7 +45,8 @@ from django.shortcuts import render
 from django.utils.translation import gettext
 
 from .... import sign_url as ska_sign_url
-from .... import validate_signed_request_data
+from ....base import SignatureValidationResult
+from ....caches import NegativeCache, ValidationCache
 from ....defaults import (
     DEFAULT_AUTH_USER_PARAM,
     DEFAULT_EXTRA_PARAM,
@@ -48,6 +55,9 @@ from ....defaults import (
     DEFAULT_VALID_UNTIL_PARAM,
     SIGNATURE_LIFETIME,
 )
+from ....validators import Validator
+from .caches import negative_cache, validation_cache
+from .context import get_validation_context
 from .http import HttpResponseUnauthorized
 from .settings import (
     AUTH_USER,
@@ -80,6 +90,8 @@ class BaseValidateSignedRequest:
         auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
         valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
         extra_param: str = DEFAULT_EXTRA_PARAM,
+        cache: Optional[ValidationCache] = validation_cache,
+        negative_cache: Optional[NegativeCache] = negative_cache,
     ) -> None:
         """Constructor."""
         self.secret_key = secret_key
@@ -87,11 +99,64 @@ class BaseValidateSignedRequest:
         self.auth_user_param = auth_user_param
         self.valid_until_param = valid_until_param
         self.extra_param = extra_param
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.validator = Validator(
+            secret_key=secret_key,
+            signature_param=signature_param,
+            auth_user_param=auth_user_param,
+            valid_until_param=valid_until_param,
+            extra_param=extra_param,
+            cache=cache,
+            negative_cache=negative_cache,
+        )
 
     def get_request_data(
         self, request: HttpRequest, *args, **kwargs
     ) -> Dict[str, str]:
-        return request.GET.dict()
+        return get_validation_context(request).data
+
+    def validate_request(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> SignatureValidationResult:
+        """Validate the request.
+
+        The validator is made once (at decoration time) and reused. The
+        result is kept in the validation context of the request (see
+        ``ska.contrib.django.ska.context``). Does no I/O, so it's safe to
+        call from async views.
+        """
+        request_data = self.get_request_data(request, *args, **kwargs)
+
+        return get_validation_context(request).validate(
+            self.validator, data=request_data
+        )
+
+    def get_unauthorized_response(
+        self,
+        request: HttpRequest,
+        validation_result: SignatureValidationResult,
+    ) -> HttpResponseUnauthorized:
+        """Response describing the validation errors."""
+        if UNAUTHORISED_REQUEST_ERROR_TEMPLATE:
+            # If template to display the error message is set in
+            # ska (django-ska) settings, use it to render the message
+            # and return ``HttpResponseUnauthorized`` response
+            # describing the error.
+            response_content = render(
+                request,
+                UNAUTHORISED_REQUEST_ERROR_TEMPLATE,
+                {"reason": "; ".join(validation_result.reason)},
+            )
+            return HttpResponseUnauthorized(response_content)
+        else:
+            # Otherwise, return plain text message with describing the
+            # error.
+            return HttpResponseUnauthorized(
+                gettext(UNAUTHORISED_REQUEST_ERROR_MESSAGE).format(
+                    "; ".join(validation_result.reason)
+                )
+            )
 
 
 class ValidateSignedRequest(BaseValidateSignedRequest):
@@ -101,8 +166,7 @@ class ValidateSignedRequest(BaseValidateSignedRequest):
     validation mechanism to the request data. Assumes ``SKA_SECRET_KEY`` to be
     in ``settings`` module.
 
-    Arguments to be used with `ska.validate_signed_request_data` shortcut
-    function.
+    Arguments to be used with `ska.validators.Validator`.
 
     :attribute str secret_key: The shared secret key.
     :attribute str signature_param: Name of the (for example GET or POST) param
@@ -113,6 +177,10 @@ class ValidateSignedRequest(BaseValidateSignedRequest):
         param name which holds the ``valid_until`` value.
     :attribute str extra_param: Name of the (foe example GET or POST) param
         name which holds the ``extra`` value.
+    :attribute ska.caches.ValidationCache cache: Cache of successful
+        validations.
+    :attribute ska.caches.NegativeCache negative_cache: Cache of failed
+        validations.
 
     :example:
 
@@ -121,48 +189,46 @@ class ValidateSignedRequest(BaseValidateSignedRequest):
     >>> @validate_signed_request()
     >>> def detail(request, slug, template_name='foo/detail.html'):
     >>>     # Your code
+
+    Async views are supported as well (the wrapped view is a coroutine
+    function then).
+
+    >>> @validate_signed_request()
+    >>> async def detail(request, slug):
+    >>>     # Your code
     """
 
     def __call__(self, func: Callable) -> Callable:
-        """Call."""
+        """Call.
+
+        Coroutine functions (async views) are wrapped into coroutine
+        functions.
+        """
+        if inspect.iscoroutinefunction(func):
+
+            async def ainner(request: HttpRequest, *args, **kwargs):
+                """Inner (async)."""
+                validation_result = self.validate_request(
+                    request, *args, **kwargs
+                )
+                if validation_result.result is True:
+                    # If validated, just return the func as is.
+                    return await func(request, *args, **kwargs)
+                return self.get_unauthorized_response(
+                    request, validation_result
+                )
+
+            return ainner
 
         def inner(request: HttpRequest, *args, **kwargs):
             """Inner."""
-            request_data = self.get_request_data(request, *args, **kwargs)
-
             # Validating the request.
-            validation_result = validate_signed_request_data(
-                data=request_data,
-                secret_key=self.secret_key,
-                signature_param=self.signature_param,
-                auth_user_param=self.auth_user_param,
-                valid_until_param=self.valid_until_param,
-                extra_param=self.extra_param,
-            )
+            validation_result = self.validate_request(request, *args, **kwargs)
             if validation_result.result is True:
                 # If validated, just return the func as is.
                 return func(request, *args, **kwargs)
-            else:
-                # Otherwise...
-                if UNAUTHORISED_REQUEST_ERROR_TEMPLATE:
-                    # If template to display the error message is set in
-                    # ska (django-ska) settings, use it to render the message
-                    # and return ``HttpResponseUnauthorized`` response
-                    # describing the error.
-                    response_content = render(
-                        request,
-                        UNAUTHORISED_REQUEST_ERROR_TEMPLATE,
-                        {"reason": "; ".join(validation_result.reason)},
-                    )
-                    return HttpResponseUnauthorized(response_content)
-                else:
-                    # Otherwise, return plain text message with describing the
-                    # error.
-                    return HttpResponseUnauthorized(
-                        gettext(UNAUTHORISED_REQUEST_ERROR_MESSAGE).format(
-                            "; ".join(validation_result.reason)
-                        )
-                    )
+            # Otherwise...
+            return self.get_unauthorized_response(request, validation_result)
 
         return inner
 
@@ -177,8 +243,7 @@ class MethodValidateSignedRequest(BaseValidateSignedRequest):
     validation mechanism to the request data. Assumes ``SKA_SECRET_KEY`` to be
     in ``settings`` module.
 
-    Arguments to be used with `ska.validate_signed_request_data` shortcut
-    function.
+    Arguments to be used with `ska.validators.Validator`.
 
     :attribute str secret_key: The shared secret key.
     :attribute str signature_param: Name of the (for example GET or POST) param
@@ -189,6 +254,10 @@ class MethodValidateSignedRequest(BaseValidateSignedRequest):
         param name which holds the ``valid_until`` value.
     :attribute str extra_param: Name of the (foe example GET or POST) param
         name which holds the ``extra`` value.
+    :attribute ska.caches.ValidationCache cache: Cache of successful
+        validations.
+    :attribute ska.caches.NegativeCache negative_cache: Cache of failed
+        validations.
 
     :example:
 
@@ -198,48 +267,41 @@ class MethodValidateSignedRequest(BaseValidateSignedRequest):
     >>>     @validate_signed_request()
     >>>     def get(self, request, slug, template_name='foo/detail.html'):
     >>>         # Your code
+
+    Async methods are supported as well.
     """
 
     def __call__(self, func: Callable) -> Callable:
-        """Call."""
+        """Call.
+
+        Coroutine functions (async views) are wrapped into coroutine
+        functions.
+        """
+        if inspect.iscoroutinefunction(func):
+
+            async def ainner(this, request: HttpRequest, *args, **kwargs):
+                """Inner (async)."""
+                validation_result = self.validate_request(
+                    request, *args, **kwargs
+                )
+                if validation_result.result is True:
+                    # If validated, just return the func as is.
+                    return await func(this, request, *args, **kwargs)
+                return self.get_unauthorized_response(
+                    request, validation_result
+                )
+
+            return ainner
 
         def inner(this, request: HttpRequest, *args, **kwargs):
             """Inner."""
-            request_data = self.get_request_data(request, *args, **kwargs)
-
             # Validating the request.
-            validation_result = validate_signed_request_data(
-                data=request_data,
-                secret_key=self.secret_key,
-                signature_param=self.signature_param,
-                auth_user_param=self.auth_user_param,
-                valid_until_param=self.valid_until_param,
-                extra_param=self.extra_param,
-            )
+            validation_result = self.validate_request(request, *args, **kwargs)
             if validation_result.result is True:
                 # If validated, just return the func as is.
                 return func(this, request, *args, **kwargs)
-            else:
-                # Otherwise...
-                if UNAUTHORISED_REQUEST_ERROR_TEMPLATE:
-                    # If template to display the error message is set in
-                    # ska (django-ska) settings, use it to render the message
-                    # and return ``HttpResponseUnauthorized`` response
-                    # describing the error.
-                    response_content = render(
-                        request,
-                        UNAUTHORISED_REQUEST_ERROR_TEMPLATE,
-                        {"reason": "; ".join(validation_result.reason)},
-                    )
-                    return HttpResponseUnauthorized(response_content)
-                else:
-                    # Otherwise, return plain text message with describing the
-                    # error.
-                    return HttpResponseUnauthorized(
-                        gettext(UNAUTHORISED_REQUEST_ERROR_MESSAGE).format(
-                            "; ".join(validation_result.reason)
-                        )
-                    )
+            # Otherwise...
+            return self.get_unauthorized_response(request, validation_result)
 
         return inner
 
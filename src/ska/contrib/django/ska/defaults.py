@@ -14,17 +14,58 @@
 - `USER_CREATE_CALLBACK` (str): User create callback (when user is created in
   auth backend).
 - `USER_INFO_CALLBACK` (str): User info callback.
+- `DEFERRED_CALLBACKS` (bool): If set to True, the user get, create and
+  info callbacks are run in a thread pool. Defaults to False.
+- `DEFERRED_CALLBACKS_WORKERS` (int): Number of threads running deferred
+  callbacks. Defaults to 4.
+- `DEFERRED_CALLBACKS_QUEUE_SIZE` (int): Max number of pending deferred
+  callbacks. Defaults to 1000.
+- `DEFERRED_CALLBACKS_TIMEOUT` (float): Number of seconds after which
+  deferred callbacks are reported as slow (and waited for on shutdown).
+  Defaults to 30.
 - `REDIRECT_AFTER_LOGIN` (str): Redirect after login.
 - `DB_STORE_SIGNATURES` (bool): If set to True, signatures are stored in the
   database.
 - `DB_PERFORM_SIGNATURE_CHECK` (bool): If set to True, an extra check is
   fired on whether the token has already been used or not.
+- `DB_WRITE_BEHIND` (bool): If set to True (and ``DB_STORE_SIGNATURES`` is
+  set, but ``DB_PERFORM_SIGNATURE_CHECK`` is not), signatures are buffered
+  in-process and stored in the background. Defaults to False.
+- `DB_WRITE_BEHIND_BUFFER_SIZE` (int): Max number of buffered signatures.
+  Defaults to 10000.
+- `DB_WRITE_BEHIND_BATCH_SIZE` (int): Number of buffered signatures, which
+  triggers a flush. Defaults to 500.
+- `DB_WRITE_BEHIND_FLUSH_INTERVAL` (float): Max number of seconds signatures
+  stay buffered. Defaults to 1.0.
+- `REPLAY_STORE` (str): Dotted path to a replay store instance used by the
+  authentication backends. Defaults to None (not provided).
+- `PURGE_BATCH_SIZE` (int): Number of expired signatures deleted at once.
+  Defaults to 1000.
 - `PROVIDERS` (dict): A dictionary where key is the provider UID and the key
   is another dictionary holding the following provider specific keys:
   'SECRET_KEY', 'USER_GET_CALLBACK', 'USER_CREATE_CALLBACK',
   'USER_INFO_CALLBACK', 'REDIRECT_AFTER_LOGIN'. Note, that the 'SECRET_KEY'
   is a required key. The rest are optional, and if given, override
   respectively the values of ``ska.contrib.django.ska.settings``.
+- `VALIDATION_CACHE_SIZE` (int): Max number of successful validations
+  cached (until the signature expires) by the ``validate_signed_request``
+  and ``m_validate_signed_request`` decorators. Defaults to 0 (disabled).
+- `NEGATIVE_CACHE_SIZE` (int): Max number of recently failed validations
+  (invalid signatures) cached by the ``validate_signed_request`` and
+  ``m_validate_signed_request`` decorators and the authentication backends.
+  Defaults to 0 (disabled).
+- `NEGATIVE_CACHE_TTL` (int): Number of seconds failed validations are
+  cached. Defaults to 60.
+- `CONSTANCE_SETTINGS_CACHE_TTL` (int): Number of seconds the
+  ``django-constance`` backed settings (``SKA_SECRET_KEY``,
+  ``SKA_PROVIDERS``) are cached in-process. Defaults to 0 (disabled).
+- `USER_CACHE_SIZE` (int): Max number of users cached in-process by the
+  authentication backends. Defaults to 0 (disabled).
+- `USER_CACHE_TTL` (int): Number of seconds users are cached. Defaults to 5.
+- `USER_ONLY_FIELDS` (tuple): Fields of the users loaded by the
+  authentication backends (``QuerySet.only``). Defaults to None (all).
+- `USER_SELECT_RELATED` (tuple): Relations of the users loaded along by the
+  authentication backends (``QuerySet.select_related``). Defaults to None.
 """
 
 from ska.gettext import _
@@ -34,16 +75,34 @@ __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
     "AUTH_USER",
+    "CONSTANCE_SETTINGS_CACHE_TTL",
     "DB_PERFORM_SIGNATURE_CHECK",
     "DB_STORE_SIGNATURES",
+    "DB_WRITE_BEHIND",
+    "DB_WRITE_BEHIND_BATCH_SIZE",
+    "DB_WRITE_BEHIND_BUFFER_SIZE",
+    "DB_WRITE_BEHIND_FLUSH_INTERVAL",
+    "DEFERRED_CALLBACKS",
+    "DEFERRED_CALLBACKS_QUEUE_SIZE",
+    "DEFERRED_CALLBACKS_TIMEOUT",
+    "DEFERRED_CALLBACKS_WORKERS",
+    "NEGATIVE_CACHE_SIZE",
+    "NEGATIVE_CACHE_TTL",
     "PROVIDERS",
+    "PURGE_BATCH_SIZE",
     "REDIRECT_AFTER_LOGIN",
+    "REPLAY_STORE",
     "UNAUTHORISED_REQUEST_ERROR_MESSAGE",
     "UNAUTHORISED_REQUEST_ERROR_TEMPLATE",
+    "USER_CACHE_SIZE",
+    "USER_CACHE_TTL",
     "USER_CREATE_CALLBACK",
     "USER_GET_CALLBACK",
     "USER_INFO_CALLBACK",
+    "USER_ONLY_FIELDS",
+    "USER_SELECT_RELATED",
     "USER_VALIDATE_CALLBACK",
+    "VALIDATION_CACHE_SIZE",
 )
 
 AUTH_USER = "ska-auth-user"
@@ -58,7 +117,30 @@ USER_CREATE_CALLBACK = None
 USER_INFO_CALLBACK = None
 REDIRECT_AFTER_LOGIN = ""
 
+DEFERRED_CALLBACKS = False
+DEFERRED_CALLBACKS_WORKERS = 4
+DEFERRED_CALLBACKS_QUEUE_SIZE = 1000
+DEFERRED_CALLBACKS_TIMEOUT = 30
+
 DB_STORE_SIGNATURES = False
 DB_PERFORM_SIGNATURE_CHECK = False
+DB_WRITE_BEHIND = False
+DB_WRITE_BEHIND_BUFFER_SIZE = 10000
+DB_WRITE_BEHIND_BATCH_SIZE = 500
+DB_WRITE_BEHIND_FLUSH_INTERVAL = 1.0
+REPLAY_STORE = None
+PURGE_BATCH_SIZE = 1000
 
 PROVIDERS = {}
+
+VALIDATION_CACHE_SIZE = 0
+
+NEGATIVE_CACHE_SIZE = 0
+NEGATIVE_CACHE_TTL = 60
+
+CONSTANCE_SETTINGS_CACHE_TTL = 0
+
+USER_CACHE_SIZE = 0
+USER_CACHE_TTL = 5
+USER_ONLY_FIELDS = None
+USER_SELECT_RELATED = None
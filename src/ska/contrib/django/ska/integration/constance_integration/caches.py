@@ -0,0 +1,198 @@
+"""
+In-process cache of the ``django-constance`` backed settings.
+
+``SKA_SECRET_KEY`` and ``SKA_PROVIDERS`` are read from the config store
+(database, Redis) once per ``SKA_CONSTANCE_SETTINGS_CACHE_TTL`` seconds,
+instead of on each authentication, permission check or ``sign_url`` tag.
+Providers are parsed from JSON (if ``SKA_CONSTANCE_SETTINGS_PARSE_FROM_JSON``
+is set) when loaded, not on each request.
+
+Changes made through ``constance`` in the current process (admin, code)
+invalidate the cache immediately (``config_updated`` signal). Changes made
+in other processes are picked up within the TTL. Changes of
+``SKA_PROVIDERS`` also drop the provider callbacks resolved on first use
+(see ``ska.contrib.django.ska.callbacks``).
+
+- ``constance_settings``: Shared cache. Caching is disabled (settings are
+  read on each call), unless ``SKA_CONSTANCE_SETTINGS_CACHE_TTL`` is set.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from constance import config
+from constance.signals import config_updated
+from django.conf import settings
+
+from ...... import clocks
+from ...callbacks import callback_registry
+from ...settings import CONSTANCE_SETTINGS_CACHE_TTL
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "CONSTANCE_KEYS",
+    "ConstanceSettings",
+    "constance_settings",
+    "invalidate_callbacks",
+)
+
+# Constance keys holding the ska settings.
+CONSTANCE_KEYS = ("SKA_SECRET_KEY", "SKA_PROVIDERS")
+
+
+class _Snapshot(NamedTuple):
+    """Settings loaded at once."""
+
+    version: int
+    loaded_at: float
+    secret_key: Any
+    providers: Dict[str, Dict[str, Any]]
+
+
+def _parse_providers(value: Any) -> Dict[str, Dict[str, Any]]:
+    """Parse the ``SKA_PROVIDERS`` value (JSON, if configured so)."""
+    parse_from_json = getattr(
+        settings, "SKA_CONSTANCE_SETTINGS_PARSE_FROM_JSON", False
+    )
+    if parse_from_json and isinstance(value, (str, bytes)):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+class ConstanceSettings:
+    """Cache of the ``django-constance`` backed settings.
+
+    Thread safe. The version is bumped on each invalidation: settings
+    loaded before an invalidation are never cached after it.
+
+    :param ttl: Number of seconds settings are cached. 0 disables caching.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        ttl: float = CONSTANCE_SETTINGS_CACHE_TTL,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        self.ttl = ttl
+        self.clock = clock
+        self.version = 0
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else clocks.now()
+
+    def invalidate(self, *args, **kwargs) -> None:
+        """Invalidate the cache.
+
+        Can be connected to the ``constance.signals.config_updated``
+        signal. Changes of other constance keys are ignored.
+        """
+        key = kwargs.get("key")
+        if key is not None and key not in CONSTANCE_KEYS:
+            return
+
+        with self._lock:
+            self.version += 1
+            self._snapshot = None
+
+    def _load(self, version: int) -> _Snapshot:
+        """Load the settings from the config store."""
+        return _Snapshot(
+            version=version,
+            loaded_at=self._now(),
+            secret_key=config.SKA_SECRET_KEY,
+            providers=_parse_providers(config.SKA_PROVIDERS) or {},
+        )
+
+    def _get_fresh_snapshot(self) -> Optional[_Snapshot]:
+        """Cached settings, if not older than the TTL."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._now() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    def _get_snapshot(self) -> _Snapshot:
+        snapshot = self._get_fresh_snapshot()
+        if snapshot is not None:
+            return snapshot
+
+        version = self.version
+        snapshot = self._load(version)
+        with self._lock:
+            # Do not cache settings loaded before an invalidation.
+            if self.version == version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def get_secret_key(self) -> Any:
+        """Get the ``SKA_SECRET_KEY`` value.
+
+        :return:
+        """
+        if self.ttl <= 0:
+            return config.SKA_SECRET_KEY
+        return self._get_snapshot().secret_key
+
+    def get_providers(self) -> Dict[str, Dict[str, Any]]:
+        """Get the (parsed) ``SKA_PROVIDERS`` value.
+
+        :return:
+        """
+        if self.ttl <= 0:
+            return _parse_providers(config.SKA_PROVIDERS)
+        return self._get_snapshot().providers
+
+    async def aget_secret_key(self) -> Any:
+        """Get the ``SKA_SECRET_KEY`` value (async).
+
+        Served from cache without leaving the event loop, if fresh. Loaded
+        in a thread otherwise.
+
+        :return:
+        """
+        snapshot = self._get_fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.secret_key
+        return await sync_to_async(self.get_secret_key)()
+
+    async def aget_providers(self) -> Dict[str, Dict[str, Any]]:
+        """Get the (parsed) ``SKA_PROVIDERS`` value (async).
+
+        Served from cache without leaving the event loop, if fresh. Loaded
+        in a thread otherwise.
+
+        :return:
+        """
+        snapshot = self._get_fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.providers
+        return await sync_to_async(self.get_providers)()
+
+
+def invalidate_callbacks(sender=None, key=None, **kwargs) -> None:
+    """Drop provider callbacks resolved on first use, if providers change."""
+    if key is None or key == "SKA_PROVIDERS":
+        callback_registry.invalidate()
+
+
+constance_settings = ConstanceSettings()
+
+config_updated.connect(
+    constance_settings.invalidate,
+    dispatch_uid="ska.constance_settings.invalidate",
+)
+config_updated.connect(
+    invalidate_callbacks,
+    dispatch_uid="ska.callback_registry.invalidate",
+)
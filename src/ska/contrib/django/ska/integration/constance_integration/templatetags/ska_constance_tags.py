@@ -1,6 +1,5 @@
 from typing import Dict, Optional, Type, Union
 
-from constance import config
 from django import template
 from django.core.exceptions import ImproperlyConfigured
 from django.template.context import RequestContext
@@ -17,6 +16,7 @@ from .......defaults import (
     SIGNATURE_LIFETIME,
 )
 from .......signatures import Signature
+from ..caches import constance_settings
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
@@ -50,7 +50,7 @@ def sign_url(
     if not auth_user:
         auth_user = context["request"].user.get_username()
 
-    secret_key = config.SKA_SECRET_KEY
+    secret_key = constance_settings.get_secret_key()
 
     return ska_sign_url(
         auth_user=auth_user,
@@ -90,12 +90,13 @@ def provider_sign_url(
     if not auth_user:
         auth_user = context["request"].user.get_username()
 
-    if provider not in config.SKA_PROVIDERS:
+    providers = constance_settings.get_providers()
+    if provider not in providers:
         if fail_silently:
             return None
         else:
             raise ImproperlyConfigured(f"Provider {provider} does not exist")
-    secret_key = config.SKA_PROVIDERS.get(provider, {}).get("SECRET_KEY", None)
+    secret_key = providers.get(provider, {}).get("SECRET_KEY", None)
 
     if extra is None:
         extra = {}
@@ -6,14 +6,9 @@ from rest_framework import permissions
 from rest_framework.request import Request
 from rest_framework.viewsets import GenericViewSet
 
-from ....... import validate_signed_request_data
-from .......defaults import (
-    DEFAULT_AUTH_USER_PARAM,
-    DEFAULT_EXTRA_PARAM,
-    DEFAULT_SIGNATURE_PARAM,
-    DEFAULT_VALID_UNTIL_PARAM,
-)
 from .......exceptions import ImproperlyConfigured, InvalidData
+from .......validators import Validator
+from ....context import get_validation_context
 from ....utils import get_provider_data
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -29,7 +24,14 @@ LOGGER = logging.getLogger(__file__)
 
 
 class AbstractSignedRequestRequired(permissions.BasePermission):
-    """Signed request required permission."""
+    """Signed request required permission.
+
+    :attribute ska.validators.Validator validator: Validator (param names,
+        signature class) the validators of each secret key are derived
+        from. Made once, at class definition time.
+    """
+
+    validator: Validator = Validator()
 
     def get_settings(
         self,
@@ -71,7 +73,7 @@ class AbstractSignedRequestRequired(permissions.BasePermission):
         view: GenericViewSet,
         obj: Optional[Model] = None,
     ) -> Dict[str, Union[bytes, str, float, int]]:
-        return request.GET.dict()
+        return get_validation_context(request).data
 
     def validate_signed_request(
         self,
@@ -81,6 +83,10 @@ class AbstractSignedRequestRequired(permissions.BasePermission):
     ) -> bool:
         """Validate signed request.
 
+        The result is kept in the validation context of the request (see
+        ``ska.contrib.django.ska.context``), so that ``has_permission`` and
+        ``has_object_permission`` validate the signature once.
+
         :param request:
         :param view:
         :param obj:
@@ -95,13 +101,9 @@ class AbstractSignedRequestRequired(permissions.BasePermission):
 
         try:
             # If authentication/data validation failed.
-            validation_result = validate_signed_request_data(
+            validation_result = get_validation_context(request).validate(
+                self.validator.derive(secret_key=secret_key),
                 data=request_data,
-                secret_key=secret_key,
-                signature_param=DEFAULT_SIGNATURE_PARAM,
-                auth_user_param=DEFAULT_AUTH_USER_PARAM,
-                valid_until_param=DEFAULT_VALID_UNTIL_PARAM,
-                extra_param=DEFAULT_EXTRA_PARAM,
             )
             return validation_result.result
         except (ImproperlyConfigured, InvalidData) as err:
@@ -162,7 +164,12 @@ class BaseProviderSignedRequestRequired(AbstractSignedRequestRequired):
         provider_settings = self.get_settings(
             request_data, request=None, view=None, obj=None
         )
-        provider_data = get_provider_data(request_data, provider_settings)
+        if request is not None:
+            provider_data = get_validation_context(request).get_provider_data(
+                provider_settings, data=request_data
+            )
+        else:
+            provider_data = get_provider_data(request_data, provider_settings)
         if provider_data:
             secret_key = provider_data["SECRET_KEY"]
             return secret_key
@@ -1,10 +1,10 @@
 from typing import Dict, Optional, Union
 
-from constance import config
 from django.db.models import Model
 from rest_framework.request import Request
 from rest_framework.viewsets import GenericViewSet
 
+from ...constance_integration.caches import constance_settings
 from .base import BaseProviderSignedRequestRequired, BaseSignedRequestRequired
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -27,7 +27,7 @@ class ConstanceSignedRequestRequired(BaseSignedRequestRequired):
         obj: Optional[Model] = None,
     ) -> Dict[str, str]:
         return {
-            "SECRET_KEY": config.SKA_SECRET_KEY,
+            "SECRET_KEY": constance_settings.get_secret_key(),
         }
 
 
@@ -41,4 +41,4 @@ class ConstanceProviderSignedRequestRequired(BaseProviderSignedRequestRequired):
         view: Optional[GenericViewSet] = None,
         obj: Optional[Model] = None,
     ) -> Dict[str, Dict[str, str]]:
-        return config.SKA_PROVIDERS
+        return constance_settings.get_providers()
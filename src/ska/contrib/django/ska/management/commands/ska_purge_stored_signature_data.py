@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 
+from ska.contrib.django.ska.settings import PURGE_BATCH_SIZE
 from ska.contrib.django.ska.utils import purge_signature_data
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -9,8 +10,52 @@ __all__ = ("Command",)
 
 
 class Command(BaseCommand):
+    help = "Purges old signature data (valid_until < now)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help="Number of signatures deleted at once.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Number of seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=None,
+            help="Max number of seconds to spend.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the signatures to be purged, delete nothing.",
+        )
+
     def handle(self, *args, **options):
         """
         Purges old signature data (valid_until < now).
         """
-        purge_signature_data()
+        verbosity = options.get("verbosity", 1)
+
+        def progress(deleted):
+            if verbosity > 1:
+                self.stdout.write(f"Deleted {deleted} signatures so far.")
+
+        count = purge_signature_data(
+            batch_size=options.get("batch_size", PURGE_BATCH_SIZE),
+            sleep=options.get("sleep", 0),
+            time_budget=options.get("time_budget"),
+            dry_run=options.get("dry_run", False),
+            progress=progress,
+        )
+        if verbosity > 0:
+            if options.get("dry_run"):
+                self.stdout.write(f"{count} signatures to be purged.")
+            else:
+                self.stdout.write(f"{count} signatures purged.")
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ska", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="signature",
+            name="valid_until",
+            field=models.DateTimeField(
+                db_index=True, verbose_name="Valid until"
+            ),
+        ),
+    ]
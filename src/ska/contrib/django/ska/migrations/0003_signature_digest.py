@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ska", "0002_signature_valid_until_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="signature",
+            name="digest",
+            field=models.CharField(
+                editable=False,
+                max_length=32,
+                null=True,
+                verbose_name="Digest",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from hashlib import blake2b
+
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def make_signature_digest(signature, auth_user, valid_until):
+    """Make digest of the signature given.
+
+    Frozen copy of ``models.make_signature_digest`` (and
+    ``ska.replay.make_replay_key``) as of this migration.
+    """
+    if timezone.is_naive(valid_until):
+        valid_until = timezone.make_aware(valid_until)
+    material = f"{signature}\0{auth_user}\0{valid_until.timestamp()}"
+    return blake2b(
+        material.encode(), digest_size=16, person=b"ska-replay"
+    ).hexdigest()
+
+
+def backfill_digest(apps, schema_editor):
+    """Fill in the digest of the stored signatures."""
+    Signature = apps.get_model("ska", "Signature")
+    manager = Signature._default_manager.db_manager(
+        schema_editor.connection.alias
+    )
+    queryset = manager.filter(digest__isnull=True)
+    batch = []
+    for signature in queryset.only(
+        "signature", "auth_user", "valid_until"
+    ).iterator(chunk_size=BATCH_SIZE):
+        signature.digest = make_signature_digest(
+            signature.signature, signature.auth_user, signature.valid_until
+        )
+        batch.append(signature)
+        if len(batch) >= BATCH_SIZE:
+            manager.bulk_update(batch, ["digest"])
+            batch = []
+    if batch:
+        manager.bulk_update(batch, ["digest"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ska", "0003_signature_digest"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_digest, migrations.RunPython.noop),
+    ]
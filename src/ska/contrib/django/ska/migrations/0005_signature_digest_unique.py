@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ska", "0004_backfill_signature_digest"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="signature",
+            name="digest",
+            field=models.CharField(
+                editable=False,
+                max_length=32,
+                unique=True,
+                verbose_name="Digest",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="signature",
+            unique_together=set(),
+        ),
+    ]
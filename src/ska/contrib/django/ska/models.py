@@ -1,11 +1,36 @@
+from datetime import datetime
+
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from ....replay import make_replay_key
+
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
-__all__ = ("Signature",)
+__all__ = (
+    "Signature",
+    "make_signature_digest",
+)
+
+
+def make_signature_digest(
+    signature: str, auth_user: str, valid_until: datetime
+) -> str:
+    """Make digest (hex encoded replay store key) of the signature given.
+
+    Naive ``valid_until`` values are taken in the default time zone (as
+    Django stores them), so the digest does not change once stored.
+
+    :param signature:
+    :param auth_user:
+    :param valid_until:
+    :return:
+    """
+    if timezone.is_naive(valid_until):
+        valid_until = timezone.make_aware(valid_until)
+    return make_replay_key(signature, auth_user, valid_until.timestamp()).hex()
 
 
 class Signature(models.Model):
@@ -16,19 +41,30 @@ class Signature(models.Model):
         - `auth_user` (str): Auth user.
         - `valid_until` (datetime.datetime): Valid until.
         - `created` (datetime.datetime): Time added.
+        - `digest` (str): Digest of the signature, auth user and valid
+          until (see ``make_signature_digest``). Unique.
     """
 
     signature = models.CharField(_("Signature"), max_length=255)
     auth_user = models.CharField(_("Auth user"), max_length=255)
-    valid_until = models.DateTimeField(_("Valid until"))
+    valid_until = models.DateTimeField(_("Valid until"), db_index=True)
     created = models.DateTimeField(_("Date created"), default=timezone.now)
+    digest = models.CharField(
+        _("Digest"), max_length=32, unique=True, editable=False
+    )
 
     class Meta:
         """Meta class."""
 
         verbose_name = _("Token")
         verbose_name_plural = _("Tokens")
-        unique_together = (("signature", "auth_user", "valid_until"),)
 
     def __str__(self):
         return f"{self.signature}{self.auth_user}{self.valid_until}"
+
+    def save(self, *args, **kwargs):
+        """Save, updating the digest."""
+        self.digest = make_signature_digest(
+            self.signature, self.auth_user, self.valid_until
+        )
+        super().save(*args, **kwargs)
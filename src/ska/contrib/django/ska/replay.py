@@ -0,0 +1,464 @@
+"""
+Replay protection of the authentication backends.
+
+- ``ModelReplayStore``: Replay store (see ``ska.replay``) backed by the
+  ``Signature`` model. Stores each signature used and (if ``check`` is set)
+  rejects signatures already stored. Signatures are unique by the
+  ``digest`` column: checked signatures are inserted one by one with a
+  conflict-ignoring ``INSERT`` (already stored ones being told by the number
+  of rows inserted), others in bulk (``bulk_create(ignore_conflicts=True)``).
+- ``BufferedModelReplayStore``: Write-behind (audit only) variant of the
+  ``ModelReplayStore``. Signatures are buffered in-process and stored in
+  bulk by a background thread.
+- ``replay_store``: Replay store used by the authentication backends. The
+  store given (as a dotted path) in ``SKA_REPLAY_STORE``, if set. Otherwise,
+  a ``ModelReplayStore`` if ``SKA_DB_STORE_SIGNATURES`` is set (checking
+  signatures if ``SKA_DB_PERFORM_SIGNATURE_CHECK`` is set), None if not.
+  In audit only mode (signatures stored, not checked), a
+  ``BufferedModelReplayStore`` if ``SKA_DB_WRITE_BEHIND`` is set.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from typing import (
+    Deque,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from asgiref.sync import sync_to_async
+from django.db import (
+    IntegrityError,
+    close_old_connections,
+    connections,
+    router,
+    transaction,
+)
+from django.utils.module_loading import import_string
+
+from ....base import AbstractSignature
+from ....replay import ReplayStore
+from ....signatures import Signature
+from .models import Signature as SignatureModel
+from .models import make_signature_digest
+from .settings import (
+    DB_PERFORM_SIGNATURE_CHECK,
+    DB_STORE_SIGNATURES,
+    DB_WRITE_BEHIND,
+    DB_WRITE_BEHIND_BATCH_SIZE,
+    DB_WRITE_BEHIND_BUFFER_SIZE,
+    DB_WRITE_BEHIND_FLUSH_INTERVAL,
+    REPLAY_STORE,
+)
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "INSERT_IGNORE_SQL",
+    "BufferInfo",
+    "BufferedModelReplayStore",
+    "ModelReplayStore",
+    "get_replay_store",
+    "replay_store",
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# Conflict-ignoring ``INSERT`` statements by database vendor. Formatted with
+# the (quoted) table, columns, value placeholders and the unique column.
+INSERT_IGNORE_SQL = {
+    "postgresql": (
+        "INSERT INTO {table} ({columns}) VALUES ({values}) "
+        "ON CONFLICT ({target}) DO NOTHING"
+    ),
+    "sqlite": (
+        "INSERT INTO {table} ({columns}) VALUES ({values}) "
+        "ON CONFLICT ({target}) DO NOTHING"
+    ),
+    "mysql": "INSERT IGNORE INTO {table} ({columns}) VALUES ({values})",
+}
+
+
+class ModelReplayStore(ReplayStore):
+    """Replay store backed by the ``Signature`` model.
+
+    :param check: If set to False, signatures are stored (for audit) but
+        never rejected.
+    :param signature_cls: Signature class (to convert ``valid_until``).
+    """
+
+    def __init__(
+        self,
+        check: bool = True,
+        signature_cls: Type[AbstractSignature] = Signature,
+    ) -> None:
+        """Constructor."""
+        super().__init__()
+        self.check = check
+        self.signature_cls = signature_cls
+
+    def make_signature(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> SignatureModel:
+        """Make (unsaved) signature model instance."""
+        if isinstance(signature, bytes):
+            signature = signature.decode()
+        valid_until = self.signature_cls.unix_timestamp_to_date(valid_until)
+        return SignatureModel(
+            auth_user=auth_user,
+            signature=signature,
+            valid_until=valid_until,
+            digest=make_signature_digest(signature, auth_user, valid_until),
+        )
+
+    def insert(self, tokens: List[SignatureModel]) -> None:
+        """Insert signature model instances, skipping the stored ones.
+
+        :param tokens:
+        """
+        using = router.db_for_write(SignatureModel)
+        if connections[using].features.supports_ignore_conflicts:
+            SignatureModel._default_manager.using(using).bulk_create(
+                tokens, ignore_conflicts=True
+            )
+            return
+
+        for token in tokens:
+            self.insert_one(token, using=using)
+
+    @staticmethod
+    def insert_one(token: SignatureModel, using: Optional[str] = None) -> bool:
+        """Insert signature model instance.
+
+        Relies on the unique ``digest`` column, so that concurrent inserts
+        of the same signature are told apart. Done with a conflict-ignoring
+        ``INSERT`` (see ``INSERT_IGNORE_SQL``), already stored signatures
+        being told by the number of rows inserted. On other databases, the
+        row is saved in a savepoint and ``IntegrityError`` caught.
+
+        :param token:
+        :param using: Database alias.
+        :return: False if the signature has already been stored.
+        """
+        if using is None:
+            using = router.db_for_write(SignatureModel)
+        connection = connections[using]
+        sql = INSERT_IGNORE_SQL.get(connection.vendor)
+
+        if sql is None:
+            try:
+                with transaction.atomic(using=using):
+                    token.save(using=using, force_insert=True)
+            except IntegrityError:
+                return False
+            return True
+
+        quote_name = connection.ops.quote_name
+        fields = [
+            field
+            for field in SignatureModel._meta.concrete_fields
+            if not field.primary_key
+        ]
+        sql = sql.format(
+            table=quote_name(SignatureModel._meta.db_table),
+            columns=", ".join(quote_name(field.column) for field in fields),
+            values=", ".join(["%s"] * len(fields)),
+            target=quote_name(SignatureModel._meta.get_field("digest").column),
+        )
+        params = [
+            field.get_db_prep_save(field.pre_save(token, True), connection)
+            for field in fields
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount == 1
+
+    def add(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Store the signature given.
+
+        :return: False if the signature has already been stored (and
+            ``check`` is set). True otherwise.
+        """
+        token = self.make_signature(signature, auth_user, valid_until)
+        if self.check:
+            return self.insert_one(token)
+        self.insert([token])
+        return True
+
+    async def aadd(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Store the signature given (async).
+
+        :return: See ``add``.
+        """
+        return await sync_to_async(self.add)(signature, auth_user, valid_until)
+
+    def add_many(
+        self, items: Iterable[Tuple[Union[str, bytes], str, Union[str, float]]]
+    ) -> List[bool]:
+        """Store many signatures.
+
+        Unless ``check`` is set, all signatures are stored at once.
+
+        :param items: Iterable of (signature, auth_user, valid_until).
+        :return: List of results (see ``add``).
+        """
+        if self.check:
+            return super().add_many(items)
+        tokens = [self.make_signature(*item) for item in items]
+        self.insert(tokens)
+        return [True] * len(tokens)
+
+    def clear(self) -> None:
+        """Delete all stored signatures."""
+        SignatureModel._default_manager.all().delete()
+
+
+class BufferInfo(NamedTuple):
+    """Write-behind buffer statistics."""
+
+    enqueued: int
+    flushed: int
+    failed: int
+    blocked: int
+    currsize: int
+    maxsize: int
+
+
+class BufferedModelReplayStore(ModelReplayStore):
+    """Write-behind (audit only) replay store backed by the ``Signature``
+    model.
+
+    Signatures are never rejected. They are buffered in-process and stored
+    in bulk by a background thread, once ``batch_size`` signatures are
+    buffered or every ``flush_interval`` seconds, so storing them adds no
+    database round trip to the request. When the buffer is full, ``add``
+    waits for the background thread to make room. The buffer is flushed on
+    interpreter exit (and by ``close``), by the process it was filled in
+    only. Signatures failed to be stored are
+    logged and dropped.
+
+    :param max_size: Max number of buffered signatures.
+    :param batch_size: Number of buffered signatures, which triggers a
+        flush. Also the max number of signatures inserted at once.
+    :param flush_interval: Max number of seconds signatures stay buffered.
+    :param signature_cls: Signature class (to convert ``valid_until``).
+    """
+
+    def __init__(
+        self,
+        max_size: int = DB_WRITE_BEHIND_BUFFER_SIZE,
+        batch_size: int = DB_WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = DB_WRITE_BEHIND_FLUSH_INTERVAL,
+        signature_cls: Type[AbstractSignature] = Signature,
+    ) -> None:
+        """Constructor."""
+        super().__init__(check=False, signature_cls=signature_cls)
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.blocked = 0
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self) -> None:
+        # Called again in forked processes: the buffer copied belongs to
+        # (and is flushed by) the parent, the thread is not copied at all.
+        self._pid = os.getpid()
+        self._buffer: Deque[SignatureModel] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: (
+                        self._closed or len(self._buffer) >= self.batch_size
+                    ),
+                    timeout=self.flush_interval,
+                )
+                if self._closed:
+                    return
+            self.flush()
+            close_old_connections()
+
+    def add(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Buffer the signature given.
+
+        Once closed, signatures are stored right away.
+
+        :return: True.
+        """
+        token = self.make_signature(signature, auth_user, valid_until)
+        if self._pid != os.getpid():
+            self._reset()
+
+        with self._condition:
+            if not self._closed and len(self._buffer) >= self.max_size:
+                self.blocked += 1
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._buffer) < self.max_size
+                )
+            if not self._closed:
+                self._buffer.append(token)
+                self.enqueued += 1
+                if len(self._buffer) >= self.batch_size:
+                    self._condition.notify_all()
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="ska-write-behind", daemon=True
+                    )
+                    self._thread.start()
+                return True
+
+        self.insert([token])
+        return True
+
+    async def aadd(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Buffer the signature given (async).
+
+        Waits for room in a worker thread, if the buffer is full.
+
+        :return: True.
+        """
+        if not self._closed and len(self._buffer) < self.max_size:
+            return self.add(signature, auth_user, valid_until)
+        return await sync_to_async(self.add)(signature, auth_user, valid_until)
+
+    def add_many(
+        self, items: Iterable[Tuple[Union[str, bytes], str, Union[str, float]]]
+    ) -> List[bool]:
+        """Buffer many signatures.
+
+        :param items: Iterable of (signature, auth_user, valid_until).
+        :return: List of results (see ``add``).
+        """
+        return [self.add(*item) for item in items]
+
+    def flush(self) -> None:
+        """Store the signatures buffered (in batches of ``batch_size``).
+
+        Signatures buffered meanwhile are left for the next flush.
+        """
+        with self._flush_lock:
+            with self._condition:
+                pending = len(self._buffer)
+            while pending > 0:
+                with self._condition:
+                    batch = [
+                        self._buffer.popleft()
+                        for __ in range(
+                            min(self.batch_size, pending, len(self._buffer))
+                        )
+                    ]
+                if not batch:
+                    return
+                pending -= len(batch)
+
+                try:
+                    self.insert(batch)
+                except Exception as err:
+                    LOGGER.exception(
+                        "Failed to store %s signatures: %s", len(batch), err
+                    )
+                    flushed, failed = 0, len(batch)
+                else:
+                    flushed, failed = len(batch), 0
+
+                with self._condition:
+                    self.flushed += flushed
+                    self.failed += failed
+                    self._condition.notify_all()
+
+    def close(self) -> None:
+        """Stop the background thread and flush the buffer.
+
+        In forked processes, the buffer copied from the parent is dropped
+        (it's flushed by the parent).
+        """
+        if self._pid != os.getpid():
+            self._reset()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+
+    def info(self) -> BufferInfo:
+        """Buffer statistics.
+
+        :return:
+        """
+        with self._condition:
+            return BufferInfo(
+                self.enqueued,
+                self.flushed,
+                self.failed,
+                self.blocked,
+                len(self._buffer),
+                self.max_size,
+            )
+
+    def clear(self) -> None:
+        """Drop the buffered and delete all stored signatures."""
+        with self._condition:
+            self._buffer.clear()
+            self._condition.notify_all()
+        super().clear()
+
+
+def get_replay_store() -> Optional[ReplayStore]:
+    """Get the replay store configured in settings.
+
+    :return:
+    """
+    if REPLAY_STORE:
+        return import_string(REPLAY_STORE)
+    if DB_STORE_SIGNATURES:
+        if DB_WRITE_BEHIND and not DB_PERFORM_SIGNATURE_CHECK:
+            return BufferedModelReplayStore()
+        return ModelReplayStore(check=DB_PERFORM_SIGNATURE_CHECK)
+    return None
+
+
+replay_store: Optional[ReplayStore] = get_replay_store()
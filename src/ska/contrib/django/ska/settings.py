@@ -7,7 +7,8 @@
 - `AUTH_USER` (str): Default ``auth_user`` for ``ska.sign_url`` function.
   Defaults to "ska-auth-user".
 - `SECRET_KEY` (str): The shared secret key. Should be defined in `settings`
-  module as ``SKA_SECRET_KEY``.
+  module as ``SKA_SECRET_KEY``. Can be a ``ska.keyring.KeyRing`` (as well as
+  the 'SECRET_KEY' of the providers), to rotate keys without downtime.
 - `USER_GET_CALLBACK` (str): User get callback (when user is fetched in auth
   backend).
 - `USER_VALIDATE_CALLBACK` (str): User validate callback (fired before user is
@@ -16,17 +17,67 @@
 - `USER_CREATE_CALLBACK` (str): User create callback (when user is created in
   auth backend).
 - `USER_INFO_CALLBACK` (str): User info callback.
+- `DEFERRED_CALLBACKS` (bool): If set to True, the user get, create and
+  info callbacks of the authentication backends are run in a thread pool
+  (once the transaction, if any, is committed) instead of inline. The
+  user validate callback is always run inline.
+- `DEFERRED_CALLBACKS_WORKERS` (int): Number of threads running deferred
+  callbacks.
+- `DEFERRED_CALLBACKS_QUEUE_SIZE` (int): Max number of pending deferred
+  callbacks. Once reached, callbacks are run inline.
+- `DEFERRED_CALLBACKS_TIMEOUT` (float): Number of seconds after which
+  deferred callbacks are reported as slow. Also the max number of seconds
+  pending callbacks are waited for on shutdown.
 - `REDIRECT_AFTER_LOGIN` (str): Redirect after login.
 - `DB_STORE_SIGNATURES` (bool): If set to True, signatures are stored in the
   database.
 - `DB_PERFORM_SIGNATURE_CHECK` (bool): If set to True, an extra check is fired
   on whether the token has already been used or not.
+- `DB_WRITE_BEHIND` (bool): If set to True (and ``DB_STORE_SIGNATURES`` is
+  set, but ``DB_PERFORM_SIGNATURE_CHECK`` is not), signatures are buffered
+  in-process and stored in bulk by a background thread (see
+  ``ska.contrib.django.ska.replay.BufferedModelReplayStore``).
+- `DB_WRITE_BEHIND_BUFFER_SIZE` (int): Max number of buffered signatures.
+  Logins wait for room when the buffer is full.
+- `DB_WRITE_BEHIND_BATCH_SIZE` (int): Number of buffered signatures, which
+  triggers a flush.
+- `DB_WRITE_BEHIND_FLUSH_INTERVAL` (float): Max number of seconds signatures
+  stay buffered.
 - `PROVIDERS` (dict): A dictionary where key is the provider UID and the key
   is another dictionary holding the following provider specific keys:
   'SECRET_KEY', 'USER_GET_CALLBACK', 'USER_CREATE_CALLBACK',
   'USER_INFO_CALLBACK', 'REDIRECT_AFTER_LOGIN'. Note, that the 'SECRET_KEY'
   is a required key. The rest are optional, and if given, override
   respectively the values of ``ska.contrib.django.ska.settings``.
+- `VALIDATION_CACHE_SIZE` (int): Max number of successful validations
+  cached (until the signature expires) by the ``validate_signed_request``
+  and ``m_validate_signed_request`` decorators. 0 disables the cache.
+- `NEGATIVE_CACHE_SIZE` (int): Max number of recently failed validations
+  (invalid signatures) cached by the ``validate_signed_request`` and
+  ``m_validate_signed_request`` decorators and the authentication backends.
+  0 disables the cache.
+- `NEGATIVE_CACHE_TTL` (int): Number of seconds failed validations are
+  cached.
+- `REPLAY_STORE` (str): Dotted path to a replay store (see ``ska.replay``)
+  instance used by the authentication backends to accept each signature
+  only once. If not set, signatures are stored in (and checked against) the
+  database, if ``DB_STORE_SIGNATURES`` (and ``DB_PERFORM_SIGNATURE_CHECK``)
+  are set.
+- `PURGE_BATCH_SIZE` (int): Number of expired signatures deleted at once
+  by ``purge_signature_data`` (and the ``ska_purge_stored_signature_data``
+  management command).
+- `CONSTANCE_SETTINGS_CACHE_TTL` (int): Number of seconds the
+  ``django-constance`` backed settings (``SKA_SECRET_KEY``,
+  ``SKA_PROVIDERS``) are cached in-process. 0 disables caching.
+- `USER_CACHE_SIZE` (int): Max number of users cached in-process (by
+  username and by pk) by the authentication backends. Cached users are
+  dropped when saved or deleted. 0 disables the cache.
+- `USER_CACHE_TTL` (int): Number of seconds users are cached.
+- `USER_ONLY_FIELDS` (tuple): Fields of the users loaded by the
+  authentication backends (``QuerySet.only``). If not set, all fields are
+  loaded.
+- `USER_SELECT_RELATED` (tuple): Relations of the users loaded along by the
+  authentication backends (``QuerySet.select_related``).
 """
 
 from django.conf import settings
@@ -40,17 +91,35 @@ __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
     "AUTH_USER",
+    "CONSTANCE_SETTINGS_CACHE_TTL",
     "DB_PERFORM_SIGNATURE_CHECK",
     "DB_STORE_SIGNATURES",
+    "DB_WRITE_BEHIND",
+    "DB_WRITE_BEHIND_BATCH_SIZE",
+    "DB_WRITE_BEHIND_BUFFER_SIZE",
+    "DB_WRITE_BEHIND_FLUSH_INTERVAL",
+    "DEFERRED_CALLBACKS",
+    "DEFERRED_CALLBACKS_QUEUE_SIZE",
+    "DEFERRED_CALLBACKS_TIMEOUT",
+    "DEFERRED_CALLBACKS_WORKERS",
+    "NEGATIVE_CACHE_SIZE",
+    "NEGATIVE_CACHE_TTL",
     "PROVIDERS",
+    "PURGE_BATCH_SIZE",
     "REDIRECT_AFTER_LOGIN",
+    "REPLAY_STORE",
     "SECRET_KEY",
     "UNAUTHORISED_REQUEST_ERROR_MESSAGE",
     "UNAUTHORISED_REQUEST_ERROR_TEMPLATE",
+    "USER_CACHE_SIZE",
+    "USER_CACHE_TTL",
     "USER_CREATE_CALLBACK",
     "USER_GET_CALLBACK",
     "USER_INFO_CALLBACK",
+    "USER_ONLY_FIELDS",
+    "USER_SELECT_RELATED",
     "USER_VALIDATE_CALLBACK",
+    "VALIDATION_CACHE_SIZE",
 )
 
 UNAUTHORISED_REQUEST_ERROR_MESSAGE = get_setting(
@@ -77,11 +146,34 @@ USER_CREATE_CALLBACK = get_setting("USER_CREATE_CALLBACK")
 USER_INFO_CALLBACK = get_setting("USER_INFO_CALLBACK")
 REDIRECT_AFTER_LOGIN = get_setting("REDIRECT_AFTER_LOGIN")
 
+DEFERRED_CALLBACKS = get_setting("DEFERRED_CALLBACKS")
+DEFERRED_CALLBACKS_WORKERS = get_setting("DEFERRED_CALLBACKS_WORKERS")
+DEFERRED_CALLBACKS_QUEUE_SIZE = get_setting("DEFERRED_CALLBACKS_QUEUE_SIZE")
+DEFERRED_CALLBACKS_TIMEOUT = get_setting("DEFERRED_CALLBACKS_TIMEOUT")
+
 DB_STORE_SIGNATURES = get_setting("DB_STORE_SIGNATURES")
 DB_PERFORM_SIGNATURE_CHECK = get_setting("DB_PERFORM_SIGNATURE_CHECK")
+DB_WRITE_BEHIND = get_setting("DB_WRITE_BEHIND")
+DB_WRITE_BEHIND_BUFFER_SIZE = get_setting("DB_WRITE_BEHIND_BUFFER_SIZE")
+DB_WRITE_BEHIND_BATCH_SIZE = get_setting("DB_WRITE_BEHIND_BATCH_SIZE")
+DB_WRITE_BEHIND_FLUSH_INTERVAL = get_setting("DB_WRITE_BEHIND_FLUSH_INTERVAL")
+REPLAY_STORE = get_setting("REPLAY_STORE")
+PURGE_BATCH_SIZE = get_setting("PURGE_BATCH_SIZE")
 
 PROVIDERS = get_setting("PROVIDERS")
 
+VALIDATION_CACHE_SIZE = get_setting("VALIDATION_CACHE_SIZE")
+
+NEGATIVE_CACHE_SIZE = get_setting("NEGATIVE_CACHE_SIZE")
+NEGATIVE_CACHE_TTL = get_setting("NEGATIVE_CACHE_TTL")
+
+CONSTANCE_SETTINGS_CACHE_TTL = get_setting("CONSTANCE_SETTINGS_CACHE_TTL")
+
+USER_CACHE_SIZE = get_setting("USER_CACHE_SIZE")
+USER_CACHE_TTL = get_setting("USER_CACHE_TTL")
+USER_ONLY_FIELDS = get_setting("USER_ONLY_FIELDS")
+USER_SELECT_RELATED = get_setting("USER_SELECT_RELATED")
+
 
 def validate_providers():
     """Validate providers set in Django `settings` module of the project."""
@@ -4,22 +4,34 @@ import time
 
 import mock
 import pytest
+from asgiref.sync import async_to_sync
 from constance import config
+from constance.signals import config_updated
 from constance.test import override_config
 from django.core import mail
 from django.core.management import call_command
-from django.test import Client, TransactionTestCase, override_settings
+from django.test import (
+    Client,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
 
 import factories
 from ska import sign_url
+from ska.clocks import FrozenClock
 from ska.contrib.django.ska import settings as ska_settings
+from ska.contrib.django.ska.integration.constance_integration import caches
 from ska.contrib.django.ska.models import Signature
 from ska.defaults import DEFAULT_PROVIDER_PARAM
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
-__all__ = ("SkaAuthenticationConstanceBackendTest",)
+__all__ = (
+    "ConstanceSettingsTest",
+    "SkaAuthenticationConstanceBackendTest",
+)
 
 # *********************************************************************
 # *********************************************************************
@@ -298,3 +310,77 @@ class SkaAuthenticationConstanceBackendTest(TransactionTestCase):
         call_command("ska_purge_stored_signature_data")
         # All old records shall be gone
         self.assertEqual(Signature.objects.all().count(), 0)
+
+
+class ConstanceSettingsTest(SimpleTestCase):
+    """Tests of the in-process cache of constance settings."""
+
+    def setUp(self):
+        self.clock = FrozenClock(1378045000.0)
+        self.config = mock.Mock(
+            SKA_PROVIDERS={"provider": {"SECRET_KEY": "provider-secret"}},
+        )
+        self.reads = mock.PropertyMock(return_value="secret")
+        type(self.config).SKA_SECRET_KEY = self.reads
+
+    def test_01_ttl(self):
+        """Settings are read from the config store once per TTL."""
+        constance_settings = caches.ConstanceSettings(ttl=5, clock=self.clock)
+        with mock.patch.object(caches, "config", self.config):
+            for __ in range(3):
+                self.assertEqual(constance_settings.get_secret_key(), "secret")
+                self.assertEqual(
+                    constance_settings.get_providers()["provider"],
+                    {"SECRET_KEY": "provider-secret"},
+                )
+            self.assertEqual(self.reads.call_count, 1)
+
+            self.clock.timestamp += 5
+            constance_settings.get_secret_key()
+            self.assertEqual(self.reads.call_count, 2)
+
+    def test_02_invalidation(self):
+        """Changes made through constance invalidate the cache."""
+        constance_settings = caches.ConstanceSettings(ttl=5, clock=self.clock)
+        config_updated.connect(constance_settings.invalidate)
+        self.addCleanup(
+            config_updated.disconnect, constance_settings.invalidate
+        )
+        with mock.patch.object(caches, "config", self.config):
+            constance_settings.get_secret_key()
+
+            # Other keys are ignored
+            config_updated.send(sender=None, key="OTHER", new_value=1)
+            constance_settings.get_secret_key()
+            self.assertEqual(self.reads.call_count, 1)
+
+            config_updated.send(
+                sender=None, key="SKA_SECRET_KEY", new_value="new-secret"
+            )
+            self.reads.return_value = "new-secret"
+            self.assertEqual(constance_settings.get_secret_key(), "new-secret")
+            self.assertEqual(constance_settings.version, 1)
+
+    def test_03_disabled(self):
+        """Settings are read on each call, if caching is disabled."""
+        constance_settings = caches.ConstanceSettings(ttl=0, clock=self.clock)
+        with mock.patch.object(caches, "config", self.config):
+            for __ in range(3):
+                constance_settings.get_secret_key()
+            self.assertEqual(self.reads.call_count, 3)
+
+    def test_04_async(self):
+        """Fresh settings are served to async code without a thread hop."""
+        constance_settings = caches.ConstanceSettings(ttl=5, clock=self.clock)
+        with mock.patch.object(caches, "config", self.config):
+            self.assertEqual(
+                async_to_sync(constance_settings.aget_secret_key)(), "secret"
+            )
+            with mock.patch.object(
+                caches, "sync_to_async", side_effect=AssertionError
+            ):
+                self.assertEqual(
+                    async_to_sync(constance_settings.aget_providers)(),
+                    {"provider": {"SECRET_KEY": "provider-secret"}},
+                )
+            self.assertEqual(self.reads.call_count, 1)
@@ -1,10 +1,19 @@
+import inspect
 import logging
 
+import mock
 import pytest
-from django.test import Client, TransactionTestCase
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TransactionTestCase
 
 import factories
 
+from .....caches import ValidationCache
+from .....shortcuts import sign_url
+from .....signatures import Signature
+from ..decorators import m_validate_signed_request, validate_signed_request
+from ..settings import SECRET_KEY
 from .helpers import NUM_ITEMS, generate_data
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -141,3 +150,57 @@ class SkaDecoratorsTest(TransactionTestCase):
         LOGGER.debug(("Response content for unsigned URL", response_content))
 
         return flow
+
+    def test_06_view_decorator_validation_cache(self):
+        """Test view decorator with validation cache."""
+        cache = ValidationCache(maxsize=10)
+
+        @validate_signed_request(cache=cache)
+        def view(request):
+            return HttpResponse("OK")
+
+        signed_url = sign_url(
+            auth_user="user", secret_key=SECRET_KEY, url="/items/"
+        )
+        request_factory = RequestFactory()
+
+        with mock.patch.object(
+            Signature,
+            "validate_signature",
+            wraps=Signature.validate_signature,
+        ) as validate_signature:
+            for __ in range(3):
+                response = view(request_factory.get(signed_url))
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(validate_signature.call_count, 1)
+
+        self.assertEqual(cache.info().hits, 2)
+        self.assertEqual(cache.info().currsize, 1)
+
+        # Tampered URLs are not served from cache
+        response = view(request_factory.get(signed_url + "&auth_user=admin"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_07_async_view_decorators(self):
+        """Test view decorators with async views."""
+
+        @validate_signed_request()
+        async def view(request):
+            return HttpResponse("OK")
+
+        class View:
+            @m_validate_signed_request()
+            async def get(self, request):
+                return HttpResponse("OK")
+
+        signed_url = sign_url(
+            auth_user="user", secret_key=SECRET_KEY, url="/items/"
+        )
+        request_factory = RequestFactory()
+
+        for func in (view, View().get):
+            self.assertTrue(inspect.iscoroutinefunction(func))
+            response = async_to_sync(func)(request_factory.get(signed_url))
+            self.assertEqual(response.status_code, 200)
+            response = async_to_sync(func)(request_factory.get("/items/"))
+            self.assertEqual(response.status_code, 401)
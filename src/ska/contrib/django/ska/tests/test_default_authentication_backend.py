@@ -1,23 +1,64 @@
 import datetime
+import importlib
 import logging
+import threading
 import time
+from io import StringIO
 
 import mock
 import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
 from django.core import mail
 from django.core.management import call_command
-from django.test import Client, TransactionTestCase, override_settings
+from django.db import transaction
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework.request import Request
 
 import factories
-from ska import sign_url
+from foo import ska_callbacks
+from ska import Signature as SkaSignature
+from ska import Validator, sign_url
+from ska.caches import NegativeCache
+from ska.clocks import FrozenClock
 from ska.contrib.django.ska import settings as ska_settings
-from ska.contrib.django.ska.models import Signature
+from ska.contrib.django.ska.backends import SkaAuthenticationBackend
+from ska.contrib.django.ska.callbacks import (
+    CallbackDispatcher,
+    CallbackRegistry,
+)
+from ska.contrib.django.ska.context import get_validation_context
+from ska.contrib.django.ska.models import Signature, make_signature_digest
+from ska.contrib.django.ska.replay import (
+    INSERT_IGNORE_SQL,
+    BufferedModelReplayStore,
+    ModelReplayStore,
+)
+from ska.contrib.django.ska.users import UserCache, UserResolver
+from ska.contrib.django.ska.utils import (
+    get_provider_data,
+    purge_signature_data,
+)
 from ska.defaults import DEFAULT_PROVIDER_PARAM
+from ska.exceptions import ImproperlyConfigured
+from ska.replay import MemoryReplayStore
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
-__all__ = ("SkaAuthenticationBackendTest",)
+__all__ = (
+    "CallbackDispatcherTest",
+    "CallbackRegistryTest",
+    "SkaAuthenticationBackendTest",
+    "UserResolverTest",
+    "ValidationContextTest",
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -319,3 +360,611 @@ class SkaAuthenticationBackendTest(TransactionTestCase):
             auth_user="forbidden_username",
             debug_info="test_08_provider_login_forbidden_username",
         )
+
+    def test_09_login_fail_negative_cache(self):
+        """Replays of invalid signatures are rejected from cache."""
+        negative_cache = NegativeCache(maxsize=10)
+        signed_url = sign_url(
+            auth_user=self.AUTH_USER,
+            secret_key="wrong-secret",
+            url=self.LOGIN_URL,
+        )
+        client = Client()
+
+        with mock.patch.object(
+            SkaAuthenticationBackend, "negative_cache", negative_cache
+        ), mock.patch.object(
+            SkaSignature,
+            "validate_signature",
+            wraps=SkaSignature.validate_signature,
+        ) as validate_signature:
+            for __ in range(3):
+                response = client.get(signed_url)
+                self.assertEqual(response.status_code, 403)
+            self.assertEqual(validate_signature.call_count, 1)
+
+        self.assertEqual(negative_cache.info().hits, 2)
+
+    def test_10_aauthenticate(self):
+        """Test async authentication (and async provider callbacks)."""
+        backend = SkaAuthenticationBackend()
+        request_factory = RequestFactory()
+        extra = {
+            "email": self.AUTH_USER_EMAIL,
+            "first_name": self.AUTH_USER_FIRST_NAME,
+            "last_name": self.AUTH_USER_LAST_NAME,
+            DEFAULT_PROVIDER_PARAM: self.PROVIDER_NAME,
+        }
+        calls = []
+
+        async def user_info_callback(user, request, signed_request_data):
+            calls.append(user.username)
+
+        provider_settings = {
+            self.PROVIDER_NAME: {
+                "SECRET_KEY": "provider-secret-key",
+                "USER_INFO_CALLBACK": user_info_callback,
+            },
+        }
+
+        with mock.patch.object(
+            SkaAuthenticationBackend,
+            "get_settings",
+            return_value=provider_settings,
+        ):
+            for i in range(2):
+                signed_url = sign_url(
+                    auth_user=self.AUTH_USER,
+                    secret_key="provider-secret-key",
+                    valid_until=time.time() + 600 + i,
+                    url=self.LOGIN_URL,
+                    extra=extra,
+                )
+                user = async_to_sync(backend.aauthenticate)(
+                    request_factory.get(signed_url)
+                )
+                self.assertEqual(user.username, self.AUTH_USER)
+                self.assertEqual(user.email, self.AUTH_USER_EMAIL)
+
+            # Wrong key
+            signed_url = sign_url(
+                auth_user=self.AUTH_USER,
+                secret_key="wrong-secret-key",
+                url=self.LOGIN_URL,
+                extra={DEFAULT_PROVIDER_PARAM: self.PROVIDER_NAME},
+            )
+            self.assertIsNone(
+                async_to_sync(backend.aauthenticate)(
+                    request_factory.get(signed_url)
+                )
+            )
+
+        self.assertEqual(calls, [self.AUTH_USER, self.AUTH_USER])
+        self.assertEqual(
+            async_to_sync(backend.aget_user)(user.pk).username, self.AUTH_USER
+        )
+        self.assertIsNone(async_to_sync(backend.aget_user)(0))
+
+    def test_11_replay_store(self):
+        """Signatures are accepted once by the configured replay store."""
+        replay_store = MemoryReplayStore()
+        signed_url = sign_url(
+            auth_user=self.AUTH_USER,
+            secret_key=ska_settings.SECRET_KEY,
+            url=self.LOGIN_URL,
+        )
+
+        with mock.patch.object(
+            SkaAuthenticationBackend, "replay_store", replay_store
+        ):
+            response = Client().get(signed_url)
+            self.assertEqual(response.status_code, 302)
+            response = Client().get(signed_url)
+            self.assertEqual(response.status_code, 403)
+
+        self.assertEqual(len(replay_store), 1)
+        self.assertEqual(Signature.objects.count(), 0)
+
+    def test_12_model_replay_store_audit(self):
+        """Signatures are stored, but not checked, in audit mode."""
+        replay_store = ModelReplayStore(check=False)
+        valid_until = time.time() + 600
+        for __ in range(2):
+            self.assertTrue(
+                replay_store.add("signature", self.AUTH_USER, valid_until)
+            )
+        self.assertEqual(Signature.objects.count(), 1)
+
+        replay_store = ModelReplayStore()
+        self.assertFalse(
+            replay_store.add("signature", self.AUTH_USER, valid_until)
+        )
+
+    def test_13_model_replay_store_digest(self):
+        """Stored signatures are told by digest, conflicts are skipped."""
+        replay_store = ModelReplayStore(check=False)
+        valid_until = time.time() + 600
+        self.assertEqual(
+            replay_store.add_many(
+                [
+                    ("signature", self.AUTH_USER, valid_until),
+                    ("signature", self.AUTH_USER, valid_until),
+                    ("signature", "other", valid_until),
+                ]
+            ),
+            [True] * 3,
+        )
+        self.assertEqual(Signature.objects.count(), 2)
+
+        signature = Signature.objects.get(auth_user=self.AUTH_USER)
+        self.assertEqual(len(signature.digest), 32)
+        self.assertEqual(
+            signature.digest,
+            make_signature_digest(
+                "signature", self.AUTH_USER, signature.valid_until
+            ),
+        )
+
+        # The backfill migration keeps a frozen copy of the digest.
+        backfill_migration = importlib.import_module(
+            "ska.contrib.django.ska.migrations.0004_backfill_signature_digest"
+        )
+        self.assertEqual(
+            signature.digest,
+            backfill_migration.make_signature_digest(
+                "signature", self.AUTH_USER, signature.valid_until
+            ),
+        )
+
+        # Inserts do not break the outer transaction on conflicts.
+        replay_store = ModelReplayStore()
+        with transaction.atomic():
+            self.assertFalse(
+                replay_store.add("signature", "other", valid_until)
+            )
+            self.assertTrue(replay_store.add("other", "other", valid_until))
+        self.assertEqual(Signature.objects.count(), 3)
+
+    def test_14_buffered_model_replay_store(self):
+        """Signatures are stored in the background, in batches."""
+        replay_store = BufferedModelReplayStore(
+            max_size=4, batch_size=2, flush_interval=60
+        )
+        self.addCleanup(replay_store.close)
+        valid_until = time.time() + 600
+
+        # The second signature fills a batch.
+        for i in range(2):
+            self.assertTrue(
+                replay_store.add(f"signature-{i}", self.AUTH_USER, valid_until)
+            )
+        for __ in range(100):
+            if replay_store.info().flushed == 2:
+                break
+            time.sleep(0.05)
+        self.assertEqual(replay_store.info().flushed, 2)
+        self.assertEqual(Signature.objects.count(), 2)
+
+        replay_store.add("signature-2", self.AUTH_USER, valid_until)
+        self.assertEqual(replay_store.info().currsize, 1)
+        self.assertEqual(Signature.objects.count(), 2)
+
+        # Flushed on close, stored right away once closed.
+        replay_store.close()
+        self.assertTrue(
+            replay_store.add("signature-3", self.AUTH_USER, valid_until)
+        )
+        self.assertEqual(Signature.objects.count(), 4)
+        self.assertEqual(replay_store.info()[:4], (3, 3, 0, 0))
+
+    def test_15_buffered_model_replay_store_backpressure(self):
+        """Signatures wait for room when the buffer is full."""
+        replay_store = BufferedModelReplayStore(
+            max_size=1, batch_size=10, flush_interval=0.05
+        )
+        self.addCleanup(replay_store.close)
+        valid_until = time.time() + 600
+
+        for i in range(3):
+            replay_store.add(f"signature-{i}", self.AUTH_USER, valid_until)
+        replay_store.close()
+
+        info = replay_store.info()
+        self.assertEqual(info.blocked, 2)
+        self.assertEqual(info.flushed, 3)
+        self.assertEqual(info.currsize, 0)
+        self.assertEqual(Signature.objects.count(), 3)
+
+    def test_16_purge_signature_data_in_batches(self):
+        """Expired signatures are purged in batches."""
+        now = datetime.datetime.now()
+        for i in range(7):
+            Signature.objects.create(
+                signature=f"expired-{i}",
+                auth_user=self.AUTH_USER,
+                valid_until=now - datetime.timedelta(minutes=20),
+            )
+        Signature.objects.create(
+            signature="valid",
+            auth_user=self.AUTH_USER,
+            valid_until=now + datetime.timedelta(minutes=20),
+        )
+
+        self.assertEqual(purge_signature_data(dry_run=True), 7)
+        self.assertEqual(Signature.objects.count(), 8)
+
+        # The time budget is exhausted after the first batch.
+        self.assertEqual(purge_signature_data(batch_size=3, time_budget=0), 3)
+        self.assertEqual(Signature.objects.count(), 5)
+
+        progress = []
+        self.assertEqual(
+            purge_signature_data(batch_size=3, progress=progress.append), 4
+        )
+        self.assertEqual(progress, [3, 4])
+        self.assertEqual(
+            list(Signature.objects.values_list("signature", flat=True)),
+            ["valid"],
+        )
+
+        stdout = StringIO()
+        call_command(
+            "ska_purge_stored_signature_data", "--dry-run", stdout=stdout
+        )
+        self.assertIn("0 signatures to be purged.", stdout.getvalue())
+
+    def test_17_buffered_model_replay_store_fork(self):
+        """Forked processes do not flush the buffer copied on exit."""
+        replay_store = BufferedModelReplayStore(
+            max_size=4, batch_size=10, flush_interval=60
+        )
+        self.addCleanup(replay_store.close)
+        valid_until = time.time() + 600
+        replay_store.add("signature", self.AUTH_USER, valid_until)
+
+        with mock.patch("os.getpid", return_value=replay_store._pid + 1):
+            replay_store.close()
+        self.assertEqual(Signature.objects.count(), 0)
+        self.assertEqual(replay_store.info().currsize, 0)
+
+    def test_18_model_replay_store_insert_one(self):
+        """Signatures are inserted ignoring conflicts, with no savepoint."""
+        replay_store = ModelReplayStore()
+        valid_until = time.time() + 600
+        token = replay_store.make_signature(
+            "signature", self.AUTH_USER, valid_until
+        )
+        with mock.patch.object(transaction, "atomic") as atomic:
+            self.assertTrue(replay_store.insert_one(token))
+            self.assertFalse(replay_store.insert_one(token))
+        atomic.assert_not_called()
+
+        stored = Signature.objects.get()
+        self.assertEqual(stored.digest, token.digest)
+        self.assertEqual(stored.signature, "signature")
+        self.assertEqual(stored.auth_user, self.AUTH_USER)
+
+        # Savepoint fallback, on databases with no such insert.
+        token = replay_store.make_signature("other", "other", valid_until)
+        with mock.patch.dict(INSERT_IGNORE_SQL, clear=True):
+            self.assertTrue(replay_store.insert_one(token))
+            self.assertFalse(replay_store.insert_one(token))
+        self.assertEqual(Signature.objects.count(), 2)
+
+
+class CallbackRegistryTest(SimpleTestCase):
+    """Callback registry tests."""
+
+    def test_01_build(self):
+        """Callbacks of the providers are resolved at once."""
+        registry = CallbackRegistry()
+        registry.build()
+        self.assertTrue(len(registry))
+
+        provider_data = ska_settings.PROVIDERS["client_1.admins"]
+        with mock.patch(
+            "ska.contrib.django.ska.callbacks.get_callback_func"
+        ) as get_callback_func:
+            callback = registry.get_callback("USER_GET_CALLBACK", provider_data)
+        self.assertIs(callback, ska_callbacks.client1_admins_get)
+        get_callback_func.assert_not_called()
+
+        self.assertIsNone(registry.get_callback("USER_GET_CALLBACK", {}))
+
+    def test_02_build_invalid(self):
+        """Invalid callbacks are reported at once."""
+        registry = CallbackRegistry()
+        for path in ("foo.ska_callbacks.missing", "foo.missing.callback"):
+            with self.assertRaises(ImproperlyConfigured):
+                registry.build(
+                    {"client_1": {"USER_GET_CALLBACK": path}},
+                )
+
+    def test_03_resolved_on_first_use(self):
+        """Callbacks not known at startup are added and invalidated."""
+        registry = CallbackRegistry()
+        registry.build()
+        size = len(registry)
+        provider_data = {
+            "USER_INFO_CALLBACK": (
+                "foo.ska_callbacks.client1_admins_info_constance"
+            ),
+        }
+
+        callback = registry.get_callback("USER_INFO_CALLBACK", provider_data)
+        self.assertIs(callback, ska_callbacks.client1_admins_info_constance)
+        self.assertEqual(len(registry), size + 1)
+
+        # Invalid callbacks are not called (nor looked up again).
+        provider_data = {"USER_INFO_CALLBACK": "foo.ska_callbacks.missing"}
+        self.assertIsNone(
+            registry.get_callback("USER_INFO_CALLBACK", provider_data)
+        )
+        self.assertEqual(len(registry), size + 2)
+
+        registry.invalidate()
+        self.assertEqual(len(registry), size)
+
+
+@pytest.mark.django_db
+class UserResolverTest(TransactionTestCase):
+    """Tests of `ska.contrib.django.ska.users` module."""
+
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        self.clock = FrozenClock(time.time())
+        self.create_kwargs = SkaAuthenticationBackend.get_user_create_kwargs(
+            "resolved-user", {"email": "resolved@EXAMPLE.COM"}
+        )
+
+    def test_01_get_or_create(self):
+        """Users are created once, in one write."""
+        resolver = UserResolver()
+        with self.assertNumQueries(4):
+            # Get, savepoint, insert, release savepoint.
+            user, created = resolver.get_or_create(
+                "resolved-user", self.create_kwargs
+            )
+        self.assertTrue(created)
+        self.assertEqual(user.email, "resolved@example.com")
+        self.assertFalse(user.has_usable_password())
+
+        user, created = resolver.get_or_create(
+            "resolved-user", self.create_kwargs
+        )
+        self.assertFalse(created)
+        self.assertEqual(User.objects.filter(username=user.username).count(), 1)
+
+        self.assertEqual(
+            async_to_sync(resolver.aget)(user.pk).username, "resolved-user"
+        )
+        self.assertIsNone(resolver.get(0))
+
+    def test_02_only(self):
+        """Only the fields configured are loaded."""
+        resolver = UserResolver(only=("email",))
+        user, __ = resolver.get_or_create("resolved-user", self.create_kwargs)
+        user = resolver.get(user.pk)
+        self.assertIn("first_name", user.get_deferred_fields())
+        self.assertNotIn("email", user.get_deferred_fields())
+
+    def test_03_cache(self):
+        """Users are cached until saved (or expired)."""
+        cache = UserCache(maxsize=10, ttl=5, clock=self.clock)
+        resolver = UserResolver(cache=cache)
+        user, __ = resolver.get_or_create("resolved-user", self.create_kwargs)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.get(user.pk).pk, user.pk)
+            cached_user, created = async_to_sync(resolver.aget_or_create)(
+                "resolved-user", self.create_kwargs
+            )
+        self.assertFalse(created)
+        # Copies are returned.
+        self.assertIsNot(cached_user, resolver.get(user.pk))
+
+        user.first_name = "Jane"
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.get(user.pk).first_name, "Jane")
+        with self.assertNumQueries(0):
+            resolver.get(user.pk)
+
+        self.clock.timestamp += 5
+        with self.assertNumQueries(1):
+            resolver.get(user.pk)
+        self.assertEqual(cache.info().hits, 4)
+
+
+@pytest.mark.django_db
+class CallbackDispatcherTest(TransactionTestCase):
+    """Tests of `ska.contrib.django.ska.callbacks.CallbackDispatcher`."""
+
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        self.calls = []
+        self.dispatcher = CallbackDispatcher(workers=2, queue_size=10)
+        self.addCleanup(self.dispatcher.shutdown)
+
+    def callback(self, *args, **kwargs):
+        self.calls.append((threading.current_thread(), args, kwargs))
+
+    def failing_callback(self, *args, **kwargs):
+        raise ValueError("Callback failed")
+
+    def test_01_submit(self):
+        """Callbacks are run in the pool. Failures are counted."""
+        self.dispatcher.submit(self.callback, "user", request=None)
+        with self.assertLogs("ska.contrib.django.ska.callbacks", "ERROR"):
+            self.dispatcher.submit(self.failing_callback, "user")
+            self.assertTrue(self.dispatcher.drain(timeout=5))
+
+        [(thread, args, kwargs)] = self.calls
+        self.assertIsNot(thread, threading.current_thread())
+        self.assertEqual((args, kwargs), (("user",), {"request": None}))
+        self.assertEqual(self.dispatcher.info(), (2, 1, 1, 0, 0, 0))
+
+    def test_02_inline_and_slow(self):
+        """Callbacks are run inline when the queue is full."""
+        dispatcher = CallbackDispatcher(workers=1, queue_size=0, timeout=0)
+        self.addCleanup(dispatcher.shutdown)
+        with self.assertLogs("ska.contrib.django.ska.callbacks", "WARNING"):
+            dispatcher.submit(self.callback)
+        self.assertIs(self.calls[0][0], threading.current_thread())
+        info = dispatcher.info()
+        self.assertEqual((info.inline, info.slow, info.completed), (1, 1, 1))
+
+    def test_03_dispatch_on_commit(self):
+        """Callbacks are submitted once the transaction is committed."""
+        with transaction.atomic():
+            self.dispatcher.dispatch(self.callback, "committed")
+            self.assertEqual(self.dispatcher.info().submitted, 0)
+        try:
+            with transaction.atomic():
+                self.dispatcher.dispatch(self.callback, "rolled back")
+                raise ValueError
+        except ValueError:
+            pass
+        self.dispatcher.drain(timeout=5)
+        self.assertEqual(
+            [args for __, args, __ in self.calls], [("committed",)]
+        )
+
+    def test_04_authenticate(self):
+        """User callbacks of the backends are deferred, if set."""
+        provider_name = "client_1.admins"
+        signed_url = sign_url(
+            auth_user="deferred_callbacks_user",
+            secret_key=ska_settings.PROVIDERS[provider_name]["SECRET_KEY"],
+            url="/ska/login/",
+            extra={
+                "email": "deferred@example.com",
+                DEFAULT_PROVIDER_PARAM: provider_name,
+            },
+        )
+        with mock.patch.object(
+            SkaAuthenticationBackend, "callback_dispatcher", self.dispatcher
+        ):
+            response = Client().get(signed_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.dispatcher.drain(timeout=5))
+
+        # User create and user info callbacks.
+        info = self.dispatcher.info()
+        self.assertEqual((info.submitted, info.completed), (2, 2))
+        self.assertTrue(
+            User.objects.get(username="deferred_callbacks_user").is_superuser
+        )
+
+
+@pytest.mark.django_db
+class ValidationContextTest(TransactionTestCase):
+    """Tests of the request-scoped validation context."""
+
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        self.provider_name = "client_1.admins"
+        self.secret_key = ska_settings.PROVIDERS[self.provider_name][
+            "SECRET_KEY"
+        ]
+        self.signed_url = sign_url(
+            auth_user="validation_context_user",
+            secret_key=self.secret_key,
+            url="/ska/login/",
+            extra={
+                "email": "validation_context@example.com",
+                DEFAULT_PROVIDER_PARAM: self.provider_name,
+            },
+        )
+
+    def test_01_validate_once(self):
+        """Requests are validated once per secret key."""
+        request = RequestFactory().get(self.signed_url)
+        context = get_validation_context(request)
+        self.assertIs(get_validation_context(request), context)
+        self.assertIs(get_validation_context(Request(request)), context)
+
+        validator = Validator(self.secret_key)
+        with mock.patch.object(
+            SkaSignature,
+            "validate_signature",
+            wraps=SkaSignature.validate_signature,
+        ) as validate_signature:
+            validation_result = context.validate(validator)
+            self.assertTrue(validation_result.result)
+            self.assertIs(context.validate(validator), validation_result)
+
+            # Validators with equal keys share the results.
+            self.assertIs(
+                context.validate(Validator(self.secret_key)), validation_result
+            )
+            self.assertFalse(
+                context.validate(Validator("wrong-secret-key")).result
+            )
+
+            # Other data is not reused.
+            self.assertTrue(
+                context.validate(validator, data=dict(context.data)).result
+            )
+        self.assertEqual(validate_signature.call_count, 3)
+
+        self.assertIsNone(
+            context.extract_signed_data(Validator("wrong-secret-key"))
+        )
+        self.assertEqual(
+            context.extract_signed_data(validator)["email"],
+            "validation_context@example.com",
+        )
+
+    def test_02_get_provider_data(self):
+        """Provider data is looked up once per providers settings."""
+        request = RequestFactory().get(self.signed_url)
+        context = get_validation_context(request)
+        with mock.patch(
+            "ska.contrib.django.ska.utils.get_provider_data",
+            wraps=get_provider_data,
+        ) as mock_get_provider_data:
+            provider_data = context.get_provider_data()
+            self.assertEqual(provider_data["SECRET_KEY"], self.secret_key)
+            self.assertIs(context.get_provider_data(), provider_data)
+            self.assertIsNone(context.get_provider_data({"other": {}}))
+        self.assertEqual(mock_get_provider_data.call_count, 2)
+
+    def test_03_login(self):
+        """The login view and the backend share the context."""
+        with mock.patch.object(
+            SkaSignature,
+            "validate_signature",
+            wraps=SkaSignature.validate_signature,
+        ) as validate_signature, mock.patch(
+            "ska.contrib.django.ska.utils.get_provider_data",
+            wraps=get_provider_data,
+        ) as mock_get_provider_data:
+            response = Client().get(self.signed_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(validate_signature.call_count, 1)
+        self.assertEqual(mock_get_provider_data.call_count, 1)
+
+    def test_04_replay_store(self):
+        """Validators with a replay store do not reuse other results."""
+        request = RequestFactory().get(self.signed_url)
+        context = get_validation_context(request)
+        self.assertTrue(context.validate(Validator(self.secret_key)).result)
+
+        replay_store = MemoryReplayStore()
+        validator = Validator(self.secret_key, replay_store=replay_store)
+        validation_result = context.validate(validator)
+        self.assertTrue(validation_result.result)
+        self.assertIs(context.validate(validator), validation_result)
+
+        # Single use is enforced for other requests with the same data.
+        context = get_validation_context(RequestFactory().get(self.signed_url))
+        self.assertFalse(context.validate(validator).result)
+        self.assertFalse(
+            context.validate(
+                Validator(self.secret_key, replay_store=replay_store)
+            ).result
+        )
@@ -0,0 +1,292 @@
+"""
+User resolution of the authentication backends.
+
+- ``UserCache``: Short-lived in-process cache of users, by username and by
+  pk. Users are dropped from the cache when saved or deleted.
+- ``UserResolver``: Gets (or creates) users. The user is got or created in
+  one ``get_or_create`` call (concurrent first logins of the same user do
+  not fail), loading only the fields (``only``) and relations
+  (``select_related``) configured.
+- ``user_resolver``: Resolver used by the authentication backends,
+  configured by ``SKA_USER_ONLY_FIELDS``, ``SKA_USER_SELECT_RELATED``,
+  ``SKA_USER_CACHE_SIZE`` and ``SKA_USER_CACHE_TTL``.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+)
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+
+from .... import clocks
+from ....caches import CacheInfo
+from .settings import (
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+    USER_ONLY_FIELDS,
+    USER_SELECT_RELATED,
+)
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "UserCache",
+    "UserResolver",
+    "user_cache",
+    "user_resolver",
+)
+
+
+class UserCache:
+    """In-process cache of users, by username and by pk.
+
+    Thread safe. Each user is kept for ``ttl`` seconds at most, the least
+    recently used users are dropped first. Users are dropped as soon as
+    saved or deleted (``post_save`` and ``post_delete`` signals of the
+    ``User`` model). Copies of the cached users are returned, so that
+    changes made to them in a request do not leak into others.
+
+    :param maxsize: Max number of entries (two per user).
+    :param ttl: Max number of seconds a user is kept.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = USER_CACHE_SIZE,
+        ttl: float = USER_CACHE_TTL,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # (field name, value) -> (expires at, user). Each user is kept
+        # under both the "pk" and the "username" key.
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        post_save.connect(self.invalidate, sender=User)
+        post_delete.connect(self.invalidate, sender=User)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else clocks.now()
+
+    def get(self, field_name: str, value: Any) -> Optional[User]:
+        """Get user.
+
+        :param field_name: Either "pk" or "username".
+        :param value:
+        :return: Copy of the cached user or None.
+        """
+        key = (field_name, value)
+        now = self._now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.copy(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, user: User) -> None:
+        """Cache user.
+
+        :param user:
+        """
+        if self.maxsize <= 0:
+            return
+
+        entry = (self._now() + self.ttl, copy.copy(user))
+        with self._lock:
+            for key in (("pk", user.pk), ("username", user.username)):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sender: Any = None, instance: User = None, **kwargs):
+        """Drop user (receiver of the ``post_save`` and ``post_delete``
+        signals).
+
+        :param sender:
+        :param instance: User.
+        """
+        with self._lock:
+            # The username might have been changed since cached.
+            entry = self._entries.pop(("pk", instance.pk), None)
+            if entry is not None:
+                self._entries.pop(("username", entry[1].username), None)
+            self._entries.pop(("username", instance.username), None)
+
+    def clear(self) -> None:
+        """Clear the cache (and the statistics)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Cache statistics.
+
+        :return:
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+
+class UserResolver:
+    """Gets (or creates) users.
+
+    :param only: Fields to load (``QuerySet.only``). All, if not given.
+        Mind, that the ``password`` is used by the session authentication.
+    :param select_related: Relations to load along
+        (``QuerySet.select_related``).
+    :param cache: User cache.
+    """
+
+    def __init__(
+        self,
+        only: Optional[Iterable[str]] = USER_ONLY_FIELDS,
+        select_related: Optional[Iterable[str]] = USER_SELECT_RELATED,
+        cache: Optional[UserCache] = None,
+    ) -> None:
+        """Constructor."""
+        self.only = tuple(only) if only else ()
+        self.select_related = tuple(select_related) if select_related else ()
+        self.cache = cache
+
+    def get_queryset(self) -> QuerySet:
+        """Users queryset.
+
+        :return:
+        """
+        queryset = User._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.only:
+            queryset = queryset.only("username", *self.only)
+        return queryset
+
+    @staticmethod
+    def get_defaults(create_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Field values of the user to create (as ``create_user`` would
+        save them).
+
+        :param create_kwargs: Arguments of ``create_user``. The ``password``
+            is expected to be hashed already.
+        :return:
+        """
+        defaults = dict(create_kwargs)
+        defaults.pop("username", None)
+        if "email" in defaults:
+            defaults["email"] = User._default_manager.normalize_email(
+                defaults["email"]
+            )
+        return defaults
+
+    def get_or_create(
+        self, username: str, create_kwargs: Dict[str, Any]
+    ) -> Tuple[User, bool]:
+        """Get user by username. Create if it doesn't exist.
+
+        :param username:
+        :param create_kwargs: Arguments of ``create_user`` (see
+            ``get_defaults``).
+        :return: (user, created) pair.
+        """
+        if self.cache is not None:
+            user = self.cache.get("username", username)
+            if user is not None:
+                return user, False
+
+        user, created = self.get_queryset().get_or_create(
+            username=username, defaults=self.get_defaults(create_kwargs)
+        )
+        if self.cache is not None:
+            self.cache.set(user)
+        return user, created
+
+    async def aget_or_create(
+        self, username: str, create_kwargs: Dict[str, Any]
+    ) -> Tuple[User, bool]:
+        """Get user by username. Create if it doesn't exist (async).
+
+        :return: See ``get_or_create``.
+        """
+        if self.cache is not None:
+            user = self.cache.get("username", username)
+            if user is not None:
+                return user, False
+
+        user, created = await self.get_queryset().aget_or_create(
+            username=username, defaults=self.get_defaults(create_kwargs)
+        )
+        if self.cache is not None:
+            self.cache.set(user)
+        return user, created
+
+    def get(self, pk: Any) -> Optional[User]:
+        """Get user by pk.
+
+        :param pk:
+        :return: User or None if it doesn't exist.
+        """
+        if self.cache is not None:
+            user = self.cache.get("pk", pk)
+            if user is not None:
+                return user
+
+        try:
+            user = self.get_queryset().get(pk=pk)
+        except User.DoesNotExist:
+            return None
+        if self.cache is not None:
+            self.cache.set(user)
+        return user
+
+    async def aget(self, pk: Any) -> Optional[User]:
+        """Get user by pk (async).
+
+        :return: See ``get``.
+        """
+        if self.cache is not None:
+            user = self.cache.get("pk", pk)
+            if user is not None:
+                return user
+
+        try:
+            user = await self.get_queryset().aget(pk=pk)
+        except User.DoesNotExist:
+            return None
+        if self.cache is not None:
+            self.cache.set(user)
+        return user
+
+
+user_cache: Optional[UserCache] = (
+    UserCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+    if USER_CACHE_SIZE
+    else None
+)
+
+user_resolver: UserResolver = UserResolver(cache=user_cache)
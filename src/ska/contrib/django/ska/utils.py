@@ -1,13 +1,20 @@
+import time
 from datetime import datetime
-from typing import Dict, Optional, Union
+from typing import Callable, Dict, Optional, Union
 
 from django.conf import settings
+from django.db import connections, transaction
 from django.shortcuts import resolve_url
 from django.utils.http import url_has_allowed_host_and_scheme
 
 from ....defaults import DEFAULT_PROVIDER_PARAM
 from .models import Signature
-from .settings import PROVIDERS, REDIRECT_AFTER_LOGIN, SECRET_KEY
+from .settings import (
+    PROVIDERS,
+    PURGE_BATCH_SIZE,
+    REDIRECT_AFTER_LOGIN,
+    SECRET_KEY,
+)
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
@@ -42,9 +49,69 @@ def get_safe_redirect_target(request, target):
     return resolve_url(fallback)
 
 
-def purge_signature_data() -> None:
-    """Purge old signature data (valid_until < now)."""
-    Signature._default_manager.filter(valid_until__lt=datetime.now()).delete()
+def purge_signature_data(
+    batch_size: int = PURGE_BATCH_SIZE,
+    sleep: float = 0,
+    time_budget: Optional[float] = None,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Purge old signature data (valid_until < now).
+
+    Expired rows are looked up by the ``valid_until`` index and deleted by
+    primary key, ``batch_size`` rows at once, each batch in its own short
+    transaction. Rows are not loaded into memory (no delete collector, no
+    signals), so purging can run along with the authentication.
+
+    :param batch_size: Number of rows deleted at once.
+    :param sleep: Number of seconds to sleep between batches.
+    :param time_budget: Max number of seconds to spend. No more batches are
+        started after that.
+    :param dry_run: If set to True, expired rows are counted, not deleted.
+    :param progress: Callable, called with the number of rows deleted so
+        far after each batch.
+    :return: Number of rows deleted (or to be deleted, if ``dry_run`` is
+        set).
+    """
+    expired = Signature._default_manager.filter(
+        valid_until__lt=datetime.now()
+    ).order_by()
+    if dry_run:
+        return expired.count()
+
+    using = expired.db
+    connection = connections[using]
+    table = connection.ops.quote_name(Signature._meta.db_table)
+    pk_column = connection.ops.quote_name(Signature._meta.pk.column)
+    started_at = time.monotonic()
+    deleted = 0
+
+    while True:
+        pks = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+
+        placeholders = ", ".join(["%s"] * len(pks))
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {pk_column} IN ({placeholders})",
+                pks,
+            )
+            deleted += cursor.rowcount
+
+        if progress is not None:
+            progress(deleted)
+        if len(pks) < batch_size:
+            break
+        if (
+            time_budget is not None
+            and time.monotonic() - started_at >= time_budget
+        ):
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    return deleted
 
 
 def get_secret_key(
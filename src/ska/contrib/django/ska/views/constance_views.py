@@ -1,4 +1,3 @@
-from constance import config
 from django.contrib import messages
 from django.contrib.auth import authenticate
 from django.contrib.auth import login as auth_login
@@ -6,8 +5,10 @@ from django.http import HttpResponseForbidden, HttpResponseRedirect
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 
+from ..context import get_validation_context
+from ..integration.constance_integration.caches import constance_settings
 from ..settings import REDIRECT_AFTER_LOGIN
-from ..utils import get_provider_data, get_safe_redirect_target
+from ..utils import get_safe_redirect_target
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
@@ -27,9 +28,11 @@ def constance_login(request):
     next_url = request.GET.get("next", None)
 
     if not next_url:
-        request_data = request.GET.dict()
-        settings = config.SKA_PROVIDERS
-        provider_data = get_provider_data(request_data, settings)
+        # Looked up by the authentication backend already.
+        settings = constance_settings.get_providers()
+        provider_data = get_validation_context(request).get_provider_data(
+            settings
+        )
         if provider_data:
             next_url = provider_data.get(
                 "REDIRECT_AFTER_LOGIN", REDIRECT_AFTER_LOGIN
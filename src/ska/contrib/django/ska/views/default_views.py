@@ -5,8 +5,9 @@ from django.http import HttpResponseForbidden, HttpResponseRedirect
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 
+from ..context import get_validation_context
 from ..settings import REDIRECT_AFTER_LOGIN
-from ..utils import get_provider_data, get_safe_redirect_target
+from ..utils import get_safe_redirect_target
 
 __title__ = "ska.contrib.django.ska.views.default_views"
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -27,8 +28,8 @@ def login(request):
     next_url = request.GET.get("next", None)
 
     if not next_url:
-        request_data = request.GET.dict()
-        provider_data = get_provider_data(request_data)
+        # Looked up by the authentication backend already.
+        provider_data = get_validation_context(request).get_provider_data()
         if provider_data:
             next_url = provider_data.get(
                 "REDIRECT_AFTER_LOGIN", REDIRECT_AFTER_LOGIN
@@ -15,27 +15,68 @@ Application defaults.
   ``extra`` value. Default value is `extra`.
 - `DEFAULT_PROVIDER_PARAM` (str): Default name of the REQUEST param holding
   the ``provider`` value. Default value is `provider`.
+- `DEFAULT_KEY_ID_PARAM` (str): Default name of the REQUEST param holding
+  the ``key_id`` value (see ``ska.keyring``). Default value is `key_id`.
+- `DEFAULT_CONTENT_DIGEST_PARAM` (str): Default name of the ``extra`` key
+  holding the content digest of signed streams. Default value is
+  `content_digest`.
 - `DEFAULT_URL_SUFFIX` (str): Suffix to add after the ``endpoint_url`` and
   before the appended signature params.
 - `DEFAULT_RESERVED_PARAMS` (list): List of GET params reserved by default.
   Users should not be allowed to use them.
+- `SIGNER_CACHE_SIZE` (int): Max number of keyed signers (one per secret key
+  and algorithm) kept in memory. Default value is 128.
+- `VALIDATION_CACHE_SIZE` (int): Default max number of entries of a
+  ``ska.caches.ValidationCache``. Default value is 4096.
+- `VALIDATOR_CACHE_SIZE` (int): Max number of validators derived from a
+  ``ska.validators.Validator`` (one per secret key, for instance) kept in
+  memory. Default value is 128.
+- `NEGATIVE_CACHE_SIZE` (int): Default max number of entries of a
+  ``ska.caches.NegativeCache``. Default value is 65536.
+- `NEGATIVE_CACHE_TTL` (int): Default number of seconds failed validations
+  are kept in a ``ska.caches.NegativeCache``. Default value is 60.
+- `REPLAY_STORE_SHARDS` (int): Default number of shards of a
+  ``ska.replay.MemoryReplayStore`` (and of lock stripes of a
+  ``ska.replay.SharedMemoryReplayStore``). Default value is 16.
+- `SHARED_REPLAY_STORE_CAPACITY` (int): Default number of slots of a
+  ``ska.replay.SharedMemoryReplayStore``. Default value is 1048576.
+- `REPLAY_STORE_MAX_PROBES` (int): Default max number of slots probed per
+  operation of a ``ska.replay.SharedMemoryReplayStore``. Default value is
+  64.
+- `BASE_STREAMING_THRESHOLD` (int): ``extra`` string values longer than that
+  (as well as dict and list values) make the base string be built and
+  hashed incrementally. Default value is 4096.
+- `BASE_CHUNK_SIZE` (int): Number of characters of the base string quoted
+  and hashed at once, when built incrementally. Default value is 8192.
 """
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
+    "BASE_CHUNK_SIZE",
+    "BASE_STREAMING_THRESHOLD",
     "DEBUG",
     "DEFAULT_AUTH_USER_PARAM",
+    "DEFAULT_CONTENT_DIGEST_PARAM",
     "DEFAULT_EXTRA_PARAM",
+    "DEFAULT_KEY_ID_PARAM",
     "DEFAULT_PROVIDER_PARAM",
     "DEFAULT_RESERVED_PARAMS",
     "DEFAULT_SIGNATURE_PARAM",
     "DEFAULT_TIME_ZONE_PARAM",
     "DEFAULT_URL_SUFFIX",
     "DEFAULT_VALID_UNTIL_PARAM",
+    "NEGATIVE_CACHE_SIZE",
+    "NEGATIVE_CACHE_TTL",
+    "REPLAY_STORE_MAX_PROBES",
+    "REPLAY_STORE_SHARDS",
+    "SHARED_REPLAY_STORE_CAPACITY",
     "SIGNATURE_LIFETIME",
+    "SIGNER_CACHE_SIZE",
     "TIMESTAMP_FORMAT",
+    "VALIDATION_CACHE_SIZE",
+    "VALIDATOR_CACHE_SIZE",
 )
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
@@ -61,6 +102,13 @@ DEFAULT_EXTRA_PARAM = "extra"
 # Default name of the REQUEST param holding the ``provider`` value.
 DEFAULT_PROVIDER_PARAM = "provider"
 
+# Default name of the REQUEST param holding the ``key_id`` value.
+DEFAULT_KEY_ID_PARAM = "key_id"
+
+# Default name of the ``extra`` key holding the content digest of signed
+# streams.
+DEFAULT_CONTENT_DIGEST_PARAM = "content_digest"
+
 # Suffix to add after the ``endpoint_url`` and before the appended signature
 # params.
 DEFAULT_URL_SUFFIX = "?"
@@ -74,6 +122,42 @@ DEFAULT_RESERVED_PARAMS = (
     DEFAULT_TIME_ZONE_PARAM,
     DEFAULT_EXTRA_PARAM,
     DEFAULT_PROVIDER_PARAM,
+    DEFAULT_KEY_ID_PARAM,
 )
 
+# Max number of keyed signers (one per secret key and algorithm) kept in
+# memory.
+SIGNER_CACHE_SIZE = 128
+
+# Default max number of entries of a validation cache.
+VALIDATION_CACHE_SIZE = 4096
+
+# Max number of validators derived from a validator (one per secret key,
+# for instance) kept in memory.
+VALIDATOR_CACHE_SIZE = 128
+
+# Default max number of entries of a negative cache (of failed validations).
+NEGATIVE_CACHE_SIZE = 65536
+
+# Default number of seconds failed validations are kept in a negative cache.
+NEGATIVE_CACHE_TTL = 60
+
+# Default number of shards of a ``ska.replay.MemoryReplayStore``.
+REPLAY_STORE_SHARDS = 16
+
+# Default number of slots of a ``ska.replay.SharedMemoryReplayStore``.
+SHARED_REPLAY_STORE_CAPACITY = 1 << 20
+
+# Default max number of slots probed per operation of a
+# ``ska.replay.SharedMemoryReplayStore``.
+REPLAY_STORE_MAX_PROBES = 64
+
+# ``extra`` string values longer than that (as well as dict and list values)
+# make the base string be built and hashed incrementally.
+BASE_STREAMING_THRESHOLD = 4096
+
+# Number of characters of the base string quoted and hashed at once, when
+# built incrementally.
+BASE_CHUNK_SIZE = 8 * 1024
+
 DEBUG = False
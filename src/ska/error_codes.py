@@ -4,9 +4,14 @@ __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
+    "CONTENT_DIGEST_MISMATCH",
+    "ERROR_CODES",
     "ErrorCode",
     "INVALID_SIGNATURE",
+    "SIGNATURE_ALREADY_USED",
     "SIGNATURE_TIMESTAMP_EXPIRED",
+    "UNKNOWN_KEY_ID",
+    "UNKNOWN_PROVIDER",
 )
 
 
@@ -43,3 +48,20 @@ class ErrorCode(object):
 
 INVALID_SIGNATURE = ErrorCode(1, _("Invalid signature!"))
 SIGNATURE_TIMESTAMP_EXPIRED = ErrorCode(2, _("Signature timestamp expired!"))
+CONTENT_DIGEST_MISMATCH = ErrorCode(3, _("Content digest mismatch!"))
+UNKNOWN_KEY_ID = ErrorCode(4, _("Unknown key id!"))
+UNKNOWN_PROVIDER = ErrorCode(5, _("Unknown provider!"))
+SIGNATURE_ALREADY_USED = ErrorCode(6, _("Signature already used!"))
+
+# Integer code -> error code
+ERROR_CODES = {
+    int(error_code): error_code
+    for error_code in (
+        INVALID_SIGNATURE,
+        SIGNATURE_TIMESTAMP_EXPIRED,
+        CONTENT_DIGEST_MISMATCH,
+        UNKNOWN_KEY_ID,
+        UNKNOWN_PROVIDER,
+        SIGNATURE_ALREADY_USED,
+    )
+}
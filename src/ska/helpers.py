@@ -1,22 +1,24 @@
 import json
-import time
-from datetime import datetime, timedelta
 from importlib import import_module
-from typing import Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from urllib.parse import quote
 
-from .defaults import SIGNATURE_LIFETIME
+from . import clocks
+from .defaults import BASE_CHUNK_SIZE, SIGNATURE_LIFETIME
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
+    "CHARWISE_QUOTERS",
     "default_quoter",
     "default_value_dumper",
     "dict_keys",
     "dict_to_ordered_list",
     "extract_signed_data",
     "get_callback_func",
+    "iter_json",
+    "iter_sorted_urlencode",
     "javascript_quoter",
     "javascript_value_dumper",
     "make_valid_until",
@@ -134,6 +136,101 @@ def javascript_quoter(value):
     return quote(value, safe="~()*!.'")
 
 
+# Quoters, which quote every character on its own (so that quoting the
+# parts of a string and joining them gives the same result as quoting the
+# whole string).
+CHARWISE_QUOTERS = (default_quoter, javascript_quoter)
+
+
+# Same as ``json.dumps(value, separators=(",", ":"))``, without creating
+# a new encoder on every call.
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+# Structures at most that wide and deep are dumped by ``iter_json`` at once.
+_JSON_CHUNK_MAX_LENGTH = 64
+_JSON_CHUNK_MAX_DEPTH = 2
+
+
+def iter_json(value: Any) -> Iterator[str]:
+    """Incremental, ordered version of ``javascript_value_dumper``.
+
+    Joining the chunks gives the same result as
+    ``javascript_value_dumper(dict_to_ordered_dict(value))``, without
+    dumping (or copying) the whole structure at once. Small parts of the
+    structure are dumped at once.
+
+    :param value:
+    :return:
+    """
+    if isinstance(value, list):
+        small_value = _ordered_copy(value, _JSON_CHUNK_MAX_DEPTH)
+        if small_value is not _TOO_LARGE:
+            yield _JSON_ENCODER.encode(small_value)
+            return
+
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ","
+            yield from iter_json(item)
+        yield "]"
+
+    elif isinstance(value, dict) and all(
+        isinstance(key, str) for key in value
+    ):
+        small_value = _ordered_copy(value, _JSON_CHUNK_MAX_DEPTH)
+        if small_value is not _TOO_LARGE:
+            yield _JSON_ENCODER.encode(small_value)
+            return
+
+        yield "{"
+        for index, key in enumerate(sorted(value)):
+            if index:
+                yield ","
+            yield _JSON_ENCODER.encode(key)
+            yield ":"
+            yield from iter_json(value[key])
+        yield "}"
+
+    else:
+        yield _JSON_ENCODER.encode(_ordered_copy(value))
+
+
+# Returned by ``_ordered_copy`` for structures exceeding the depth given.
+_TOO_LARGE = object()
+
+
+def _ordered_copy(value: Any, depth: int = -1) -> Any:
+    """Same as ``dict_to_ordered_dict``, but leaves the value intact.
+
+    If ``depth`` is given, structures wider than ``_JSON_CHUNK_MAX_LENGTH``
+    or deeper than ``depth`` are not copied (``_TOO_LARGE`` is returned).
+    """
+    if isinstance(value, dict):
+        if not depth or (depth > 0 and len(value) > _JSON_CHUNK_MAX_LENGTH):
+            return _TOO_LARGE
+        copy = {}
+        for key in sorted(value):
+            item = _ordered_copy(value[key], depth - 1)
+            if item is _TOO_LARGE:
+                return _TOO_LARGE
+            copy[key] = item
+        return copy
+
+    if isinstance(value, list):
+        if not depth or (depth > 0 and len(value) > _JSON_CHUNK_MAX_LENGTH):
+            return _TOO_LARGE
+        copy = []
+        for item in value:
+            item = _ordered_copy(item, depth - 1)
+            if item is _TOO_LARGE:
+                return _TOO_LARGE
+            copy.append(item)
+        return copy
+
+    return value
+
+
 def sorted_urlencode(
     data: Dict[str, Union[bytes, str, float, int]],
     quoted: bool = True,
@@ -167,6 +264,73 @@ def sorted_urlencode(
     return res
 
 
+def iter_sorted_urlencode(
+    data: Dict[str, Union[bytes, str, float, int]],
+    value_dumper: Optional[Callable] = default_value_dumper,
+    quoter: Optional[Callable] = default_quoter,
+    chunk_size: int = BASE_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Incremental version of ``sorted_urlencode``.
+
+    Yields quoted chunks of (about) ``chunk_size`` characters. Joining the
+    chunks gives the same result as ``sorted_urlencode``. Dict and list
+    values dumped with ``javascript_value_dumper`` are never serialized
+    as a whole. Quoters, which do not quote character by character (see
+    ``CHARWISE_QUOTERS``) get the whole string at once.
+
+    :param data:
+    :param value_dumper:
+    :param quoter:
+    :param chunk_size:
+    :return:
+    """
+    if not value_dumper:
+        value_dumper = default_value_dumper
+
+    if not quoter:
+        quoter = default_quoter
+
+    if quoter not in CHARWISE_QUOTERS:
+        yield sorted_urlencode(data, value_dumper=value_dumper, quoter=quoter)
+        return
+
+    buffer = []
+    size = 0
+    for piece in _iter_urlencode_pieces(data, value_dumper):
+        if len(piece) >= chunk_size:
+            if buffer:
+                yield quoter("".join(buffer))
+                buffer, size = [], 0
+            for start in range(0, len(piece), chunk_size):
+                yield quoter(piece[start : start + chunk_size])
+            continue
+
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield quoter("".join(buffer))
+            buffer, size = [], 0
+
+    if buffer:
+        yield quoter("".join(buffer))
+
+
+def _iter_urlencode_pieces(
+    data: Dict[str, Union[bytes, str, float, int]], value_dumper: Callable
+) -> Iterator[str]:
+    """Unquoted pieces of the ``sorted_urlencode`` string."""
+    keys = sorted(data) if isinstance(data, dict) else list(data)
+    for index, key in enumerate(keys):
+        yield f"&{key}=" if index else f"{key}="
+        value = data[key]
+        if isinstance(value, (dict, list)):
+            if value_dumper is javascript_value_dumper:
+                yield from iter_json(value)
+                continue
+            value = dict_to_ordered_dict(value)
+        yield f"{value_dumper(value)}"
+
+
 def extract_signed_data(
     data: Dict[str, Union[bytes, str, float, int]], extra: List[str]
 ) -> Dict[str, Union[bytes, str, float, int]]:
@@ -184,12 +348,16 @@ def extract_signed_data(
     return extracted_extra
 
 
-def make_valid_until(lifetime: int = SIGNATURE_LIFETIME) -> float:
+def make_valid_until(
+    lifetime: int = SIGNATURE_LIFETIME,
+    clock: Optional[Callable[[], float]] = None,
+) -> float:
     """Make valid until.
 
     :param lifetime:
-    :return:
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    :return: Unix timestamp (whole seconds).
     """
-    return time.mktime(
-        (datetime.now() + timedelta(seconds=lifetime)).timetuple()
-    )
+    current_time = clock() if clock is not None else clocks.now()
+    return float(int(current_time + lifetime))
@@ -0,0 +1,202 @@
+"""
+Key rings (rotation of secret keys).
+
+A ``KeyRing`` holds several secret keys, each identified by a key id and
+(optionally) valid within a time window. Signed requests carry the key id
+(in the ``key_id`` param), so the key is selected with a single dict lookup
+and validation costs a single HMAC, no matter how many keys are in the
+ring. Windows of keys may overlap: during a rotation, both the old and the
+new key are accepted, while new signatures are made with the new one.
+
+A ``KeyRing`` can be given as ``secret_key`` to ``sign_url``,
+``sign_urls``, ``signature_to_dict``, ``validate_signed_request_data``,
+``extract_signed_request_data`` and the respective ``RequestHelper``
+methods.
+
+:example:
+
+>>> from ska import sign_url, validate_signed_request_data
+>>> from ska.keyring import KeyRing
+>>> key_ring = KeyRing(default_key_id='2023-01')
+>>> key_ring.add('2023-01', 'old-secret-key', not_after=1700000000)
+>>> key_ring.add('2023-11', 'new-secret-key', not_before=1699000000)
+>>> signed_url = sign_url(
+>>>     auth_user='user',
+>>>     secret_key=key_ring,
+>>>     url='http://e.com/api/',
+>>> )
+http://e.com/api/?signature=...&auth_user=user&valid_until=...&extra=&key_id=2023-11
+"""
+
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from . import clocks
+from .exceptions import ImproperlyConfigured
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "Key",
+    "KeyRing",
+    "get_signing_key",
+)
+
+
+class Key(NamedTuple):
+    """Secret key of a key ring.
+
+    :param key_id:
+    :param secret_key:
+    :param not_before: Unix timestamp. If given, the key is not accepted
+        (nor used for signing) before that time.
+    :param not_after: Unix timestamp. If given, the key is not accepted
+        (nor used for signing) after that time.
+    """
+
+    key_id: str
+    secret_key: str
+    not_before: Optional[float] = None
+    not_after: Optional[float] = None
+
+    def is_active(self, now: float) -> bool:
+        """Check if the key is valid at the time given.
+
+        :param now: Unix timestamp.
+        :return:
+        """
+        if self.not_before is not None and now < self.not_before:
+            return False
+        return self.not_after is None or now <= self.not_after
+
+
+class KeyRing:
+    """Secret keys identified by key ids.
+
+    :param keys: Mapping of key ids to secret keys, or iterable of ``Key``
+        objects.
+    :param default_key_id: Key id assumed, if the request data does not
+        hold one (for instance, URLs signed before the key ring was
+        introduced).
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        keys: Union[Mapping[str, str], Iterable[Key]] = (),
+        default_key_id: Optional[str] = None,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        self.default_key_id = default_key_id
+        self.clock = clock
+        self._keys: Dict[str, Key] = {}
+
+        if isinstance(keys, Mapping):
+            keys = (Key(key_id, value) for key_id, value in keys.items())
+        for key in keys:
+            self._keys[key.key_id] = key
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {','.join(self._keys)}>"
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Key]:
+        return iter(self._keys.values())
+
+    def __contains__(self, key_id: str) -> bool:
+        return key_id in self._keys
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else clocks.now()
+
+    def add(
+        self,
+        key_id: str,
+        secret_key: str,
+        not_before: Optional[float] = None,
+        not_after: Optional[float] = None,
+    ) -> Key:
+        """Add a key (replacing the one with the same key id, if any).
+
+        :param key_id:
+        :param secret_key:
+        :param not_before: Unix timestamp.
+        :param not_after: Unix timestamp.
+        :return:
+        """
+        key = Key(key_id, secret_key, not_before, not_after)
+        self._keys.pop(key_id, None)
+        self._keys[key_id] = key
+        return key
+
+    def remove(self, key_id: str) -> None:
+        """Remove a key.
+
+        :param key_id:
+        """
+        self._keys.pop(key_id, None)
+
+    def get(self, key_id: Optional[str] = None) -> Optional[str]:
+        """Get secret key by key id.
+
+        :param key_id: If not given, the ``default_key_id`` is used.
+        :return: Secret key, or None if there's no such key or it's not
+            valid at the moment.
+        """
+        if not key_id:
+            key_id = self.default_key_id
+
+        key = self._keys.get(key_id)
+        if key is None or not key.is_active(self._now()):
+            return None
+        return key.secret_key
+
+    def signing_key(self) -> Key:
+        """Key to sign with.
+
+        Of the keys valid at the moment, the most recent one (with the
+        latest ``not_before``; the last added one on ties) is chosen.
+
+        :return:
+        """
+        now = self._now()
+        signing_key = None
+        for key in self._keys.values():
+            if not key.is_active(now):
+                continue
+            if signing_key is None or (key.not_before or 0) >= (
+                signing_key.not_before or 0
+            ):
+                signing_key = key
+
+        if signing_key is None:
+            raise ImproperlyConfigured("No valid key in the key ring.")
+        return signing_key
+
+
+def get_signing_key(
+    secret_key: Union[str, KeyRing],
+) -> Tuple[Optional[str], str]:
+    """Get (key id, secret key) pair to sign with.
+
+    :param secret_key: Secret key or key ring.
+    :return: Key id is None, unless a key ring is given.
+    """
+    if isinstance(secret_key, KeyRing):
+        key = secret_key.signing_key()
+        return key.key_id, key.secret_key
+    return None, secret_key
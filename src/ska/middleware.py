@@ -0,0 +1,346 @@
+"""
+WSGI and ASGI middleware gating routes behind signed URLs.
+
+Requests are validated straight from the query string (``QUERY_STRING`` of
+the WSGI environ, ``query_string`` of the ASGI scope), before the
+application is called. Unsigned and invalid requests are rejected with
+``401 Unauthorized`` and never reach the application.
+
+Routes are given as ``Route`` objects (path prefix, secret key or
+providers) and compiled once into a trie of path segments. Each request is
+matched against the longest route prefix in one walk over its path
+segments, no matter how many routes there are. Paths not matching any
+route are passed through.
+
+:example:
+
+>>> from ska.middleware import Route, WSGISignedRequestMiddleware
+>>> application = WSGISignedRequestMiddleware(
+>>>     application,
+>>>     routes=[
+>>>         Route('/api/', secret_key='your-secret-key'),
+>>>         Route('/api/public/', signed=False),
+>>>         Route(
+>>>             '/partners/',
+>>>             providers={
+>>>                 'partner-1': 'partner-1-secret-key',
+>>>                 'partner-2': 'partner-2-secret-key',
+>>>             },
+>>>         ),
+>>>     ],
+>>> )
+"""
+
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import parse_qsl
+
+from .base import AbstractSignature, SignatureValidationResult
+from .caches import NegativeCache, ValidationCache
+from .defaults import (
+    DEFAULT_AUTH_USER_PARAM,
+    DEFAULT_EXTRA_PARAM,
+    DEFAULT_KEY_ID_PARAM,
+    DEFAULT_PROVIDER_PARAM,
+    DEFAULT_SIGNATURE_PARAM,
+    DEFAULT_VALID_UNTIL_PARAM,
+)
+from .error_codes import UNKNOWN_PROVIDER
+from .exceptions import ImproperlyConfigured
+from .keyring import KeyRing
+from .replay import ReplayStore
+from .signatures import Signature
+from .utils import RequestHelper
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "ASGISignedRequestMiddleware",
+    "BaseSignedRequestMiddleware",
+    "Route",
+    "RouteTrie",
+    "UNAUTHORISED_REQUEST_ERROR_MESSAGE",
+    "WSGISignedRequestMiddleware",
+)
+
+# Message of rejected requests. Formatted with the validation errors.
+UNAUTHORISED_REQUEST_ERROR_MESSAGE = "Unauthorised request. {0}"
+
+
+class Route(NamedTuple):
+    """Route rule.
+
+    :param prefix: Path prefix (for instance, ``/api/``). Matched on whole
+        path segments: ``/api/`` matches ``/api`` and ``/api/items/``, but
+        not ``/apis/``.
+    :param secret_key: Secret key or key ring (see ``ska.keyring``).
+    :param providers: Mapping of provider UIDs (given in the
+        ``provider_param`` request param) to secret keys or key rings.
+        Requests without a provider are validated with ``secret_key``.
+    :param signed: If set to False, requests are passed through unchecked
+        (to exempt sub-paths of signed routes).
+    """
+
+    prefix: str
+    secret_key: Union[str, KeyRing, None] = None
+    providers: Optional[Mapping[str, Union[str, KeyRing]]] = None
+    signed: bool = True
+
+    def get_secret_key(
+        self, provider: Optional[str] = None
+    ) -> Union[str, KeyRing, None]:
+        """Get secret key of the provider given.
+
+        :param provider: Provider UID.
+        :return: Secret key, key ring or None if there's no such provider.
+        """
+        if provider and self.providers:
+            return self.providers.get(provider)
+        return self.secret_key
+
+
+def _split_path(path: str) -> List[str]:
+    """Split path into (non-empty) segments."""
+    return [segment for segment in path.split("/") if segment]
+
+
+class _Node:
+    """Node of the route trie."""
+
+    __slots__ = ("children", "route")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.route: Optional[Route] = None
+
+
+class RouteTrie:
+    """Routes compiled into a trie of path segments.
+
+    :param routes: Routes.
+    :raise ska.exceptions.ImproperlyConfigured: If a prefix is given twice
+        or a signed route has neither a secret key nor providers.
+    """
+
+    def __init__(self, routes: Iterable[Route] = ()) -> None:
+        """Constructor."""
+        self._root = _Node()
+        for route in routes:
+            self.add(route)
+
+    def add(self, route: Route) -> None:
+        """Add route.
+
+        :param route:
+        """
+        if route.signed and not (route.secret_key or route.providers):
+            raise ImproperlyConfigured(
+                f"Route {route.prefix} has neither a secret key nor providers."
+            )
+
+        node = self._root
+        for segment in _split_path(route.prefix):
+            node = node.children.setdefault(segment, _Node())
+        if node.route is not None:
+            raise ImproperlyConfigured(
+                f"Route {route.prefix} is given more than once."
+            )
+        node.route = route
+
+    def match(self, path: str) -> Optional[Route]:
+        """Get the route with the longest prefix of the path given.
+
+        :param path:
+        :return: Route or None if no route matches.
+        """
+        node = self._root
+        route = node.route
+        for segment in path.split("/"):
+            if not segment:
+                continue
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.route is not None:
+                route = node.route
+        return route
+
+
+class BaseSignedRequestMiddleware:
+    """Base middleware gating routes behind signed URLs.
+
+    :param app: Application (WSGI or ASGI callable).
+    :param routes: Routes (or a compiled ``RouteTrie``).
+    :param signature_param:
+    :param auth_user_param:
+    :param valid_until_param:
+    :param extra_param:
+    :param key_id_param:
+    :param provider_param: Name of the param holding the provider UID.
+    :param signature_cls:
+    :param cache: Cache of successful validations (see
+        ``ska.caches.ValidationCache``).
+    :param negative_cache: Cache of failed validations (see
+        ``ska.caches.NegativeCache``).
+    :param replay_store: Replay store (see ``ska.replay``). If given,
+        signatures are accepted only once.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        routes: Union[RouteTrie, Iterable[Route]],
+        signature_param: str = DEFAULT_SIGNATURE_PARAM,
+        auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
+        valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
+        extra_param: str = DEFAULT_EXTRA_PARAM,
+        key_id_param: str = DEFAULT_KEY_ID_PARAM,
+        provider_param: str = DEFAULT_PROVIDER_PARAM,
+        signature_cls: Type[AbstractSignature] = Signature,
+        cache: Optional[ValidationCache] = None,
+        negative_cache: Optional[NegativeCache] = None,
+        replay_store: Optional[ReplayStore] = None,
+    ) -> None:
+        """Constructor."""
+        self.app = app
+        self.routes = (
+            routes if isinstance(routes, RouteTrie) else RouteTrie(routes)
+        )
+        self.provider_param = provider_param
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.replay_store = replay_store
+        self.request_helper = RequestHelper(
+            signature_param=signature_param,
+            auth_user_param=auth_user_param,
+            valid_until_param=valid_until_param,
+            extra_param=extra_param,
+            signature_cls=signature_cls,
+            key_id_param=key_id_param,
+        )
+
+    def validate(
+        self, path: str, query_string: str
+    ) -> Optional[SignatureValidationResult]:
+        """Validate the request.
+
+        :param path: Request path.
+        :param query_string: Raw (URL encoded) query string.
+        :return: Validation result or None if the path is not gated.
+        """
+        route = self.routes.match(path)
+        if route is None or not route.signed:
+            return None
+
+        data = dict(parse_qsl(query_string, keep_blank_values=True))
+        secret_key = route.get_secret_key(data.get(self.provider_param))
+        if secret_key is None:
+            return SignatureValidationResult(
+                result=False, errors=[UNKNOWN_PROVIDER]
+            )
+
+        return self.request_helper.validate_request_data(
+            data=data,
+            secret_key=secret_key,
+            cache=self.cache,
+            negative_cache=self.negative_cache,
+            replay_store=self.replay_store,
+        )
+
+    @staticmethod
+    def get_rejection_body(
+        validation_result: SignatureValidationResult,
+    ) -> bytes:
+        """Body of the ``401 Unauthorized`` response.
+
+        :param validation_result:
+        :return:
+        """
+        return UNAUTHORISED_REQUEST_ERROR_MESSAGE.format(
+            "; ".join(validation_result.reason)
+        ).encode("utf-8")
+
+
+class WSGISignedRequestMiddleware(BaseSignedRequestMiddleware):
+    """WSGI middleware gating routes behind signed URLs.
+
+    Paths are matched against ``PATH_INFO`` (relative to the application
+    root). See ``BaseSignedRequestMiddleware`` for the arguments.
+    """
+
+    def __call__(
+        self, environ: Dict[str, Any], start_response: Callable
+    ) -> Iterable[bytes]:
+        validation_result = self.validate(
+            environ.get("PATH_INFO", ""), environ.get("QUERY_STRING", "")
+        )
+        if validation_result is None or validation_result.result:
+            return self.app(environ, start_response)
+
+        body = self.get_rejection_body(validation_result)
+        start_response(
+            "401 Unauthorized",
+            [
+                ("Content-Type", "text/plain; charset=utf-8"),
+                ("Content-Length", str(len(body))),
+            ],
+        )
+        return [body]
+
+
+class ASGISignedRequestMiddleware(BaseSignedRequestMiddleware):
+    """ASGI middleware gating routes behind signed URLs.
+
+    HTTP requests are rejected with ``401 Unauthorized``, WebSocket
+    connections are closed (code 1008) before being accepted. Other scopes
+    (``lifespan``) are passed through. See ``BaseSignedRequestMiddleware``
+    for the arguments.
+    """
+
+    async def __call__(
+        self,
+        scope: Dict[str, Any],
+        receive: Callable[[], Awaitable[Dict[str, Any]]],
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        scope_type = scope["type"]
+        if scope_type not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        # The query string is URL encoded, hence ASCII.
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        validation_result = self.validate(scope["path"], query_string)
+        if validation_result is None or validation_result.result:
+            return await self.app(scope, receive, send)
+
+        if scope_type == "websocket":
+            await send({"type": "websocket.close", "code": 1008})
+            return None
+
+        body = self.get_rejection_body(validation_result)
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 401,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+        return None
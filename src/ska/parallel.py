@@ -0,0 +1,236 @@
+"""
+Parallel (multi-process) signing.
+
+Shards a (possibly very large) stream of signing specs into chunks, signs
+the chunks in a pool of worker processes and yields the results in the
+order of the input.
+
+Each worker process keeps its own keyed signer (built from the
+``signature_cls`` given), so HMAC keying happens once per worker.
+
+Note, that ``signature_cls``, ``value_dumper`` and ``quoter`` are sent to
+the worker processes and therefore shall be picklable (defined on module
+level).
+
+:example:
+
+>>> from ska.parallel import sign_urls
+>>> signed_urls = sign_urls(
+>>>     ({'auth_user': f'user{i}', 'url': f'http://e.com/{i}/'}
+>>>      for i in range(1_000_000)),
+>>>     secret_key='your-secret-key',
+>>>     max_workers=8,
+>>>     chunk_size=5_000,
+>>> )
+>>> for signed_url in signed_urls:
+>>>     ...
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Type,
+    Union,
+)
+
+from .base import AbstractSignature
+from .defaults import (
+    DEFAULT_AUTH_USER_PARAM,
+    DEFAULT_EXTRA_PARAM,
+    DEFAULT_KEY_ID_PARAM,
+    DEFAULT_SIGNATURE_PARAM,
+    DEFAULT_URL_SUFFIX,
+    DEFAULT_VALID_UNTIL_PARAM,
+    SIGNATURE_LIFETIME,
+)
+from .helpers import make_valid_until
+from .keyring import Key, KeyRing, get_signing_key
+from .shortcuts import sign_urls as _sign_urls
+from .signatures import Signature
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "DEFAULT_CHUNK_SIZE",
+    "sign_urls",
+)
+
+# Default number of specs sent to a worker process at once.
+DEFAULT_CHUNK_SIZE = 1_000
+
+# Signing options of the current worker process (set by the pool
+# initializer).
+_WORKER_OPTIONS: Dict[str, Any] = {}
+
+
+def _init_worker(options: Dict[str, Any]) -> None:
+    """Initialise the worker process.
+
+    Stores the signing options and builds the keyed signer once.
+    """
+    _WORKER_OPTIONS.clear()
+    _WORKER_OPTIONS.update(options)
+    signature_cls = options["signature_cls"]
+    if signature_cls.digestmod is not None:
+        signature_cls.get_signer(get_signing_key(options["secret_key"])[1])
+
+
+def _sign_chunk(
+    chunk: List[Mapping[str, Any]], valid_until: Union[float, str]
+) -> List[str]:
+    """Sign a chunk of specs in the worker process."""
+    return list(_sign_urls(chunk, valid_until=valid_until, **_WORKER_OPTIONS))
+
+
+def _iter_chunks(
+    specs: Iterable[Mapping[str, Any]], chunk_size: int
+) -> Iterator[List[Mapping[str, Any]]]:
+    """Split the specs given into chunks (lists) of ``chunk_size``."""
+    specs = iter(specs)
+    while True:
+        chunk = list(islice(specs, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def sign_urls(
+    specs: Iterable[Mapping[str, Any]],
+    secret_key: Union[str, KeyRing],
+    valid_until: Optional[Union[float, str]] = None,
+    lifetime: int = SIGNATURE_LIFETIME,
+    url: str = "",
+    suffix: str = DEFAULT_URL_SUFFIX,
+    signature_param: str = DEFAULT_SIGNATURE_PARAM,
+    auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
+    valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
+    extra_param: str = DEFAULT_EXTRA_PARAM,
+    signature_cls: Type[AbstractSignature] = Signature,
+    value_dumper: Optional[Callable] = None,
+    quoter: Optional[Callable] = None,
+    key_id_param: str = DEFAULT_KEY_ID_PARAM,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_pending_chunks: Optional[int] = None,
+) -> Iterator[str]:
+    """Sign URLs in bulk, using a pool of worker processes.
+
+    Same as ``ska.sign_urls``, but the specs are signed in parallel. The
+    order of the signed URLs matches the order of the specs given. Specs
+    are consumed lazily; at most ``max_pending_chunks`` chunks are being
+    signed (or waiting to be yielded) at any time.
+
+    :param specs: Iterable of mappings, each holding the ``auth_user`` and
+        (optionally) the ``url`` and ``extra`` keys.
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``). The signing key of the key ring is picked once,
+        so that all URLs are signed with the same key.
+    :param valid_until: Unix timestamp. If not given, generated
+        automatically (now + lifetime). Shared by all URLs.
+    :param lifetime: Signature lifetime in seconds.
+    :param url: URL to be signed, if not given in the spec.
+    :param suffix:
+    :param signature_param:
+    :param auth_user_param:
+    :param valid_until_param:
+    :param extra_param:
+    :param signature_cls: Shall be picklable.
+    :param value_dumper: Shall be picklable.
+    :param quoter: Shall be picklable.
+    :param key_id_param: Name of the GET param name which would hold the
+        ``key_id`` value.
+    :param max_workers: Number of worker processes. Defaults to the number
+        of CPUs.
+    :param chunk_size: Number of specs sent to a worker process at once.
+    :param max_pending_chunks: Max number of chunks in flight. Defaults to
+        twice the number of worker processes.
+    :return:
+    """
+    if lifetime is None:
+        lifetime = SIGNATURE_LIFETIME
+
+    if not isinstance(lifetime, int):
+        raise TypeError("The 'lifetime' argument must be an integer")
+
+    if chunk_size < 1:
+        raise ValueError("The 'chunk_size' argument must be positive")
+
+    if not max_workers:
+        max_workers = os.cpu_count() or 1
+
+    if not max_pending_chunks:
+        max_pending_chunks = 2 * max_workers
+
+    # Shared by all workers, so that all URLs expire at the same time.
+    if not valid_until:
+        valid_until = make_valid_until(lifetime)
+
+    # Same for the signing key.
+    if isinstance(secret_key, KeyRing):
+        key_id, signing_key = get_signing_key(secret_key)
+        secret_key = KeyRing([Key(key_id, signing_key)])
+
+    options = {
+        "secret_key": secret_key,
+        "url": url,
+        "suffix": suffix,
+        "signature_param": signature_param,
+        "auth_user_param": auth_user_param,
+        "valid_until_param": valid_until_param,
+        "extra_param": extra_param,
+        "signature_cls": signature_cls,
+        "value_dumper": value_dumper,
+        "quoter": quoter,
+        "key_id_param": key_id_param,
+    }
+
+    return _sign_urls_parallel(
+        specs,
+        options=options,
+        valid_until=valid_until,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        max_pending_chunks=max_pending_chunks,
+    )
+
+
+def _sign_urls_parallel(
+    specs: Iterable[Mapping[str, Any]],
+    options: Dict[str, Any],
+    valid_until: Union[float, str],
+    max_workers: int,
+    chunk_size: int,
+    max_pending_chunks: int,
+) -> Iterator[str]:
+    """Ordered streaming merge of the chunks signed by the workers."""
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(options,),
+    ) as executor:
+        pending = deque()
+        try:
+            for chunk in _iter_chunks(specs, chunk_size):
+                pending.append(
+                    executor.submit(_sign_chunk, chunk, valid_until)
+                )
+                if len(pending) >= max_pending_chunks:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Consumer stopped early (or failed). Do not sign the rest.
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,541 @@
+"""
+Replay protection (one-time signatures).
+
+A ``ReplayStore`` records signatures on their first use and reports any
+later use of the same signature. Entries are kept until the signature
+expires (its ``valid_until``); expired signatures are rejected by the
+validation anyway.
+
+- ``MemoryReplayStore``: In-process store, sharded (one lock per shard).
+  Entries are expired by a time wheel keyed on ``valid_until``.
+- ``SQLiteReplayStore``: SQLite (WAL mode) backed store, shared by the
+  processes of a single host.
+- ``SharedMemoryReplayStore``: Fixed-capacity hash table in shared memory,
+  created before forking the workers (for instance, by a ``gunicorn``
+  app preloaded with ``--preload``) and shared by all of them.
+
+Stores can be passed as ``replay_store`` to
+``RequestHelper.validate_request_data``, ``validate_signed_request_data``,
+``extract_signed_request_data`` and the middleware (see
+``ska.middleware``). Custom stores shall implement ``add_key`` (or ``add``)
+and ``clear``.
+
+:example:
+
+>>> from ska import validate_signed_request_data
+>>> from ska.replay import MemoryReplayStore
+>>> replay_store = MemoryReplayStore()
+>>> validation_result = validate_signed_request_data(
+>>>     data=request.GET,
+>>>     secret_key='your-secret-key',
+>>>     replay_store=replay_store,
+>>> )
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import sqlite3
+import struct
+import threading
+from hashlib import blake2b
+from multiprocessing.shared_memory import SharedMemory
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from . import clocks
+from .defaults import (
+    REPLAY_STORE_MAX_PROBES,
+    REPLAY_STORE_SHARDS,
+    SHARED_REPLAY_STORE_CAPACITY,
+)
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "MemoryReplayStore",
+    "ReplayStore",
+    "SQLiteReplayStore",
+    "SharedMemoryReplayStore",
+    "make_replay_key",
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def make_replay_key(
+    signature: Union[str, bytes],
+    auth_user: str,
+    valid_until: Union[str, float],
+) -> bytes:
+    """Make replay store key (128 bit digest) of the signature given.
+
+    :param signature:
+    :param auth_user:
+    :param valid_until:
+    :return:
+    """
+    if isinstance(signature, bytes):
+        signature = signature.decode()
+    material = f"{signature}\0{auth_user}\0{valid_until}".encode()
+    return blake2b(material, digest_size=16, person=b"ska-replay").digest()
+
+
+class ReplayStore:
+    """Base replay store.
+
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    make_key = staticmethod(make_replay_key)
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None) -> None:
+        """Constructor."""
+        self.clock = clock
+
+    def _now(self) -> float:
+        return self.clock() if self.clock is not None else clocks.now()
+
+    def add(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Record the use of the signature given.
+
+        :param signature:
+        :param auth_user:
+        :param valid_until:
+        :return: True on first use. False if the signature has already been
+            used.
+        """
+        return self.add_key(
+            self.make_key(signature, auth_user, valid_until),
+            float(valid_until),
+        )
+
+    async def aadd(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Record the use of the signature given (async).
+
+        Defaults to ``add``, which shall not block for stores not doing
+        I/O.
+        """
+        return self.add(signature, auth_user, valid_until)
+
+    def add_many(
+        self, items: Iterable[Tuple[Union[str, bytes], str, Union[str, float]]]
+    ) -> List[bool]:
+        """Record the use of many signatures.
+
+        :param items: Iterable of (signature, auth_user, valid_until).
+        :return: List of results (see ``add``).
+        """
+        return [self.add(*item) for item in items]
+
+    def add_key(self, key: bytes, valid_until: float) -> bool:
+        """Record the use of the signature by key (see ``make_key``).
+
+        :param key:
+        :param valid_until: Unix timestamp. The entry is kept until then.
+        :return: True on first use. False if the key is already known.
+        """
+        raise NotImplementedError(
+            "You should implement this method in your replay store"
+        )
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        raise NotImplementedError(
+            "You should implement this method in your replay store"
+        )
+
+
+class _Shard:
+    """Shard of the in-memory replay store."""
+
+    __slots__ = ("entries", "wheel", "tick", "lock")
+
+    def __init__(self) -> None:
+        # Key -> valid until (Unix timestamp)
+        self.entries: Dict[bytes, float] = {}
+        # Tick -> keys expiring at (before) that tick
+        self.wheel: Dict[int, List[bytes]] = {}
+        # Last tick expired
+        self.tick: Optional[int] = None
+        self.lock = threading.Lock()
+
+
+class MemoryReplayStore(ReplayStore):
+    """In-process replay store.
+
+    Thread safe. Keys are spread over ``shards`` shards, each with its own
+    lock. Entries are put into time wheel buckets of ``resolution``
+    seconds by their ``valid_until`` and dropped bucket by bucket, when the
+    time passes. Adding an entry is O(1) (amortized).
+
+    :param shards: Number of shards.
+    :param resolution: Time wheel resolution in seconds. Entries are kept
+        at most that long after they expire.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        shards: int = REPLAY_STORE_SHARDS,
+        resolution: float = 1.0,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        super().__init__(clock=clock)
+        self.resolution = resolution
+        self._shards: Sequence[_Shard] = tuple(
+            _Shard() for __ in range(max(shards, 1))
+        )
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def _expire(self, shard: _Shard, now: float) -> None:
+        """Drop expired buckets. Shall be called with the lock held."""
+        now_tick = int(now // self.resolution)
+        last_tick = shard.tick
+        shard.tick = now_tick
+        if last_tick is None or now_tick <= last_tick:
+            return
+
+        wheel = shard.wheel
+        if now_tick - last_tick <= len(wheel):
+            ticks: Iterable[int] = range(last_tick + 1, now_tick + 1)
+        else:
+            # Idle for long: cheaper to look at the buckets present.
+            ticks = [tick for tick in wheel if tick <= now_tick]
+
+        entries = shard.entries
+        for tick in ticks:
+            for key in wheel.pop(tick, ()):
+                entries.pop(key, None)
+
+    def add_key(self, key: bytes, valid_until: float) -> bool:
+        """Record the use of the signature by key (see ``make_key``).
+
+        :param key:
+        :param valid_until: Unix timestamp.
+        :return: True on first use. False if the key is already known.
+        """
+        now = self._now()
+        shard = self._shards[key[0] % len(self._shards)]
+        with shard.lock:
+            self._expire(shard, now)
+            if key in shard.entries:
+                return False
+            if valid_until < now:
+                # Expired signatures are rejected anyway. Do not keep.
+                return True
+
+            shard.entries[key] = valid_until
+            # The bucket is dropped once the time is past ``valid_until``.
+            tick = math.floor(valid_until / self.resolution) + 1
+            shard.wheel.setdefault(tick, []).append(key)
+            return True
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.wheel.clear()
+                shard.tick = None
+
+
+class SQLiteReplayStore(ReplayStore):
+    """SQLite backed replay store.
+
+    Shared by all processes (and threads) using the same database file.
+    The database is put into WAL mode, so readers never block the writer.
+    Each thread (and forked process) gets its own connection. Expired
+    entries are purged once per ``purge_interval`` seconds. ``add_many``
+    records a whole batch in a single transaction.
+
+    :param path: Database file path.
+    :param table: Table name.
+    :param timeout: Number of seconds to wait for a lock.
+    :param purge_interval: Number of seconds between purges of expired
+        entries.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        table: str = "ska_replay",
+        timeout: float = 5.0,
+        purge_interval: float = 60.0,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        super().__init__(clock=clock)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name {table}")
+        self.path = os.fspath(path)
+        self.table = table
+        self.timeout = timeout
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._purged_at = 0.0
+        self._insert_sql = (
+            f"INSERT OR IGNORE INTO {table} (key, valid_until) VALUES (?, ?)"
+        )
+        with self._connect() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"key BLOB PRIMARY KEY, valid_until REAL NOT NULL"
+                f") WITHOUT ROWID"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_valid_until "
+                f"ON {table} (valid_until)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the current thread (and process)."""
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, "pid", None) != pid:
+            # Connections shall not be shared with forked processes.
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection = connection
+            local.pid = pid
+        return local.connection
+
+    def _purge_if_due(self, connection: sqlite3.Connection, now: float) -> None:
+        if now - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = now
+        connection.execute(
+            f"DELETE FROM {self.table} WHERE valid_until < ?", (now,)
+        )
+
+    def purge(self) -> int:
+        """Purge expired entries.
+
+        :return: Number of entries purged.
+        """
+        now = self._now()
+        with self._connect() as connection:
+            self._purged_at = now
+            return connection.execute(
+                f"DELETE FROM {self.table} WHERE valid_until < ?", (now,)
+            ).rowcount
+
+    def add_key(self, key: bytes, valid_until: float) -> bool:
+        """Record the use of the signature by key (see ``make_key``).
+
+        :param key:
+        :param valid_until: Unix timestamp.
+        :return: True on first use. False if the key is already known.
+        """
+        now = self._now()
+        with self._connect() as connection:
+            self._purge_if_due(connection, now)
+            cursor = connection.execute(self._insert_sql, (key, valid_until))
+            return cursor.rowcount == 1
+
+    async def aadd(
+        self,
+        signature: Union[str, bytes],
+        auth_user: str,
+        valid_until: Union[str, float],
+    ) -> bool:
+        """Record the use of the signature given (async).
+
+        Runs in the default executor, not to block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.add, signature, auth_user, valid_until
+        )
+
+    def add_many(
+        self, items: Iterable[Tuple[Union[str, bytes], str, Union[str, float]]]
+    ) -> List[bool]:
+        """Record the use of many signatures (in a single transaction).
+
+        :param items: Iterable of (signature, auth_user, valid_until).
+        :return: List of results (see ``add``).
+        """
+        now = self._now()
+        results = []
+        with self._connect() as connection:
+            self._purge_if_due(connection, now)
+            for signature, auth_user, valid_until in items:
+                cursor = connection.execute(
+                    self._insert_sql,
+                    (
+                        self.make_key(signature, auth_user, valid_until),
+                        float(valid_until),
+                    ),
+                )
+                results.append(cursor.rowcount == 1)
+        return results
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._connect() as connection:
+            connection.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        """Close the connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.__dict__.clear()
+
+
+class SharedMemoryReplayStore(ReplayStore):
+    """Replay store in shared memory.
+
+    A fixed-capacity open addressing (linear probing) hash table of
+    (key, valid until) slots in a ``multiprocessing.shared_memory`` block.
+    The table is split into ``stripes`` segments, each guarded by its own
+    (inter-process) lock; probing never leaves the segment of the key.
+    Expired slots are reused in place.
+
+    The store shall be created before the worker processes are forked:
+    children inherit both the memory mapping and the locks. Keep the live
+    signatures (signature rate times lifetime) well under half of the
+    ``capacity``. If no slot is free within ``max_probes`` slots, the
+    signature is rejected (fail closed) and a warning is logged.
+
+    :param capacity: Number of slots (24 bytes each).
+    :param stripes: Number of segments (and locks).
+    :param max_probes: Max number of slots probed per operation.
+    :param clock: Callable returning the current Unix timestamp. If not
+        given, the default clock (see ``ska.clocks``) is used.
+    """
+
+    # Key (16 bytes), valid until (Unix timestamp, 0 for empty slots)
+    _slot = struct.Struct("16sd")
+
+    def __init__(
+        self,
+        capacity: int = SHARED_REPLAY_STORE_CAPACITY,
+        stripes: int = REPLAY_STORE_SHARDS,
+        max_probes: int = REPLAY_STORE_MAX_PROBES,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """Constructor."""
+        super().__init__(clock=clock)
+        stripes = max(stripes, 1)
+        self.stripes = stripes
+        self.stripe_size = max(capacity // stripes, 1)
+        self.capacity = self.stripe_size * stripes
+        self.max_probes = max(min(max_probes, self.stripe_size), 1)
+        self._owner_pid = os.getpid()
+        self._shm = SharedMemory(
+            create=True, size=self.capacity * self._slot.size
+        )
+        # New blocks are zero filled (all slots empty).
+        self._buf = self._shm.buf
+        self._locks = tuple(multiprocessing.Lock() for __ in range(stripes))
+
+    def __len__(self) -> int:
+        """Number of live (not yet expired) entries."""
+        now = self._now()
+        iter_unpack = self._slot.iter_unpack
+        return sum(
+            1
+            for __, valid_until in iter_unpack(self._buf)
+            if valid_until >= now
+        )
+
+    def add_key(self, key: bytes, valid_until: float) -> bool:
+        """Record the use of the signature by key (see ``make_key``).
+
+        :param key: 16 bytes key.
+        :param valid_until: Unix timestamp.
+        :return: True on first use. False if the key is already known (or
+            there's no room for it).
+        """
+        now = self._now()
+        if valid_until < now:
+            # Expired signatures are rejected anyway. Do not keep.
+            return True
+
+        stripe = int.from_bytes(key[:4], "little") % self.stripes
+        home = int.from_bytes(key[4:12], "little") % self.stripe_size
+        first_slot = stripe * self.stripe_size
+        slot_size = self._slot.size
+        unpack_from = self._slot.unpack_from
+        buf = self._buf
+
+        with self._locks[stripe]:
+            free_offset = None
+            for probe in range(self.max_probes):
+                index = first_slot + (home + probe) % self.stripe_size
+                offset = index * slot_size
+                slot_key, slot_valid_until = unpack_from(buf, offset)
+                if slot_valid_until == 0:
+                    # Empty slot: end of the probe chain.
+                    if free_offset is None:
+                        free_offset = offset
+                    break
+                if slot_valid_until < now:
+                    # Expired slot: reusable, but the chain goes on.
+                    if free_offset is None:
+                        free_offset = offset
+                    continue
+                if slot_key == key:
+                    return False
+
+            if free_offset is None:
+                LOGGER.warning(
+                    "Replay store segment %s is full. Signature rejected.",
+                    stripe,
+                )
+                return False
+
+            self._slot.pack_into(buf, free_offset, key, valid_until)
+            return True
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            self._buf[:] = bytes(len(self._buf))
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def close(self) -> None:
+        """Release the shared memory.
+
+        The block is unlinked (destroyed) when closed by the process which
+        created it.
+        """
+        self._buf.release()
+        self._shm.close()
+        if os.getpid() == self._owner_pid:
+            self._shm.unlink()
@@ -1,14 +1,29 @@
-from typing import Callable, Dict, Optional, Type, Union
+from itertools import tee
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Type,
+    Union,
+)
 
 from .base import AbstractSignature, SignatureValidationResult
+from .caches import NegativeCache, ValidationCache
 from .defaults import (
     DEFAULT_AUTH_USER_PARAM,
     DEFAULT_EXTRA_PARAM,
+    DEFAULT_KEY_ID_PARAM,
     DEFAULT_SIGNATURE_PARAM,
     DEFAULT_URL_SUFFIX,
     DEFAULT_VALID_UNTIL_PARAM,
     SIGNATURE_LIFETIME,
 )
+from .keyring import KeyRing, get_signing_key
+from .replay import ReplayStore
 from .signatures import Signature
 from .utils import RequestHelper
 
@@ -18,6 +33,7 @@ __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
     "extract_signed_request_data",
     "sign_url",
+    "sign_urls",
     "signature_to_dict",
     "validate_signed_request_data",
 )
@@ -32,7 +48,7 @@ __all__ = (
 
 def sign_url(
     auth_user: str,
-    secret_key: str,
+    secret_key: Union[str, KeyRing],
     valid_until: Optional[Union[float, str]] = None,
     lifetime: int = SIGNATURE_LIFETIME,
     url: str = "",
@@ -44,11 +60,14 @@ def sign_url(
     extra_param: str = DEFAULT_EXTRA_PARAM,
     signature_cls: Type[AbstractSignature] = Signature,
     value_dumper: Optional[Callable] = None,
+    key_id_param: str = DEFAULT_KEY_ID_PARAM,
 ) -> str:
     """Sign the URL.
 
     :param auth_user: Username of the user making the request.
-    :param secret_key: The shared secret key.
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``). If a key ring is given, the key id is added to
+        the request params.
     :param valid_until: Unix timestamp. If not given, generated
         automatically (now + lifetime).
     :param lifetime: Signature lifetime in seconds.
@@ -66,6 +85,8 @@ def sign_url(
         ``extra_keys`` value.
     :param signature_cls:
     :param value_dumper:
+    :param key_id_param: Name of the GET param name which would hold the
+        ``key_id`` value.
     :return:
 
     :example:
@@ -99,6 +120,8 @@ def sign_url(
     if not isinstance(lifetime, int):
         raise TypeError("The 'lifetime' argument must be an integer")
 
+    key_id, secret_key = get_signing_key(secret_key)
+
     signature = signature_cls.generate_signature(
         auth_user=auth_user,
         secret_key=secret_key,
@@ -114,20 +137,126 @@ def sign_url(
         valid_until_param=valid_until_param,
         extra_param=extra_param,
         signature_cls=signature_cls,
+        key_id_param=key_id_param,
     )
 
     signed_url = request_helper.signature_to_url(
         signature=signature,
         endpoint_url=url,
         suffix=suffix,
+        key_id=key_id,
     )
 
     return signed_url
 
 
+def sign_urls(
+    specs: Iterable[Mapping[str, Any]],
+    secret_key: Union[str, KeyRing],
+    valid_until: Optional[Union[float, str]] = None,
+    lifetime: int = SIGNATURE_LIFETIME,
+    url: str = "",
+    suffix: str = DEFAULT_URL_SUFFIX,
+    signature_param: str = DEFAULT_SIGNATURE_PARAM,
+    auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
+    valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
+    extra_param: str = DEFAULT_EXTRA_PARAM,
+    signature_cls: Type[AbstractSignature] = Signature,
+    value_dumper: Optional[Callable] = None,
+    quoter: Optional[Callable] = None,
+    key_id_param: str = DEFAULT_KEY_ID_PARAM,
+) -> Iterator[str]:
+    """Sign URLs in bulk.
+
+    Unlike calling ``sign_url`` in a loop, the ``valid_until``, the keyed
+    signer and the request helper are shared by all URLs of the batch.
+    Signed URLs are yielded lazily (one per spec).
+
+    :param specs: Iterable of mappings, each holding the ``auth_user`` and
+        (optionally) the ``url`` and ``extra`` keys.
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``). If a key ring is given, the key id is added to
+        the request params.
+    :param valid_until: Unix timestamp. If not given, generated
+        automatically (now + lifetime). Shared by all URLs of the batch.
+    :param lifetime: Signature lifetime in seconds.
+    :param url: URL to be signed, if not given in the spec.
+    :param suffix: Suffix to add after the ``endpoint_url`` and before
+        the appended signature params.
+    :param signature_param: Name of the GET param name which would hold
+        the generated signature value.
+    :param auth_user_param: Name of the GET param name which would hold
+        the ``auth_user`` value.
+    :param valid_until_param: Name of the GET param name which would
+        hold the ``valid_until`` value.
+    :param extra_param: Name of the GET param name which would hold the
+        ``extra_keys`` value.
+    :param signature_cls:
+    :param value_dumper:
+    :param quoter:
+    :param key_id_param: Name of the GET param name which would hold the
+        ``key_id`` value.
+    :return:
+
+    :example:
+    Required imports.
+
+    >>> from ska import sign_urls
+
+    Producing signed URLs.
+
+    >>> signed_urls = sign_urls(
+    >>>     [
+    >>>         {'auth_user': 'user1', 'url': 'http://e.com/api/1/'},
+    >>>         {'auth_user': 'user2', 'url': 'http://e.com/api/2/'},
+    >>>     ],
+    >>>     secret_key='your-secret_key',
+    >>>     lifetime=120,
+    >>> )
+    """
+    if lifetime is None:
+        lifetime = SIGNATURE_LIFETIME
+
+    # assert isinstance(lifetime, int)
+    if not isinstance(lifetime, int):
+        raise TypeError("The 'lifetime' argument must be an integer")
+
+    key_id, secret_key = get_signing_key(secret_key)
+
+    request_helper = RequestHelper(
+        signature_param=signature_param,
+        auth_user_param=auth_user_param,
+        valid_until_param=valid_until_param,
+        extra_param=extra_param,
+        signature_cls=signature_cls,
+        key_id_param=key_id_param,
+    )
+
+    # Consumed twice: once for signing and once for the URL.
+    specs, _specs = tee(specs)
+
+    signatures = signature_cls.generate_signatures(
+        specs,
+        secret_key=secret_key,
+        valid_until=valid_until,
+        lifetime=lifetime,
+        value_dumper=value_dumper,
+        quoter=quoter,
+    )
+
+    return request_helper.signatures_to_urls(
+        (
+            (signature, spec.get("url", url))
+            for spec, signature in zip(_specs, signatures)
+        ),
+        suffix=suffix,
+        key_id=key_id,
+    )
+
+
 def signature_to_dict(
     auth_user: str,
-    secret_key: str,
+    secret_key: Union[str, KeyRing],
     valid_until: Optional[Union[float, str]] = None,
     lifetime: int = SIGNATURE_LIFETIME,
     signature_param: str = DEFAULT_SIGNATURE_PARAM,
@@ -138,11 +267,14 @@ def signature_to_dict(
     signature_cls: Type[AbstractSignature] = Signature,
     value_dumper: Optional[Callable] = None,
     quoter: Optional[Callable] = None,
+    key_id_param: str = DEFAULT_KEY_ID_PARAM,
 ) -> Dict[str, Union[bytes, str, float, int]]:
     """Return a dictionary containing the signature data params.
 
     :param auth_user: Username of the user making the request.
-    :param secret_key: The shared secret key.
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``). If a key ring is given, the key id is added to
+        the request params.
     :param valid_until: Unix timestamp. If not given, generated
         automatically (now + lifetime).
     :param lifetime: Signature lifetime in seconds.
@@ -158,6 +290,8 @@ def signature_to_dict(
     :param signature_cls:
     :param value_dumper:
     :param quoter:
+    :param key_id_param: Name of the (for example POST) param name which
+        would hold the ``key_id`` value.
     :return:
 
     :example:
@@ -189,6 +323,8 @@ def signature_to_dict(
     if not isinstance(lifetime, int):
         raise TypeError("The 'lifetime' argument must be an integer")
 
+    key_id, secret_key = get_signing_key(secret_key)
+
     signature = signature_cls.generate_signature(
         auth_user=auth_user,
         secret_key=secret_key,
@@ -205,16 +341,19 @@ def signature_to_dict(
         valid_until_param=valid_until_param,
         extra_param=extra_param,
         signature_cls=signature_cls,
+        key_id_param=key_id_param,
     )
 
-    signature_dict = request_helper.signature_to_dict(signature=signature)
+    signature_dict = request_helper.signature_to_dict(
+        signature=signature, key_id=key_id
+    )
 
     return signature_dict
 
 
 def validate_signed_request_data(
     data: Dict[str, Union[bytes, str, float, int]],
-    secret_key: str,
+    secret_key: Union[str, KeyRing],
     signature_param: str = DEFAULT_SIGNATURE_PARAM,
     auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
     valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
@@ -222,12 +361,18 @@ def validate_signed_request_data(
     signature_cls: Type[AbstractSignature] = Signature,
     value_dumper: Optional[Callable] = None,
     quoter: Optional[Callable] = None,
+    full_diagnostics: bool = False,
+    cache: Optional[ValidationCache] = None,
+    negative_cache: Optional[NegativeCache] = None,
+    key_id_param: str = DEFAULT_KEY_ID_PARAM,
+    replay_store: Optional[ReplayStore] = None,
 ) -> SignatureValidationResult:
     """Validate the signed request data.
 
     :param data: Dictionary holding the (HTTP) request (for example GET
         or POST) data.
-    :param secret_key: The shared secret key.
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``).
     :param signature_param: Name of the (for example GET or POST) param
         name which holds the ``signature`` value.
     :param auth_user_param: Name of the (for example GET or POST) param
@@ -239,6 +384,16 @@ def validate_signed_request_data(
     :param signature_cls:
     :param value_dumper:
     :param quoter:
+    :param full_diagnostics: If set to True, all errors are reported
+        (expired signatures are checked for validity as well).
+    :param cache: Cache of successful validations (see
+        ``ska.caches.ValidationCache``).
+    :param negative_cache: Cache of failed validations (see
+        ``ska.caches.NegativeCache``).
+    :param key_id_param: Name of the (for example GET or POST) param
+        name which holds the ``key_id`` value.
+    :param replay_store: Replay store (see ``ska.replay``). Valid
+        signatures are accepted only once.
     :return: A ``ska.SignatureValidationResult``
         object with the following properties:
             - `result` (bool): True if data is valid. False otherwise.
@@ -251,6 +406,7 @@ def validate_signed_request_data(
         valid_until_param=valid_until_param,
         extra_param=extra_param,
         signature_cls=signature_cls,
+        key_id_param=key_id_param,
     )
 
     validation_result = request_helper.validate_request_data(
@@ -258,6 +414,10 @@ def validate_signed_request_data(
         secret_key=secret_key,
         value_dumper=value_dumper,
         quoter=quoter,
+        full_diagnostics=full_diagnostics,
+        cache=cache,
+        negative_cache=negative_cache,
+        replay_store=replay_store,
     )
 
     return validation_result
@@ -265,7 +425,7 @@ def validate_signed_request_data(
 
 def extract_signed_request_data(
     data: Dict[str, Union[bytes, str, float, int]],
-    secret_key: Optional[str] = None,
+    secret_key: Optional[Union[str, KeyRing]] = None,
     signature_param: str = DEFAULT_SIGNATURE_PARAM,
     auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
     valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
@@ -275,12 +435,16 @@ def extract_signed_request_data(
     signature_cls: Type[AbstractSignature] = Signature,
     value_dumper: Optional[Callable] = None,
     quoter: Optional[Callable] = None,
+    negative_cache: Optional[NegativeCache] = None,
+    key_id_param: str = DEFAULT_KEY_ID_PARAM,
+    replay_store: Optional[ReplayStore] = None,
 ) -> Dict[str, Union[bytes, str, float, int]]:
     """Validate the signed request data.
 
     :param data: Dictionary holding the (HTTP) request (for example
         GET or POST) data.
-    :param secret_key: The shared secret key.
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``).
     :param signature_param: Name of the (for example GET or POST) param
         name which holds the ``signature`` value.
     :param auth_user_param: Name of the (for example GET or POST) param
@@ -295,6 +459,12 @@ def extract_signed_request_data(
     :param signature_cls:
     :param value_dumper:
     :param quoter:
+    :param negative_cache: Cache of failed validations (see
+        ``ska.caches.NegativeCache``).
+    :param key_id_param: Name of the (for example GET or POST) param
+        name which holds the ``key_id`` value.
+    :param replay_store: Replay store (see ``ska.replay``). Valid
+        signatures are accepted only once.
     :return: Dictionary with signed request data.
     """
     request_helper = RequestHelper(
@@ -303,6 +473,7 @@ def extract_signed_request_data(
         valid_until_param=valid_until_param,
         extra_param=extra_param,
         signature_cls=signature_cls,
+        key_id_param=key_id_param,
     )
 
     return request_helper.extract_signed_data(
@@ -312,4 +483,6 @@ def extract_signed_request_data(
         fail_silently=fail_silently,
         value_dumper=value_dumper,
         quoter=quoter,
+        negative_cache=negative_cache,
+        replay_store=replay_store,
     )
@@ -1,8 +1,8 @@
 import hashlib
-import hmac
 from typing import Callable, Dict, Optional, Union
 
 from ..base import AbstractSignature
+from ..schemas import SigningSchema
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
@@ -13,6 +13,8 @@ __all__ = ("HMACSHA256Signature",)
 class HMACSHA256Signature(AbstractSignature):
     """HMAC SHA-256 signature."""
 
+    digestmod = hashlib.sha256
+
     @classmethod
     def make_hash(
         cls,
@@ -22,6 +24,7 @@ class HMACSHA256Signature(AbstractSignature):
         extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        schema: Optional[SigningSchema] = None,
     ) -> bytes:
         """Make hash.
 
@@ -33,21 +36,21 @@ class HMACSHA256Signature(AbstractSignature):
         :param extra: Additional variables to be added.
         :param value_dumper:
         :param quoter:
+        :param schema: Compiled signing schema (see ``ska.schemas``).
         :return:
         """
         if not extra:
             extra = {}
 
-        raw_hmac = hmac.new(
-            cls.make_secret_key(secret_key),
-            cls.get_base(
+        raw_hmac = cls.get_signer(secret_key).digest_chunks(
+            cls.iter_base(
                 auth_user,
                 valid_until,
                 extra=extra,
                 value_dumper=value_dumper,
                 quoter=quoter,
-            ),
-            hashlib.sha256,
-        ).digest()
+                schema=schema,
+            )
+        )
 
         return raw_hmac
@@ -0,0 +1,112 @@
+"""
+Keyed signers.
+
+HMAC keying (deriving the inner and outer padded key state) is done once per
+secret key and algorithm. Every message signed afterwards starts from a copy
+of the prepared state, instead of re-keying a fresh ``hmac.HMAC`` object.
+
+Signers are kept in a bounded LRU (see ``get_signer``), so that setups with
+many providers (each with its own secret key) do not grow unbounded.
+"""
+
+import hmac
+from functools import lru_cache
+from typing import Callable, Iterable, Union
+
+from .defaults import SIGNER_CACHE_SIZE
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "Signer",
+    "clear_signer_cache",
+    "get_signer",
+)
+
+
+class Signer:
+    """Keyed HMAC signer.
+
+    :param secret_key: Secret key (as it's supposed to be used in
+        signature generation).
+    :param digestmod: Hash constructor (for instance, ``hashlib.sha1``).
+
+    :example:
+
+    >>> import hashlib
+    >>> signer = Signer(b'your-secret-key', hashlib.sha1)
+    >>> signer.digest(b'1378045287.0_user')
+    """
+
+    __slots__ = ("digestmod", "_hmac")
+
+    def __init__(
+        self,
+        secret_key: Union[str, bytes],
+        digestmod: Callable,
+    ) -> None:
+        """Constructor."""
+        if isinstance(secret_key, str):
+            secret_key = secret_key.encode()
+        self.digestmod = digestmod
+        self._hmac = hmac.new(secret_key, digestmod=digestmod)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self._hmac.name}>"
+
+    @property
+    def digest_size(self) -> int:
+        """Size of the resulting digest in bytes."""
+        return self._hmac.digest_size
+
+    def copy(self) -> hmac.HMAC:
+        """Return a copy of the prepared (keyed) HMAC state.
+
+        Can be fed incrementally with ``update`` calls.
+
+        :return:
+        """
+        return self._hmac.copy()
+
+    def digest(self, msg: bytes) -> bytes:
+        """Return the HMAC digest of the message given.
+
+        :param msg:
+        :return:
+        """
+        _hmac = self._hmac.copy()
+        _hmac.update(msg)
+        return _hmac.digest()
+
+    def digest_chunks(self, chunks: Iterable[bytes]) -> bytes:
+        """Return the HMAC digest of the message given in chunks.
+
+        :param chunks:
+        :return:
+        """
+        _hmac = self._hmac.copy()
+        for chunk in chunks:
+            _hmac.update(chunk)
+        return _hmac.digest()
+
+
+@lru_cache(maxsize=SIGNER_CACHE_SIZE)
+def get_signer(secret_key: bytes, digestmod: Callable) -> Signer:
+    """Get (cached) signer for the secret key and algorithm given.
+
+    :param secret_key: Secret key (as it's supposed to be used in
+        signature generation).
+    :param digestmod: Hash constructor (for instance, ``hashlib.sha1``).
+    :return:
+    """
+    return Signer(secret_key, digestmod)
+
+
+def clear_signer_cache() -> None:
+    """Clear the signer cache.
+
+    Useful when secret keys are rotated and old ones shall not be kept
+    in memory.
+    """
+    get_signer.cache_clear()
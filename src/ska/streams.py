@@ -0,0 +1,312 @@
+"""
+Signing of streams (request bodies, uploads, downloads, files).
+
+The content is hashed in fixed-size chunks and the resulting content digest
+is bound into the signature through ``extra`` (under the
+``content_digest_param`` key). Signatures of streams are therefore regular
+signatures: URL helpers (``RequestHelper.signature_to_url``,
+``RequestHelper.signature_to_dict``) keep working as is.
+
+Sources can be:
+
+- Bytes-like objects (``bytes``, ``bytearray``, ``memoryview``).
+- File-like objects (read with ``readinto`` into a reusable buffer, or
+  with ``read`` if ``readinto`` is not available).
+- Iterables of bytes-like chunks (for instance, a streaming HTTP body).
+- Strings, hashed UTF-8 encoded (a request body, not a file name).
+- Paths (``os.PathLike``, for instance ``pathlib.Path``) of on-disk files.
+  Files are memory mapped and their digests cached, keyed on (path, size,
+  mtime). Plain ``str`` paths are taken as content: wrap them in
+  ``pathlib.Path`` (or use ``file_digest``).
+
+:example:
+
+>>> from pathlib import Path
+>>> from ska.streams import sign_stream, validate_stream
+>>> with open('report.pdf', 'rb') as file:
+>>>     signature = sign_stream(file, 'user', 'your-secret-key')
+>>> validate_stream(
+>>>     Path('report.pdf'),
+>>>     signature=signature.signature,
+>>>     auth_user='user',
+>>>     secret_key='your-secret-key',
+>>>     valid_until=signature.valid_until,
+>>>     extra=signature.extra,
+>>> )
+True
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from hmac import compare_digest
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from . import error_codes
+from .base import AbstractSignature, SignatureValidationResult
+from .defaults import DEFAULT_CONTENT_DIGEST_PARAM, SIGNATURE_LIFETIME
+from .signatures import Signature
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = (
+    "DEFAULT_STREAM_CHUNK_SIZE",
+    "FILE_DIGEST_CACHE_SIZE",
+    "clear_file_digest_cache",
+    "content_digest",
+    "file_digest",
+    "sign_stream",
+    "validate_stream",
+)
+
+# Number of bytes hashed at once.
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Max number of file digests kept in memory.
+FILE_DIGEST_CACHE_SIZE = 256
+
+# (path, size, mtime, digestmod) -> hex digest
+_FILE_DIGEST_CACHE: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+_FILE_DIGEST_CACHE_LOCK = threading.Lock()
+
+Source = Union[
+    bytes, bytearray, memoryview, str, os.PathLike, Iterable[bytes], Any
+]
+
+
+def _update_with_buffer(_hash, buffer: Any, chunk_size: int) -> None:
+    """Feed the buffer given into the hash in chunks (without copying)."""
+    with memoryview(buffer) as view, view.cast("B") as octets:
+        for start in range(0, len(octets), chunk_size):
+            _hash.update(octets[start : start + chunk_size])
+
+
+def file_digest(
+    path: Union[str, os.PathLike],
+    digestmod: Callable = hashlib.sha256,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> str:
+    """Hex digest of the file given.
+
+    The file is memory mapped. Digests are cached, keyed on the path, size
+    and modification time of the file (and the algorithm).
+
+    :param path:
+    :param digestmod: Hash constructor (for instance, ``hashlib.sha256``).
+    :param chunk_size:
+    :return:
+    """
+    path = os.path.abspath(os.fspath(path))
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns, digestmod)
+
+    with _FILE_DIGEST_CACHE_LOCK:
+        try:
+            _FILE_DIGEST_CACHE.move_to_end(key)
+            return _FILE_DIGEST_CACHE[key]
+        except KeyError:
+            pass
+
+    _hash = digestmod()
+    with open(path, "rb") as file:
+        # Empty files can not be memory mapped.
+        if stat.st_size:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as _map:
+                _update_with_buffer(_hash, _map, chunk_size)
+    digest = _hash.hexdigest()
+
+    with _FILE_DIGEST_CACHE_LOCK:
+        _FILE_DIGEST_CACHE[key] = digest
+        while len(_FILE_DIGEST_CACHE) > FILE_DIGEST_CACHE_SIZE:
+            _FILE_DIGEST_CACHE.popitem(last=False)
+
+    return digest
+
+
+def clear_file_digest_cache() -> None:
+    """Clear the file digest cache."""
+    with _FILE_DIGEST_CACHE_LOCK:
+        _FILE_DIGEST_CACHE.clear()
+
+
+def content_digest(
+    source: Source,
+    digestmod: Callable = hashlib.sha256,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> str:
+    """Hex digest of the content of the source given.
+
+    :param source: Bytes-like object, string (UTF-8 encoded), file-like
+        object, iterable of bytes-like chunks or path (``os.PathLike``) of
+        a file.
+    :param digestmod: Hash constructor (for instance, ``hashlib.sha256``).
+    :param chunk_size: Number of bytes hashed (and read) at once.
+    :return:
+    """
+    if isinstance(source, os.PathLike):
+        return file_digest(source, digestmod=digestmod, chunk_size=chunk_size)
+
+    if isinstance(source, str):
+        source = source.encode()
+
+    _hash = digestmod()
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        _update_with_buffer(_hash, source, chunk_size)
+
+    elif hasattr(source, "readinto"):
+        buffer = bytearray(chunk_size)
+        with memoryview(buffer) as view:
+            while True:
+                size = source.readinto(view)
+                if not size:
+                    break
+                _hash.update(view[:size])
+
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            _hash.update(chunk)
+
+    else:
+        for chunk in source:
+            _hash.update(chunk)
+
+    return _hash.hexdigest()
+
+
+def sign_stream(
+    source: Source,
+    auth_user: str,
+    secret_key: str,
+    valid_until: Optional[Union[float, str]] = None,
+    lifetime: int = SIGNATURE_LIFETIME,
+    extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+    signature_cls: Type[AbstractSignature] = Signature,
+    value_dumper: Optional[Callable] = None,
+    quoter: Optional[Callable] = None,
+    content_digest_param: str = DEFAULT_CONTENT_DIGEST_PARAM,
+    digestmod: Callable = hashlib.sha256,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> AbstractSignature:
+    """Sign the content of the source given.
+
+    The content digest is added to the ``extra`` (under the
+    ``content_digest_param`` key) of the signature.
+
+    :param source: Bytes-like object, string (UTF-8 encoded), file-like
+        object, iterable of bytes-like chunks or path (``os.PathLike``) of
+        a file.
+    :param auth_user:
+    :param secret_key:
+    :param valid_until: Unix timestamp, valid until.
+    :param lifetime: Lifetime of the signature in seconds.
+    :param extra: Additional variables to be added.
+    :param signature_cls:
+    :param value_dumper:
+    :param quoter:
+    :param content_digest_param: Name of the ``extra`` key holding the
+        content digest.
+    :param digestmod: Hash constructor of the content digest.
+    :param chunk_size: Number of bytes hashed (and read) at once.
+    :return:
+    """
+    extra = dict(extra) if extra else {}
+    extra[content_digest_param] = content_digest(
+        source, digestmod=digestmod, chunk_size=chunk_size
+    )
+
+    return signature_cls.generate_signature(
+        auth_user=auth_user,
+        secret_key=secret_key,
+        valid_until=valid_until,
+        lifetime=lifetime,
+        extra=extra,
+        value_dumper=value_dumper,
+        quoter=quoter,
+    )
+
+
+def validate_stream(
+    source: Source,
+    signature: Union[str, bytes],
+    auth_user: str,
+    secret_key: str,
+    valid_until: Union[str, float],
+    extra: Optional[Dict[str, Union[bytes, str, float, int]]] = None,
+    return_object: bool = False,
+    signature_cls: Type[AbstractSignature] = Signature,
+    value_dumper: Optional[Callable] = None,
+    quoter: Optional[Callable] = None,
+    content_digest_param: str = DEFAULT_CONTENT_DIGEST_PARAM,
+    digestmod: Callable = hashlib.sha256,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> Union[SignatureValidationResult, bool]:
+    """Validate the signature of the content of the source given.
+
+    The signature is validated first. The content is hashed only if the
+    signature is valid.
+
+    :param source: Bytes-like object, string (UTF-8 encoded), file-like
+        object, iterable of bytes-like chunks or path (``os.PathLike``) of
+        a file.
+    :param signature:
+    :param auth_user:
+    :param secret_key:
+    :param valid_until: Unix timestamp.
+    :param extra: Signed extra arguments (including the content digest).
+    :param return_object: If set to True, an instance of
+        ``SignatureValidationResult`` is returned.
+    :param signature_cls:
+    :param value_dumper:
+    :param quoter:
+    :param content_digest_param: Name of the ``extra`` key holding the
+        content digest.
+    :param digestmod: Hash constructor of the content digest.
+    :param chunk_size: Number of bytes hashed (and read) at once.
+    :return:
+    """
+    if not extra:
+        extra = {}
+
+    validation_result = signature_cls.validate_signature(
+        signature=signature,
+        auth_user=auth_user,
+        secret_key=secret_key,
+        valid_until=valid_until,
+        extra=extra,
+        return_object=True,
+        value_dumper=value_dumper,
+        quoter=quoter,
+    )
+
+    if validation_result.result:
+        expected_digest = extra.get(content_digest_param)
+        if not isinstance(expected_digest, str) or not compare_digest(
+            content_digest(
+                source, digestmod=digestmod, chunk_size=chunk_size
+            ),
+            expected_digest,
+        ):
+            validation_result = SignatureValidationResult(
+                False, [error_codes.CONTENT_DIGEST_MISMATCH]
+            )
+
+    if return_object:
+        return validation_result
+    return validation_result.result
+
@@ -1,10 +1,20 @@
 import datetime
+import hashlib
+import hmac
 import logging
+import multiprocessing
+import os
+import time
+import tracemalloc
 import unittest
-from copy import copy
+from base64 import b64encode
+from copy import copy, deepcopy
 from decimal import Decimal
 
+import mock
+
 from .. import (
+    AbstractSignature,
     HMACMD5Signature,
     HMACSHA1Signature,
     HMACSHA224Signature,
@@ -13,11 +23,28 @@ from .. import (
     HMACSHA512Signature,
     RequestHelper,
     Signature,
+    Signer,
+    SigningSchema,
     error_codes,
+    get_signer,
     sign_url,
+    sign_urls,
     signature_to_dict,
     validate_signed_request_data,
 )
+from ..caches import NegativeCache, ValidationCache
+from ..clocks import CoarseClock, FrozenClock, get_clock, set_clock
+from ..exceptions import ImproperlyConfigured, InvalidData
+from ..helpers import (
+    dict_to_ordered_dict,
+    iter_json,
+    iter_sorted_urlencode,
+    javascript_quoter,
+    javascript_value_dumper,
+    make_valid_until,
+    sorted_urlencode,
+)
+from ..keyring import KeyRing
 from .base import parse_url_params, timestamp_to_human_readable
 
 __title__ = "ska.tests.test_core"
@@ -25,15 +52,34 @@ __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
 __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = (
+    "BatchSigningTest",
+    "BatchValidationTest",
+    "ClockTest",
     "ExtraTest",
+    "KeyRingTest",
+    "NegativeCacheTest",
     "ShortcutsTest",
     "SignatureTest",
+    "SignerTest",
+    "SigningSchemaTest",
+    "StreamingBaseTest",
     "URLHelperTest",
+    "ValidationCacheTest",
 )
 
 LOGGER = logging.getLogger(__name__)
 
 
+class PepperedSignature(HMACSHA256Signature):
+    """Signature class overriding ``make_hash`` of a built-in one."""
+
+    @classmethod
+    def make_hash(cls, auth_user, secret_key, *args, **kwargs):
+        return super().make_hash(
+            auth_user, f"{secret_key}-pepper", *args, **kwargs
+        )
+
+
 class SignatureTest(unittest.TestCase):
     """Tests of `ska.Signature` class."""
 
@@ -265,6 +311,7 @@ class SignatureTest(unittest.TestCase):
             secret_key="fakesecret",
             valid_until=1377997396.0,
             return_object=True,
+            full_diagnostics=True,
         )
 
         self.assertIsInstance(validation_result.reason, map)
@@ -288,6 +335,73 @@ class SignatureTest(unittest.TestCase):
                 signature_cls=signature_cls
             )
 
+    def test_06_expired_signature_rejected_before_hashing(self):
+        """Expired signatures are rejected without computing the hash."""
+        for signature_cls in self.signature_classes:
+            with mock.patch.object(signature_cls, "make_hash") as make_hash:
+                self.assertFalse(
+                    signature_cls.validate_signature(
+                        signature="EBS6ipiqRLa6TY5vxIvZU30FpnM=",
+                        auth_user="fakeuser",
+                        secret_key="fakesecret",
+                        valid_until=1377997396.0,
+                    )
+                )
+                validation_result = signature_cls.validate_signature(
+                    signature="EBS6ipiqRLa6TY5vxIvZU30FpnM=",
+                    auth_user="fakeuser",
+                    secret_key="fakesecret",
+                    valid_until=1377997396.0,
+                    return_object=True,
+                )
+                make_hash.assert_not_called()
+
+            self.assertFalse(validation_result.result)
+            self.assertEqual(
+                validation_result.errors,
+                [error_codes.SIGNATURE_TIMESTAMP_EXPIRED],
+            )
+
+    def test_07_malformed_valid_until(self):
+        """Malformed `valid_until` values."""
+        for signature_cls in self.signature_classes:
+            for valid_until in ("", "not-a-timestamp", "nan", None):
+                self.assertFalse(
+                    signature_cls.validate_signature(
+                        signature="EBS6ipiqRLa6TY5vxIvZU30FpnM=",
+                        auth_user=self.auth_user,
+                        secret_key=self.secret_key,
+                        valid_until=valid_until,
+                    )
+                )
+                validation_result = signature_cls.validate_signature(
+                    signature="EBS6ipiqRLa6TY5vxIvZU30FpnM=",
+                    auth_user=self.auth_user,
+                    secret_key=self.secret_key,
+                    valid_until=valid_until,
+                    return_object=True,
+                    full_diagnostics=True,
+                )
+                self.assertEqual(
+                    validation_result.errors, [error_codes.INVALID_SIGNATURE]
+                )
+
+            # Signatures are not generated.
+            for valid_until in ("not-a-timestamp", "nan", "inf"):
+                with self.assertRaises(InvalidData):
+                    signature_cls.generate_signature(
+                        auth_user=self.auth_user,
+                        secret_key=self.secret_key,
+                        valid_until=valid_until,
+                    )
+        with self.assertRaises(InvalidData):
+            sign_url(
+                auth_user=self.auth_user,
+                secret_key=self.secret_key,
+                valid_until="not-a-timestamp",
+                url="http://e.com/",
+            )
+
 
 class URLHelperTest(unittest.TestCase):
     """Tests of `ska.URLHelper` class."""
@@ -806,3 +920,988 @@ class ExtraTest(unittest.TestCase):
                     signature_cls=signature_cls
                 )
             )
+
+
+class SignerTest(unittest.TestCase):
+    """Tests of `ska.Signer` class."""
+
+    def setUp(self):
+        """Set up."""
+        self.auth_user = "user"
+        self.secret_key = "secret"
+        self.signature_classes = (
+            HMACMD5Signature,
+            HMACSHA1Signature,
+            HMACSHA224Signature,
+            HMACSHA256Signature,
+            HMACSHA384Signature,
+            HMACSHA512Signature,
+        )
+
+    def test_01_digest_matches_hmac(self):
+        """Signer digest matches the one of a freshly keyed HMAC."""
+        msg = b"1378045287.0_user_email%3Djohn.doe%40mail.example.com"
+        for digestmod in (hashlib.md5, hashlib.sha1, hashlib.sha512):
+            signer = Signer(self.secret_key, digestmod)
+            expected = hmac.new(b"secret", msg, digestmod).digest()
+            self.assertEqual(signer.digest(msg), expected)
+            # Prepared state is not altered by previous digests
+            self.assertEqual(signer.digest(msg), expected)
+
+            _hmac = signer.copy()
+            _hmac.update(msg[:10])
+            _hmac.update(msg[10:])
+            self.assertEqual(_hmac.digest(), expected)
+
+    def test_02_get_signer_is_cached(self):
+        """Same signer is returned for the same key and algorithm."""
+        self.assertIs(
+            get_signer(b"secret", hashlib.sha1),
+            get_signer(b"secret", hashlib.sha1),
+        )
+        self.assertIsNot(
+            get_signer(b"secret", hashlib.sha1),
+            get_signer(b"secret", hashlib.sha256),
+        )
+        self.assertIs(
+            HMACSHA256Signature.get_signer(self.secret_key),
+            get_signer(b"secret", hashlib.sha256),
+        )
+
+    def test_03_signature_matches_hmac(self):
+        """Signatures generated through signers did not change."""
+        extra = {"email": "john.doe@mail.example.com", "first_name": "John"}
+        for signature_cls in self.signature_classes:
+            sig = signature_cls.generate_signature(
+                auth_user=self.auth_user,
+                secret_key=self.secret_key,
+                valid_until="1378045287.0",
+                extra=extra,
+            )
+            expected = hmac.new(
+                b"secret",
+                signature_cls.get_base(
+                    self.auth_user, "1378045287.0", extra=extra
+                ),
+                signature_cls.digestmod,
+            ).digest()
+            self.assertEqual(sig.signature, b64encode(expected))
+
+
+class BatchSigningTest(unittest.TestCase):
+    """Tests of batch signing."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.valid_until = "1378045287.0"
+        self.specs = [
+            {"auth_user": "user1", "url": "http://e.com/api/1/"},
+            {
+                "auth_user": "user2",
+                "url": "http://e.com/api/2/",
+                "extra": {
+                    "provider": "service1.example.com",
+                    "email": "john.doe@mail.example.com",
+                },
+            },
+            {
+                "auth_user": "user3",
+                "extra": {
+                    "provider": "service1.example.com",
+                    "email": "jane.doe@mail.example.com",
+                },
+            },
+            {
+                "auth_user": "user4",
+                # Overlaps with a reserved param name
+                "extra": {"signature": "tampered"},
+            },
+        ]
+        self.signature_classes = (
+            HMACMD5Signature,
+            HMACSHA1Signature,
+            HMACSHA224Signature,
+            HMACSHA256Signature,
+            HMACSHA384Signature,
+            HMACSHA512Signature,
+        )
+
+    def test_01_generate_signatures(self):
+        """Batch signatures match the ones generated one by one."""
+        for signature_cls in self.signature_classes:
+            signatures = signature_cls.generate_signatures(
+                self.specs,
+                secret_key=self.secret_key,
+                valid_until=self.valid_until,
+            )
+            for spec, sig in zip(self.specs, signatures):
+                expected = signature_cls.generate_signature(
+                    auth_user=spec["auth_user"],
+                    secret_key=self.secret_key,
+                    valid_until=self.valid_until,
+                    extra=spec.get("extra"),
+                )
+                self.assertEqual(sig.signature, expected.signature)
+
+    def test_02_generate_signatures_shared_valid_until(self):
+        """All signatures of a batch share the same `valid_until`."""
+        signatures = list(
+            Signature.generate_signatures(self.specs, self.secret_key)
+        )
+        self.assertEqual(len({sig.valid_until for sig in signatures}), 1)
+        self.assertFalse(signatures[0].is_expired())
+
+    def test_03_sign_urls(self):
+        """Batch signed URLs match the ones signed one by one."""
+        for signature_cls in self.signature_classes:
+            signed_urls = sign_urls(
+                self.specs,
+                secret_key=self.secret_key,
+                valid_until=self.valid_until,
+                url="http://e.com/api/",
+                signature_cls=signature_cls,
+            )
+            self.assertNotIsInstance(signed_urls, list)
+            for spec, signed_url in zip(self.specs, signed_urls):
+                expected = sign_url(
+                    auth_user=spec["auth_user"],
+                    secret_key=self.secret_key,
+                    valid_until=self.valid_until,
+                    url=spec.get("url", "http://e.com/api/"),
+                    extra=spec.get("extra"),
+                    signature_cls=signature_cls,
+                )
+                self.assertEqual(signed_url, expected)
+
+    def test_04_sign_urls_validate(self):
+        """Batch signed URLs are valid."""
+        signed_urls = sign_urls(self.specs[:3], secret_key=self.secret_key)
+        for signed_url in signed_urls:
+            validation_result = validate_signed_request_data(
+                data=parse_url_params(signed_url),
+                secret_key=self.secret_key,
+            )
+            self.assertTrue(validation_result.result)
+
+    def test_05_generate_signatures_make_hash_override(self):
+        """Overridden ``make_hash`` is used for batch signatures as well."""
+        signatures = PepperedSignature.generate_signatures(
+            self.specs,
+            secret_key=self.secret_key,
+            valid_until=self.valid_until,
+        )
+        for spec, sig in zip(self.specs, signatures):
+            expected = PepperedSignature.generate_signature(
+                auth_user=spec["auth_user"],
+                secret_key=self.secret_key,
+                valid_until=self.valid_until,
+                extra=spec.get("extra"),
+            )
+            self.assertEqual(sig.signature, expected.signature)
+            self.assertNotEqual(
+                sig.signature,
+                HMACSHA256Signature.generate_signature(
+                    auth_user=spec["auth_user"],
+                    secret_key=self.secret_key,
+                    valid_until=self.valid_until,
+                    extra=spec.get("extra"),
+                ).signature,
+            )
+
+
+class BatchValidationTest(unittest.TestCase):
+    """Tests of batch validation."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.signature_classes = (
+            HMACMD5Signature,
+            HMACSHA1Signature,
+            HMACSHA224Signature,
+            HMACSHA256Signature,
+            HMACSHA384Signature,
+            HMACSHA512Signature,
+        )
+
+    def __get_datas(self, signature_cls=Signature):
+        """Valid, tampered, expired and malformed payloads."""
+        valid = signature_to_dict(
+            auth_user="user",
+            secret_key=self.secret_key,
+            extra={"email": "john.doe@mail.example.com"},
+            signature_cls=signature_cls,
+        )
+        tampered = copy(valid)
+        tampered["email"] = "jane.doe@mail.example.com"
+        expired = signature_to_dict(
+            auth_user="user",
+            secret_key=self.secret_key,
+            valid_until=signature_cls.datetime_to_unix_timestamp(
+                datetime.datetime.now() - datetime.timedelta(seconds=300)
+            ),
+            signature_cls=signature_cls,
+        )
+        malformed = copy(valid)
+        malformed["valid_until"] = "not-a-timestamp"
+        return [valid, tampered, expired, malformed]
+
+    def test_01_validate_many(self):
+        """Batch validation matches per-item validation."""
+        for signature_cls in self.signature_classes:
+            request_helper = RequestHelper(signature_cls=signature_cls)
+            datas = self.__get_datas(signature_cls=signature_cls)
+            validation_results = request_helper.validate_many(
+                datas, self.secret_key
+            )
+            self.assertEqual(len(validation_results), 4)
+            self.assertEqual(
+                list(validation_results), [True, False, False, False]
+            )
+            self.assertFalse(validation_results)
+            self.assertEqual(
+                list(validation_results.error_codes),
+                [
+                    0,
+                    int(error_codes.INVALID_SIGNATURE),
+                    int(error_codes.SIGNATURE_TIMESTAMP_EXPIRED),
+                    int(error_codes.INVALID_SIGNATURE),
+                ],
+            )
+            self.assertEqual(validation_results.errors(0), [])
+            self.assertEqual(
+                validation_results.errors(2),
+                [error_codes.SIGNATURE_TIMESTAMP_EXPIRED],
+            )
+            for data, result in zip(datas[:3], validation_results):
+                self.assertEqual(
+                    request_helper.validate_request_data(
+                        data, self.secret_key
+                    ).result,
+                    result,
+                )
+
+    def test_02_validate_many_wrong_secret_key(self):
+        """Batch validation with wrong secret key."""
+        request_helper = RequestHelper()
+        validation_results = request_helper.validate_many(
+            self.__get_datas()[:1], "wrong-secret"
+        )
+        self.assertEqual(list(validation_results), [False])
+
+    def test_03_validate_many_make_hash_override(self):
+        """Overridden ``make_hash`` is used for batch validation as well."""
+        request_helper = RequestHelper(signature_cls=PepperedSignature)
+        datas = self.__get_datas(signature_cls=PepperedSignature)
+        validation_results = request_helper.validate_many(
+            datas, self.secret_key
+        )
+        self.assertEqual(list(validation_results), [True, False, False, False])
+        for data, result in zip(datas, validation_results):
+            self.assertEqual(
+                request_helper.validate_request_data(
+                    data, self.secret_key
+                ).result,
+                result,
+            )
+
+
+class ClockTest(unittest.TestCase):
+    """Tests of clocks."""
+
+    def tearDown(self):
+        """Tear down."""
+        set_clock()
+
+    def test_01_make_valid_until(self):
+        """Wire format of `valid_until` did not change."""
+        clock = FrozenClock(1378044687.75)
+        self.assertEqual(make_valid_until(600, clock=clock), 1378045287.0)
+        self.assertEqual(
+            str(make_valid_until(600, clock=clock)), "1378045287.0"
+        )
+
+        # Same as the previous (datetime based) implementation
+        expected = time.mktime(
+            (
+                datetime.datetime.now() + datetime.timedelta(seconds=600)
+            ).timetuple()
+        )
+        self.assertAlmostEqual(make_valid_until(600), expected, delta=1)
+
+        sig = Signature.generate_signature(
+            "user", "secret", lifetime=600, clock=clock
+        )
+        self.assertEqual(sig.valid_until, 1378045287.0)
+
+    def test_02_is_expired(self):
+        """Expiration is checked against the clock given."""
+        sig = Signature.generate_signature(
+            auth_user="user",
+            secret_key="secret",
+            valid_until="1378045287.0",
+        )
+        self.assertTrue(sig.is_expired())
+        self.assertFalse(sig.is_expired(clock=FrozenClock(1378045286.0)))
+        self.assertTrue(sig.is_expired(clock=FrozenClock(1378045287.0)))
+
+        validation_result = Signature.validate_signature(
+            signature=sig.signature,
+            auth_user="user",
+            secret_key="secret",
+            valid_until="1378045287.0",
+            return_object=True,
+            clock=FrozenClock(1378045286.0),
+        )
+        self.assertTrue(validation_result.result)
+
+    def test_03_set_clock(self):
+        """Default clock can be replaced."""
+        clock = FrozenClock(1378045286.0)
+        set_clock(clock)
+        self.assertIs(get_clock(), clock)
+        self.assertEqual(make_valid_until(1), 1378045287.0)
+
+        request_data = signature_to_dict(
+            auth_user="user", secret_key="secret", lifetime=1
+        )
+        self.assertTrue(
+            validate_signed_request_data(request_data, "secret").result
+        )
+
+        set_clock()
+        self.assertFalse(
+            validate_signed_request_data(request_data, "secret").result
+        )
+
+    def test_04_coarse_clock(self):
+        """Coarse clock."""
+        clock = CoarseClock(resolution=0.01)
+        try:
+            self.assertAlmostEqual(clock(), time.time(), delta=1)
+            first = clock()
+            time.sleep(0.05)
+            self.assertGreater(clock(), first)
+        finally:
+            clock.stop()
+
+    @unittest.skipUnless(
+        hasattr(os, "register_at_fork"), "Requires os.register_at_fork"
+    )
+    def test_05_coarse_clock_fork(self):
+        """Coarse clocks keep moving in forked processes."""
+        clock = CoarseClock(resolution=0.01)
+        self.addCleanup(clock.stop)
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+
+        def worker():
+            first = clock()
+            time.sleep(0.2)
+            queue.put((clock() - first, time.time() - clock()))
+
+        process = context.Process(target=worker)
+        process.start()
+        moved, lag = queue.get(timeout=10)
+        process.join()
+        self.assertGreater(moved, 0)
+        self.assertLess(lag, 0.1)
+
+
+
+class SigningSchemaTest(unittest.TestCase):
+    """Tests of compiled signing schemas."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.extra = {
+            "provider": "service1.example.com",
+            "email": "john.doe@mail.example.com",
+            "first_name": "Jöhn (Junior)",
+            "last_name": "O'Doe & Co",
+            "age": 42,
+            "groups": [{"name": "b", "id": 2}, {"name": "a", "id": 1}],
+            "profile": {"tags": ["x", "y"], "active": True},
+        }
+
+    def test_01_urlencode(self):
+        """Same output as `sorted_urlencode`."""
+        for value_dumper, quoter in (
+            (None, None),
+            (javascript_value_dumper, javascript_quoter),
+            (javascript_value_dumper, str.upper),
+        ):
+            schema = SigningSchema(
+                self.extra, value_dumper=value_dumper, quoter=quoter
+            )
+            # Twice, to go through the memoized values as well.
+            for __ in range(2):
+                self.assertEqual(
+                    schema.urlencode(dict(self.extra)),
+                    sorted_urlencode(
+                        dict(self.extra),
+                        value_dumper=value_dumper,
+                        quoter=quoter,
+                    ),
+                )
+
+    def test_02_urlencode_other_keys(self):
+        """Extra data not matching the schema is encoded the generic way."""
+        schema = SigningSchema(["email", "provider"])
+        for extra in (
+            {"email": "john.doe@mail.example.com"},
+            {"email": "john.doe@mail.example.com", "name": "John"},
+            self.extra,
+        ):
+            self.assertEqual(
+                schema.urlencode(dict(extra)), sorted_urlencode(dict(extra))
+            )
+
+    def test_03_sign_and_validate(self):
+        """Signatures do not depend on the schema."""
+        schema = SigningSchema(
+            self.extra,
+            value_dumper=javascript_value_dumper,
+            quoter=javascript_quoter,
+        )
+        signature = Signature.generate_signature(
+            auth_user="user",
+            secret_key=self.secret_key,
+            extra=self.extra,
+            schema=schema,
+        )
+        expected = Signature.generate_signature(
+            auth_user="user",
+            secret_key=self.secret_key,
+            valid_until=signature.valid_until,
+            extra=self.extra,
+            value_dumper=javascript_value_dumper,
+            quoter=javascript_quoter,
+        )
+        self.assertEqual(signature.signature, expected.signature)
+
+        self.assertTrue(
+            Signature.validate_signature(
+                signature=signature.signature,
+                auth_user="user",
+                secret_key=self.secret_key,
+                valid_until=signature.valid_until,
+                extra=self.extra,
+                schema=schema,
+            )
+        )
+
+        request_helper = RequestHelper()
+        request_data = request_helper.signature_to_dict(signature)
+        self.assertTrue(
+            request_helper.validate_request_data(
+                request_data, self.secret_key, schema=schema
+            ).result
+        )
+
+        request_data["email"] = "jane.doe@mail.example.com"
+        self.assertFalse(
+            request_helper.validate_request_data(
+                request_data, self.secret_key, schema=schema
+            ).result
+        )
+
+    def test_04_value_dumpers(self):
+        """Per key value dumpers."""
+        schema = SigningSchema(
+            ["age", "email"], value_dumpers={"age": lambda value: value + 1}
+        )
+        self.assertEqual(
+            schema.urlencode({"age": 41, "email": "john@e.com"}),
+            sorted_urlencode({"age": 42, "email": "john@e.com"}),
+        )
+
+    def test_05_legacy_signature_classes(self):
+        """Custom ``make_hash`` and ``get_base`` without ``schema`` work."""
+
+        class LegacyHashSignature(AbstractSignature):
+            @classmethod
+            def make_hash(
+                cls,
+                auth_user,
+                secret_key,
+                valid_until=None,
+                extra=None,
+                value_dumper=None,
+                quoter=None,
+            ):
+                return hmac.new(
+                    secret_key.encode(),
+                    cls.get_base(auth_user, valid_until, extra=extra),
+                    hashlib.sha1,
+                ).digest()
+
+        class LegacyBaseSignature(HMACSHA1Signature):
+            @classmethod
+            def get_base(
+                cls,
+                auth_user,
+                timestamp,
+                extra=None,
+                value_dumper=None,
+                quoter=None,
+            ):
+                return f"{timestamp}:{auth_user}".encode()
+
+        for signature_cls in (LegacyHashSignature, LegacyBaseSignature):
+            signed_url = sign_url(
+                auth_user="user",
+                secret_key=self.secret_key,
+                url="http://e.com/",
+                extra={"email": "john@e.com"},
+                signature_cls=signature_cls,
+            )
+            self.assertTrue(signed_url)
+
+            request_helper = RequestHelper(signature_cls=signature_cls)
+            signatures = list(
+                signature_cls.generate_signatures(
+                    [{"auth_user": "user", "extra": {"email": "john@e.com"}}],
+                    self.secret_key,
+                )
+            )
+            request_data = request_helper.signature_to_dict(signatures[0])
+            self.assertTrue(
+                request_helper.validate_request_data(
+                    request_data, self.secret_key
+                ).result
+            )
+            self.assertEqual(
+                list(
+                    request_helper.validate_many(
+                        [request_data], self.secret_key
+                    )
+                ),
+                [True],
+            )
+
+
+class StreamingBaseTest(unittest.TestCase):
+    """Tests of incremental base string construction."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.extra = {
+            "email": "john.doe@mail.example.com",
+            "bio": "Jöhn (Junior) O'Doe & Co " * 500,
+            "data": {
+                "tags": ["x", "y", {"b": 2, "a": 1}],
+                "items": [
+                    {
+                        "id": index,
+                        "name": f"name {index}",
+                        "score": index / 3,
+                        "meta": {"z": None, "a": [True, (1, "t")]},
+                    }
+                    for index in range(300)
+                ],
+                "ids": {1: "int key"},
+            },
+        }
+
+    def test_01_iter_sorted_urlencode(self):
+        """Same output as `sorted_urlencode`."""
+        for value_dumper, quoter in (
+            (None, None),
+            (javascript_value_dumper, javascript_quoter),
+            (javascript_value_dumper, str.upper),
+        ):
+            expected = sorted_urlencode(
+                self.extra, value_dumper=value_dumper, quoter=quoter
+            )
+            for chunk_size in (7, 1024, 64 * 1024):
+                self.assertEqual(
+                    "".join(
+                        iter_sorted_urlencode(
+                            self.extra,
+                            value_dumper=value_dumper,
+                            quoter=quoter,
+                            chunk_size=chunk_size,
+                        )
+                    ),
+                    expected,
+                )
+
+    def test_02_iter_json(self):
+        """Same output as `javascript_value_dumper` of ordered data."""
+        value = self.extra["data"]
+        self.assertEqual(
+            "".join(iter_json(value)),
+            javascript_value_dumper(dict_to_ordered_dict(deepcopy(value))),
+        )
+        self.assertEqual(
+            "".join(iter_json([{"b": {"d": 1, "c": [2, {"f": 3, "e": 4}]}}])),
+            '[{"b":{"c":[2,{"e":4,"f":3}],"d":1}}]',
+        )
+
+    def test_03_iter_base(self):
+        """Same base (and signature) as `get_base`."""
+        for value_dumper, quoter in (
+            (None, None),
+            (javascript_value_dumper, javascript_quoter),
+        ):
+            self.assertEqual(
+                b"".join(
+                    Signature.iter_base(
+                        "user",
+                        "1378045287.0",
+                        self.extra,
+                        value_dumper=value_dumper,
+                        quoter=quoter,
+                    )
+                ),
+                Signature.get_base(
+                    "user",
+                    "1378045287.0",
+                    self.extra,
+                    value_dumper=value_dumper,
+                    quoter=quoter,
+                ),
+            )
+
+        signature = Signature.generate_signature(
+            auth_user="user",
+            secret_key=self.secret_key,
+            extra=self.extra,
+            value_dumper=javascript_value_dumper,
+            quoter=javascript_quoter,
+        )
+        expected = hmac.new(
+            self.secret_key.encode(),
+            Signature.get_base(
+                "user",
+                signature.valid_until,
+                self.extra,
+                value_dumper=javascript_value_dumper,
+                quoter=javascript_quoter,
+            ),
+            hashlib.sha1,
+        ).digest()
+        self.assertEqual(signature.signature, b64encode(expected))
+
+    def test_04_iter_base_memory(self):
+        """The base string is not materialized."""
+        extra = {
+            "data": [
+                {"id": index, "name": f"name {index}", "tags": ["a b", "c"]}
+                for index in range(10_000)
+            ]
+        }
+        size = len(javascript_value_dumper(extra["data"]))
+        signer = Signature.get_signer(self.secret_key)
+
+        tracemalloc.start()
+        try:
+            signer.digest_chunks(
+                Signature.iter_base(
+                    "user",
+                    "1378045287.0",
+                    extra,
+                    value_dumper=javascript_value_dumper,
+                    quoter=javascript_quoter,
+                )
+            )
+            __, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(peak, size)
+
+
+class ValidationCacheTest(unittest.TestCase):
+    """Tests of the validation cache."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.clock = FrozenClock(1378045000.0)
+        self.request_helper = RequestHelper()
+        self.request_data = signature_to_dict(
+            auth_user="user",
+            secret_key=self.secret_key,
+            valid_until="1378045287.0",
+            extra={"email": "john.doe@mail.example.com"},
+        )
+        set_clock(self.clock)
+
+    def tearDown(self):
+        """Tear down."""
+        set_clock()
+
+    def test_01_validate_request_data(self):
+        """Successful validations are cached."""
+        cache = ValidationCache(maxsize=10)
+        with mock.patch.object(
+            Signature,
+            "validate_signature",
+            wraps=Signature.validate_signature,
+        ) as validate_signature:
+            for __ in range(3):
+                self.assertTrue(
+                    self.request_helper.validate_request_data(
+                        self.request_data, self.secret_key, cache=cache
+                    ).result
+                )
+            self.assertEqual(validate_signature.call_count, 1)
+
+        self.assertEqual(tuple(cache.info()), (2, 1, 10, 1))
+
+        # Not served for other keys or tampered data
+        self.assertFalse(
+            self.request_helper.validate_request_data(
+                self.request_data, "wrong-secret", cache=cache
+            ).result
+        )
+        tampered = dict(self.request_data, email="jane@mail.example.com")
+        self.assertFalse(
+            self.request_helper.validate_request_data(
+                tampered, self.secret_key, cache=cache
+            ).result
+        )
+        self.assertEqual(len(cache), 1)
+
+    def test_02_expiry(self):
+        """Entries expire at their own `valid_until`."""
+        cache = ValidationCache(maxsize=10)
+        self.assertTrue(
+            validate_signed_request_data(
+                self.request_data, self.secret_key, cache=cache
+            ).result
+        )
+        self.assertEqual(len(cache), 1)
+
+        self.clock.timestamp = 1378045287.0
+        validation_result = validate_signed_request_data(
+            self.request_data, self.secret_key, cache=cache
+        )
+        self.assertFalse(validation_result.result)
+        self.assertEqual(
+            validation_result.errors,
+            [error_codes.SIGNATURE_TIMESTAMP_EXPIRED],
+        )
+        self.assertEqual(len(cache), 0)
+
+    def test_03_lru(self):
+        """Least recently used entries are evicted."""
+        cache = ValidationCache(maxsize=2, clock=self.clock)
+        cache.set(b"a", 1378045100.0)
+        cache.set(b"b", 1378045200.0)
+        self.assertTrue(cache.get(b"a"))
+        cache.set(b"c", 1378045300.0)
+        self.assertTrue(cache.get(b"a"))
+        self.assertFalse(cache.get(b"b"))
+        self.assertTrue(cache.get(b"c"))
+
+        # Already expired entries are not stored
+        cache.set(b"d", 1378044000.0)
+        self.assertFalse(cache.get(b"d"))
+
+        self.clock.timestamp = 1378045150.0
+        self.assertFalse(cache.get(b"a"))
+        self.assertEqual(len(cache), 1)
+
+        cache.clear()
+        self.assertEqual(tuple(cache.info()), (0, 0, 2, 0))
+
+
+class NegativeCacheTest(unittest.TestCase):
+    """Tests of the negative cache (of failed validations)."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.clock = FrozenClock(1378045000.0)
+        self.request_helper = RequestHelper()
+        self.request_data = signature_to_dict(
+            auth_user="user",
+            secret_key=self.secret_key,
+            valid_until="1378045287.0",
+            extra={"email": "john.doe@mail.example.com"},
+        )
+        self.forged_data = dict(self.request_data, auth_user="admin")
+        set_clock(self.clock)
+
+    def tearDown(self):
+        """Tear down."""
+        set_clock()
+
+    def test_01_validate_request_data(self):
+        """Invalid signatures are rejected without being recomputed."""
+        negative_cache = NegativeCache(maxsize=10)
+        with mock.patch.object(
+            Signature,
+            "validate_signature",
+            wraps=Signature.validate_signature,
+        ) as validate_signature:
+            for __ in range(3):
+                validation_result = (
+                    self.request_helper.validate_request_data(
+                        self.forged_data,
+                        self.secret_key,
+                        negative_cache=negative_cache,
+                    )
+                )
+                self.assertFalse(validation_result.result)
+                self.assertEqual(
+                    validation_result.errors, [error_codes.INVALID_SIGNATURE]
+                )
+            self.assertEqual(validate_signature.call_count, 1)
+
+        self.assertEqual(tuple(negative_cache.info()), (2, 1, 10, 1))
+
+        # Valid data and other keys are not affected
+        self.assertTrue(
+            validate_signed_request_data(
+                self.request_data,
+                self.secret_key,
+                negative_cache=negative_cache,
+            ).result
+        )
+        self.assertFalse(
+            self.request_helper.validate_request_data(
+                self.forged_data, "other-secret", negative_cache=negative_cache
+            ).result
+        )
+        self.assertEqual(len(negative_cache), 2)
+
+        # Expired signatures are not cached
+        self.clock.timestamp = 1378045287.0
+        validation_result = validate_signed_request_data(
+            self.forged_data, self.secret_key, negative_cache=negative_cache
+        )
+        self.assertEqual(
+            validation_result.errors,
+            [error_codes.SIGNATURE_TIMESTAMP_EXPIRED],
+        )
+
+    def test_02_expiry(self):
+        """Entries expire after `ttl` or at `valid_until`."""
+        negative_cache = NegativeCache(maxsize=10, ttl=60, clock=self.clock)
+        negative_cache.set(b"a", 1378045030.0)
+        negative_cache.set(b"b", 1378045300.0)
+        self.assertTrue(negative_cache.get(b"a"))
+        self.assertTrue(negative_cache.get(b"b"))
+
+        self.clock.timestamp = 1378045030.0
+        self.assertFalse(negative_cache.get(b"a"))
+        self.assertTrue(negative_cache.get(b"b"))
+
+        self.clock.timestamp = 1378045060.0
+        self.assertFalse(negative_cache.get(b"b"))
+
+        # Stale generations are dropped
+        self.clock.timestamp = 1378045200.0
+        negative_cache.set(b"c", 1378045300.0)
+        self.assertEqual(len(negative_cache), 1)
+
+    def test_03_generations(self):
+        """Memory is bounded by rotating generations."""
+        negative_cache = NegativeCache(maxsize=4, clock=self.clock)
+        for key in (b"a", b"b", b"c", b"d", b"e"):
+            negative_cache.set(key, 1378045300.0)
+        self.assertLessEqual(len(negative_cache), 4)
+        self.assertFalse(negative_cache.get(b"a"))
+        self.assertFalse(negative_cache.get(b"b"))
+        self.assertTrue(negative_cache.get(b"c"))
+        self.assertTrue(negative_cache.get(b"e"))
+
+        negative_cache.clear()
+        self.assertEqual(tuple(negative_cache.info()), (0, 0, 4, 0))
+
+
+class KeyRingTest(unittest.TestCase):
+    """Tests of key rings (rotation of secret keys)."""
+
+    def setUp(self):
+        """Set up."""
+        self.clock = FrozenClock(1378045000.0)
+        self.key_ring = KeyRing(
+            {"k1": "secret-1"}, default_key_id="k1", clock=self.clock
+        )
+        self.key_ring.add(
+            "k2", "secret-2", not_before=1378044000.0, not_after=1378046000.0
+        )
+        set_clock(self.clock)
+
+    def tearDown(self):
+        """Tear down."""
+        set_clock()
+
+    def test_01_signing_key(self):
+        """Most recent valid key is used for signing."""
+        self.assertEqual(self.key_ring.signing_key().key_id, "k2")
+        self.assertEqual(self.key_ring.get("k1"), "secret-1")
+        self.assertEqual(self.key_ring.get(), "secret-1")
+        self.assertIsNone(self.key_ring.get("k3"))
+
+        self.clock.timestamp = 1378047000.0
+        self.assertEqual(self.key_ring.signing_key().key_id, "k1")
+        self.assertIsNone(self.key_ring.get("k2"))
+
+        self.key_ring.remove("k1")
+        self.assertRaises(ImproperlyConfigured, self.key_ring.signing_key)
+
+    def test_02_sign_and_validate(self):
+        """The key is selected by key id, with a single HMAC."""
+        request_data = signature_to_dict(
+            auth_user="user",
+            secret_key=self.key_ring,
+            extra={"email": "john.doe@mail.example.com"},
+        )
+        self.assertEqual(request_data["key_id"], "k2")
+
+        signed_url = sign_url(
+            auth_user="user", secret_key=self.key_ring, url="/api/"
+        )
+        self.assertEqual(parse_url_params(signed_url)["key_id"], "k2")
+        signed_urls = list(
+            sign_urls([{"auth_user": "user"}], secret_key=self.key_ring)
+        )
+        self.assertEqual(parse_url_params(signed_urls[0])["key_id"], "k2")
+
+        with mock.patch.object(
+            Signature, "make_hash", wraps=Signature.make_hash
+        ) as make_hash:
+            self.assertTrue(
+                validate_signed_request_data(
+                    request_data, secret_key=self.key_ring
+                ).result
+            )
+            self.assertEqual(make_hash.call_count, 1)
+            self.assertEqual(make_hash.call_args[0][1], "secret-2")
+
+        # Signatures made before the rotation (without key id) remain valid
+        legacy_data = signature_to_dict(
+            auth_user="user", secret_key="secret-1"
+        )
+        self.assertTrue(
+            validate_signed_request_data(
+                legacy_data, secret_key=self.key_ring
+            ).result
+        )
+
+        # Signed with another key of the ring
+        validation_result = validate_signed_request_data(
+            dict(legacy_data, key_id="k2"), secret_key=self.key_ring
+        )
+        self.assertEqual(
+            validation_result.errors, [error_codes.INVALID_SIGNATURE]
+        )
+
+        # Unknown and expired key ids
+        for key_id, timestamp in (("k3", 1378045000.0), ("k2", 1378046100.0)):
+            self.clock.timestamp = timestamp
+            validation_result = validate_signed_request_data(
+                dict(request_data, key_id=key_id), secret_key=self.key_ring
+            )
+            self.assertEqual(
+                validation_result.errors, [error_codes.UNKNOWN_KEY_ID]
+            )
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import unittest
+from urllib.parse import urlsplit
+
+from .. import error_codes, sign_url
+from ..exceptions import ImproperlyConfigured
+from ..middleware import (
+    ASGISignedRequestMiddleware,
+    Route,
+    RouteTrie,
+    WSGISignedRequestMiddleware,
+)
+
+__title__ = "ska.tests.test_middleware"
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = ("MiddlewareTest",)
+
+LOGGER = logging.getLogger(__name__)
+
+ROUTES = (
+    Route("/api/", secret_key="api-secret-key"),
+    Route("/api/public", signed=False),
+    Route(
+        "/partners/",
+        providers={"partner-1": "partner-1-secret-key"},
+    ),
+)
+
+
+def make_url(path, secret_key="api-secret-key", extra=None):
+    """Sign the path given. Return (path, query string) pair."""
+    parts = urlsplit(
+        sign_url(
+            auth_user="user",
+            secret_key=secret_key,
+            url=path,
+            extra=extra,
+        )
+    )
+    return parts.path, parts.query
+
+
+class MiddlewareTest(unittest.TestCase):
+    """Tests of `ska.middleware` module."""
+
+    def setUp(self):
+        self.calls = []
+
+    def wsgi_app(self, environ, start_response):
+        self.calls.append(environ["PATH_INFO"])
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"OK"]
+
+    async def asgi_app(self, scope, receive, send):
+        self.calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b"OK"})
+
+    def wsgi_get(self, middleware, path, query_string=""):
+        statuses = []
+        body = middleware(
+            {"PATH_INFO": path, "QUERY_STRING": query_string},
+            lambda status, headers: statuses.append(status),
+        )
+        return statuses[0], b"".join(body)
+
+    def asgi_get(self, middleware, path, query_string="", scope_type="http"):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": scope_type,
+            "path": path,
+            "query_string": query_string.encode(),
+        }
+        asyncio.run(middleware(scope, None, send))
+        return messages
+
+    def test_01_route_trie(self):
+        """Routes are matched on the longest prefix of path segments."""
+        trie = RouteTrie(ROUTES)
+        self.assertIs(trie.match("/api"), ROUTES[0])
+        self.assertIs(trie.match("/api/items/1/"), ROUTES[0])
+        self.assertIs(trie.match("//api//items"), ROUTES[0])
+        self.assertIs(trie.match("/api/public/items/"), ROUTES[1])
+        self.assertIs(trie.match("/api/publication/"), ROUTES[0])
+        self.assertIs(trie.match("/partners/"), ROUTES[2])
+        self.assertIsNone(trie.match("/apis/"))
+        self.assertIsNone(trie.match("/"))
+
+        # Catch-all route
+        trie.add(Route("/", signed=False))
+        self.assertFalse(trie.match("/apis/").signed)
+
+        with self.assertRaises(ImproperlyConfigured):
+            trie.add(Route("/api", secret_key="other-secret-key"))
+        with self.assertRaises(ImproperlyConfigured):
+            trie.add(Route("/other/"))
+
+    def test_02_wsgi(self):
+        """Invalid requests never reach the WSGI application."""
+        middleware = WSGISignedRequestMiddleware(self.wsgi_app, ROUTES)
+
+        status, body = self.wsgi_get(middleware, *make_url("/api/items/"))
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(body, b"OK")
+
+        status, body = self.wsgi_get(
+            middleware, *make_url("/api/items/", secret_key="wrong-key")
+        )
+        self.assertEqual(status, "401 Unauthorized")
+        self.assertIn(str(error_codes.INVALID_SIGNATURE).encode(), body)
+
+        status, __ = self.wsgi_get(middleware, "/api/items/")
+        self.assertEqual(status, "401 Unauthorized")
+
+        # Not gated
+        for path in ("/api/public/items/", "/other/"):
+            status, __ = self.wsgi_get(middleware, path)
+            self.assertEqual(status, "200 OK")
+
+        self.assertEqual(
+            self.calls, ["/api/items/", "/api/public/items/", "/other/"]
+        )
+
+    def test_03_wsgi_providers(self):
+        """Secret keys are selected by provider."""
+        middleware = WSGISignedRequestMiddleware(self.wsgi_app, ROUTES)
+
+        status, __ = self.wsgi_get(
+            middleware,
+            *make_url(
+                "/partners/",
+                secret_key="partner-1-secret-key",
+                extra={"provider": "partner-1"},
+            ),
+        )
+        self.assertEqual(status, "200 OK")
+
+        status, body = self.wsgi_get(
+            middleware,
+            *make_url(
+                "/partners/",
+                secret_key="partner-1-secret-key",
+                extra={"provider": "partner-2"},
+            ),
+        )
+        self.assertEqual(status, "401 Unauthorized")
+        self.assertIn(str(error_codes.UNKNOWN_PROVIDER).encode(), body)
+
+    def test_04_asgi(self):
+        """Invalid requests never reach the ASGI application."""
+        middleware = ASGISignedRequestMiddleware(self.asgi_app, ROUTES)
+
+        messages = self.asgi_get(middleware, *make_url("/api/items/"))
+        self.assertEqual(messages[0]["status"], 200)
+
+        messages = self.asgi_get(middleware, "/api/items/")
+        self.assertEqual(messages[0]["status"], 401)
+        self.assertTrue(messages[1]["body"].startswith(b"Unauthorised"))
+
+        messages = self.asgi_get(
+            middleware, "/api/items/", scope_type="websocket"
+        )
+        self.assertEqual(messages, [{"type": "websocket.close", "code": 1008}])
+
+        self.assertEqual(self.calls, ["/api/items/"])
@@ -0,0 +1,100 @@
+import logging
+import unittest
+
+from .. import HMACSHA256Signature, parallel, sign_urls
+from ..helpers import javascript_quoter, javascript_value_dumper
+from ..keyring import KeyRing
+
+__title__ = "ska.tests.test_parallel"
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = ("ParallelSigningTest",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ParallelSigningTest(unittest.TestCase):
+    """Tests of `ska.parallel` module."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.valid_until = "1378045287.0"
+        self.specs = [
+            {
+                "auth_user": f"user{index}",
+                "url": f"http://e.com/api/{index}/",
+                "extra": {"email": f"user{index}@mail.example.com"},
+            }
+            for index in range(25)
+        ]
+
+    def test_01_sign_urls_order_preserved(self):
+        """Parallel signing produces the same URLs in the same order."""
+        expected = list(
+            sign_urls(
+                self.specs,
+                secret_key=self.secret_key,
+                valid_until=self.valid_until,
+                signature_cls=HMACSHA256Signature,
+                value_dumper=javascript_value_dumper,
+                quoter=javascript_quoter,
+            )
+        )
+        signed_urls = list(
+            parallel.sign_urls(
+                iter(self.specs),
+                secret_key=self.secret_key,
+                valid_until=self.valid_until,
+                signature_cls=HMACSHA256Signature,
+                value_dumper=javascript_value_dumper,
+                quoter=javascript_quoter,
+                max_workers=2,
+                chunk_size=3,
+            )
+        )
+        self.assertEqual(signed_urls, expected)
+
+    def test_02_sign_urls_shared_valid_until(self):
+        """All URLs share the same `valid_until`."""
+        signed_urls = list(
+            parallel.sign_urls(
+                self.specs, secret_key=self.secret_key, max_workers=2
+            )
+        )
+        self.assertEqual(len(signed_urls), len(self.specs))
+        valid_untils = {
+            signed_url.split("valid_until=")[1].split("&")[0]
+            for signed_url in signed_urls
+        }
+        self.assertEqual(len(valid_untils), 1)
+
+    def test_03_sign_urls_invalid_chunk_size(self):
+        """Invalid chunk size."""
+        with self.assertRaises(ValueError):
+            parallel.sign_urls(self.specs, self.secret_key, chunk_size=0)
+
+    def test_04_sign_urls_key_ring(self):
+        """Key id param name is forwarded to the workers."""
+        key_ring = KeyRing({"2024": self.secret_key})
+        expected = list(
+            sign_urls(
+                self.specs,
+                secret_key=key_ring,
+                valid_until=self.valid_until,
+                key_id_param="kid",
+            )
+        )
+        signed_urls = list(
+            parallel.sign_urls(
+                self.specs,
+                secret_key=key_ring,
+                valid_until=self.valid_until,
+                key_id_param="kid",
+                max_workers=2,
+                chunk_size=10,
+            )
+        )
+        self.assertEqual(signed_urls, expected)
+        self.assertIn("kid=2024", signed_urls[0])
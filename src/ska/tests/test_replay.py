@@ -0,0 +1,182 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from .. import RequestHelper, error_codes, signature_to_dict
+from ..caches import ValidationCache
+from ..clocks import FrozenClock
+from ..replay import (
+    MemoryReplayStore,
+    SharedMemoryReplayStore,
+    SQLiteReplayStore,
+    make_replay_key,
+)
+
+__title__ = "ska.tests.test_replay"
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = ("ReplayStoreTest",)
+
+LOGGER = logging.getLogger(__name__)
+
+TIMESTAMP = 1378045000.0
+
+
+class ReplayStoreTest(unittest.TestCase):
+    """Tests of `ska.replay` module."""
+
+    def setUp(self):
+        self.clock = FrozenClock(TIMESTAMP)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_01_make_replay_key(self):
+        """Keys are fixed width and differ by any of the parts."""
+        key = make_replay_key("signature", "user", "1378045600.0")
+        self.assertEqual(len(key), 16)
+        self.assertEqual(
+            key, make_replay_key(b"signature", "user", "1378045600.0")
+        )
+        self.assertNotEqual(
+            key, make_replay_key("signature", "user2", "1378045600.0")
+        )
+        self.assertNotEqual(
+            key, make_replay_key("signature", "user", "1378045601.0")
+        )
+
+    def test_02_memory_replay_store(self):
+        """Signatures are accepted once, and forgotten when expired."""
+        replay_store = MemoryReplayStore(shards=4, clock=self.clock)
+        valid_until = TIMESTAMP + 10
+
+        self.assertTrue(replay_store.add("signature", "user", valid_until))
+        self.assertFalse(replay_store.add("signature", "user", valid_until))
+        self.assertTrue(replay_store.add("signature", "other", valid_until))
+        self.assertTrue(replay_store.add("expired", "user", TIMESTAMP - 1))
+        self.assertEqual(len(replay_store), 2)
+
+        self.clock.timestamp = valid_until
+        self.assertFalse(replay_store.add("signature", "user", valid_until))
+
+        # Expired entries are dropped on the next access of their shard.
+        self.clock.timestamp = valid_until + 2
+        for i in range(32):
+            replay_store.add(f"signature-{i}", "user", TIMESTAMP - 1)
+        self.assertEqual(len(replay_store), 0)
+
+        replay_store.add("signature", "user", TIMESTAMP + 100)
+        replay_store.clear()
+        self.assertEqual(len(replay_store), 0)
+
+    def test_03_sqlite_replay_store(self):
+        """Entries are shared by the stores using the same database."""
+        path = os.path.join(self.tmp_dir, "replay.sqlite3")
+        replay_store = SQLiteReplayStore(path, clock=self.clock)
+        other_replay_store = SQLiteReplayStore(path, clock=self.clock)
+        self.addCleanup(replay_store.close)
+        self.addCleanup(other_replay_store.close)
+        valid_until = TIMESTAMP + 10
+
+        self.assertTrue(replay_store.add("signature", "user", valid_until))
+        self.assertFalse(
+            other_replay_store.add("signature", "user", valid_until)
+        )
+        self.assertEqual(
+            replay_store.add_many(
+                [
+                    ("signature", "user", valid_until),
+                    ("signature-2", "user", valid_until),
+                    ("signature-2", "user", valid_until),
+                ]
+            ),
+            [False, True, False],
+        )
+
+        self.clock.timestamp = valid_until + 1
+        self.assertEqual(replay_store.purge(), 2)
+        self.assertTrue(replay_store.add("signature", "user", valid_until))
+
+    def test_04_shared_memory_replay_store(self):
+        """Entries are shared by the processes forked."""
+        replay_store = SharedMemoryReplayStore(
+            capacity=64, stripes=2, max_probes=4, clock=self.clock
+        )
+        self.addCleanup(replay_store.close)
+        valid_until = TIMESTAMP + 10
+
+        self.assertTrue(replay_store.add("signature", "user", valid_until))
+        self.assertFalse(replay_store.add("signature", "user", valid_until))
+
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+
+        def worker():
+            queue.put(
+                [
+                    replay_store.add(f"signature-{i}", "user", valid_until)
+                    for i in range(4)
+                ]
+            )
+
+        processes = [context.Process(target=worker) for __ in range(4)]
+        for process in processes:
+            process.start()
+        results = [queue.get(timeout=10) for __ in processes]
+        for process in processes:
+            process.join()
+
+        # Each signature is accepted by exactly one process.
+        self.assertEqual([sum(column) for column in zip(*results)], [1] * 4)
+        self.assertEqual(len(replay_store), 5)
+
+        # Expired slots are reused.
+        self.clock.timestamp = valid_until + 1
+        self.assertEqual(len(replay_store), 0)
+        self.assertTrue(replay_store.add("signature", "user", TIMESTAMP + 20))
+
+        # Full segments reject signatures (fail closed).
+        with self.assertLogs("ska.replay", level="WARNING"):
+            results = [
+                replay_store.add(f"other-{i}", "user", TIMESTAMP + 20)
+                for i in range(64)
+            ]
+        self.assertIn(False, results)
+
+        replay_store.clear()
+        self.assertEqual(len(replay_store), 0)
+
+    def test_05_request_helper(self):
+        """Valid signatures are accepted once (cached or not)."""
+        request_helper = RequestHelper()
+        for cache in (None, ValidationCache()):
+            replay_store = MemoryReplayStore()
+            data = signature_to_dict("user", "secret-key")
+
+            validation_result = request_helper.validate_request_data(
+                data, "secret-key", cache=cache, replay_store=replay_store
+            )
+            self.assertTrue(validation_result.result)
+
+            validation_result = request_helper.validate_request_data(
+                data, "secret-key", cache=cache, replay_store=replay_store
+            )
+            self.assertFalse(validation_result.result)
+            self.assertEqual(
+                validation_result.errors,
+                [error_codes.SIGNATURE_ALREADY_USED],
+            )
+
+            # Invalid signatures are not recorded.
+            validation_result = request_helper.validate_request_data(
+                signature_to_dict("user", "wrong-key"),
+                "secret-key",
+                replay_store=replay_store,
+            )
+            self.assertEqual(
+                validation_result.errors, [error_codes.INVALID_SIGNATURE]
+            )
+            self.assertEqual(len(replay_store), 1)
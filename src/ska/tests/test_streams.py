@@ -0,0 +1,193 @@
+import hashlib
+import io
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from .. import RequestHelper, error_codes, streams
+from ..streams import (
+    clear_file_digest_cache,
+    content_digest,
+    file_digest,
+    sign_stream,
+    validate_stream,
+)
+
+__title__ = "ska.tests.test_streams"
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = ("StreamSigningTest",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StreamSigningTest(unittest.TestCase):
+    """Tests of `ska.streams` module."""
+
+    def setUp(self):
+        """Set up."""
+        self.secret_key = "secret"
+        self.content = os.urandom(200_000)
+        self.digest = hashlib.sha256(self.content).hexdigest()
+        self.directory = tempfile.mkdtemp()
+        self.path = pathlib.Path(self.directory, "content.bin")
+        with open(self.path, "wb") as file:
+            file.write(self.content)
+        clear_file_digest_cache()
+
+    def tearDown(self):
+        """Tear down."""
+        shutil.rmtree(self.directory)
+        clear_file_digest_cache()
+
+    def test_01_content_digest(self):
+        """Same digest for all kinds of sources."""
+        chunks = [self.content[:1000], self.content[1000:]]
+        for source in (
+            self.content,
+            bytearray(self.content),
+            memoryview(self.content),
+            io.BytesIO(self.content),
+            io.BufferedReader(io.BytesIO(self.content)),
+            iter(chunks),
+            self.path,
+        ):
+            self.assertEqual(
+                content_digest(source, chunk_size=4096), self.digest
+            )
+
+        self.assertEqual(
+            content_digest(self.content, digestmod=hashlib.sha512),
+            hashlib.sha512(self.content).hexdigest(),
+        )
+
+    def test_02_file_digest_cache(self):
+        """File digests are cached by path, size and mtime."""
+        empty_path = os.path.join(self.directory, "empty.bin")
+        open(empty_path, "wb").close()
+        self.assertEqual(
+            file_digest(empty_path), hashlib.sha256(b"").hexdigest()
+        )
+
+        self.assertEqual(file_digest(self.path), self.digest)
+        with mock.patch.object(streams.mmap, "mmap") as _mmap:
+            self.assertEqual(file_digest(self.path), self.digest)
+            _mmap.assert_not_called()
+
+        with open(self.path, "ab") as file:
+            file.write(b"tail")
+        self.assertEqual(
+            file_digest(self.path),
+            hashlib.sha256(self.content + b"tail").hexdigest(),
+        )
+
+    def test_03_sign_and_validate_stream(self):
+        """Sign and validate streams."""
+        signature = sign_stream(
+            io.BytesIO(self.content),
+            auth_user="user",
+            secret_key=self.secret_key,
+            extra={"provider": "service1.example.com"},
+        )
+        self.assertEqual(signature.extra["content_digest"], self.digest)
+
+        for source in (self.path, io.BytesIO(self.content)):
+            self.assertTrue(
+                validate_stream(
+                    source,
+                    signature=signature.signature,
+                    auth_user="user",
+                    secret_key=self.secret_key,
+                    valid_until=signature.valid_until,
+                    extra=signature.extra,
+                )
+            )
+
+        # Tampered content
+        validation_result = validate_stream(
+            self.content + b"tail",
+            signature=signature.signature,
+            auth_user="user",
+            secret_key=self.secret_key,
+            valid_until=signature.valid_until,
+            extra=signature.extra,
+            return_object=True,
+        )
+        self.assertFalse(validation_result.result)
+        self.assertEqual(
+            validation_result.errors, [error_codes.CONTENT_DIGEST_MISMATCH]
+        )
+
+        # Tampered digest
+        validation_result = validate_stream(
+            self.content + b"tail",
+            signature=signature.signature,
+            auth_user="user",
+            secret_key=self.secret_key,
+            valid_until=signature.valid_until,
+            extra=dict(
+                signature.extra,
+                content_digest=hashlib.sha256(
+                    self.content + b"tail"
+                ).hexdigest(),
+            ),
+            return_object=True,
+        )
+        self.assertEqual(
+            validation_result.errors, [error_codes.INVALID_SIGNATURE]
+        )
+
+    def test_04_signed_url(self):
+        """Signatures of streams work with the request helper."""
+        signature = sign_stream(
+            self.path, auth_user="user", secret_key=self.secret_key
+        )
+        request_helper = RequestHelper()
+        request_data = request_helper.signature_to_dict(signature)
+        self.assertTrue(
+            request_helper.validate_request_data(
+                request_data, self.secret_key
+            ).result
+        )
+        self.assertTrue(
+            validate_stream(
+                self.path,
+                signature=request_data["signature"],
+                auth_user=request_data["auth_user"],
+                secret_key=self.secret_key,
+                valid_until=request_data["valid_until"],
+                extra=request_helper.extract_signed_data(request_data),
+            )
+        )
+
+    def test_05_str_content(self):
+        """Strings are content, not paths."""
+        self.assertEqual(
+            content_digest("some body"),
+            hashlib.sha256(b"some body").hexdigest(),
+        )
+        signature = sign_stream(
+            "some body", auth_user="user", secret_key=self.secret_key
+        )
+        for source, result in (
+            ("some body", True),
+            (b"some body", True),
+            (os.fspath(self.path), False),
+        ):
+            self.assertEqual(
+                validate_stream(
+                    source,
+                    signature=signature.signature,
+                    auth_user="user",
+                    secret_key=self.secret_key,
+                    valid_until=signature.valid_until,
+                    extra=signature.extra,
+                ),
+                result,
+            )
@@ -0,0 +1,89 @@
+import logging
+import unittest
+
+from .. import error_codes, signature_to_dict, validate_signed_request_data
+from ..caches import NegativeCache
+from ..exceptions import ImproperlyConfigured, InvalidData
+from ..keyring import KeyRing
+from ..replay import MemoryReplayStore
+from ..validators import Validator
+
+__title__ = "ska.tests.test_validators"
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = ("ValidatorTest",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ValidatorTest(unittest.TestCase):
+    """Tests of `ska.validators` module."""
+
+    def setUp(self):
+        self.data = signature_to_dict(
+            "user",
+            "secret-key",
+            extra={"email": "user@example.com"},
+            signature_param="sig",
+        )
+
+    def test_01_validate(self):
+        """Same results as the ``validate_signed_request_data``."""
+        validator = Validator("secret-key", signature_param="sig")
+        self.assertTrue(validator.validate(self.data).result)
+        self.assertEqual(
+            validator.validate(self.data).result,
+            validate_signed_request_data(
+                self.data, "secret-key", signature_param="sig"
+            ).result,
+        )
+
+        validation_result = Validator("wrong-key").validate(self.data)
+        self.assertFalse(validation_result.result)
+
+        key_ring = KeyRing({"1": "secret-key"})
+        self.assertEqual(
+            Validator(key_ring, signature_param="sig")
+            .validate(self.data)
+            .errors,
+            [error_codes.UNKNOWN_KEY_ID],
+        )
+
+    def test_02_extract(self):
+        """Signed data is extracted from valid data only."""
+        validator = Validator("secret-key", signature_param="sig")
+        self.assertEqual(
+            validator.extract(self.data), {"email": "user@example.com"}
+        )
+        with self.assertRaises(InvalidData):
+            validator.derive(secret_key="wrong-key").extract(self.data)
+        with self.assertRaises(ImproperlyConfigured):
+            Validator().extract(self.data)
+
+    def test_03_derive(self):
+        """Derived validators are kept and replace the options given."""
+        negative_cache = NegativeCache()
+        validator = Validator(
+            signature_param="sig", negative_cache=negative_cache
+        )
+        derived = validator.derive(secret_key="secret-key")
+        self.assertIs(validator.derive(secret_key="secret-key"), derived)
+        self.assertEqual(derived.signature_param, "sig")
+        self.assertIs(derived.negative_cache, negative_cache)
+        self.assertEqual(
+            derived.key, Validator("secret-key", signature_param="sig").key
+        )
+        self.assertNotEqual(derived.key, validator.key)
+        self.assertTrue(derived.validate(self.data).result)
+
+        replay_store = MemoryReplayStore()
+        derived = derived.derive(replay_store=replay_store)
+        self.assertNotEqual(
+            derived.key, Validator("secret-key", signature_param="sig").key
+        )
+        self.assertTrue(derived.validate(self.data).result)
+        self.assertEqual(
+            derived.validate(self.data).errors,
+            [error_codes.SIGNATURE_ALREADY_USED],
+        )
@@ -1,10 +1,32 @@
-from typing import Callable, Dict, Optional, Type, Union
-from urllib.parse import urlencode
-
-from .base import AbstractSignature, SignatureValidationResult
+from base64 import b64encode
+from hmac import compare_digest
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import quote_plus, urlencode
+
+from . import clocks, error_codes
+from .base import (
+    AbstractSignature,
+    BatchValidationResult,
+    SignatureValidationResult,
+    _schema_kwargs,
+    _uses_signer,
+)
+from .caches import NegativeCache, ValidationCache
+from .caches import make_key as make_cache_key
 from .defaults import (
     DEFAULT_AUTH_USER_PARAM,
     DEFAULT_EXTRA_PARAM,
+    DEFAULT_KEY_ID_PARAM,
     DEFAULT_SIGNATURE_PARAM,
     DEFAULT_URL_SUFFIX,
     DEFAULT_VALID_UNTIL_PARAM,
@@ -12,6 +34,9 @@ from .defaults import (
 from .exceptions import ImproperlyConfigured, InvalidData
 from .helpers import dict_keys
 from .helpers import extract_signed_data as extract_signed_data
+from .keyring import KeyRing
+from .replay import ReplayStore
+from .schemas import SigningSchema
 from .signatures import Signature
 
 __author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
@@ -19,6 +44,10 @@ __copyright__ = "2013-2023 Artur Barseghyan"
 __license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
 __all__ = ("RequestHelper",)
 
+# Max number of quoted ``extra`` values memoized while URL encoding
+# signatures in bulk.
+QUOTED_VALUES_CACHE_SIZE = 1024
+
 # ***************************************************************************
 # ***************************************************************************
 # **************************** Request helper *******************************
@@ -36,6 +65,7 @@ class RequestHelper(object):
         valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
         extra_param: str = DEFAULT_EXTRA_PARAM,
         signature_cls: Type[AbstractSignature] = Signature,
+        key_id_param: str = DEFAULT_KEY_ID_PARAM,
     ) -> None:
         """Constructor.
 
@@ -44,18 +74,21 @@ class RequestHelper(object):
         :param valid_until_param:
         :param extra_param:
         :param signature_cls:
+        :param key_id_param:
         """
         self.signature_param = signature_param
         self.auth_user_param = auth_user_param
         self.valid_until_param = valid_until_param
         self.extra_param = extra_param
         self.signature_cls = signature_cls
+        self.key_id_param = key_id_param
 
     def signature_to_url(
         self,
         signature: AbstractSignature,
         endpoint_url: str = "",
         suffix: str = DEFAULT_URL_SUFFIX,
+        key_id: Optional[str] = None,
     ) -> str:
         """URL encodes the signature params.
 
@@ -63,6 +96,8 @@ class RequestHelper(object):
         :param endpoint_url:
         :param suffix: Suffix to add after the ``endpoint_url`` and before
             the appended signature params.
+        :param key_id: Id of the key the signature was made with (see
+            ``ska.keyring``).
         :return:
 
         :example:
@@ -100,6 +135,8 @@ class RequestHelper(object):
             self.valid_until_param: signature.valid_until,
             self.extra_param: dict_keys(signature.extra, return_string=True),
         }
+        if key_id is not None:
+            params[self.key_id_param] = key_id
 
         # Make some check that params used do not overlap with names
         # reserved (`auth_user`, `signature`, etc).
@@ -107,8 +144,125 @@ class RequestHelper(object):
 
         return f"{endpoint_url}{suffix}{urlencode(params)}"
 
+    def signatures_to_urls(
+        self,
+        items: Iterable[Tuple[AbstractSignature, str]],
+        suffix: str = DEFAULT_URL_SUFFIX,
+        key_id: Optional[str] = None,
+    ) -> Iterator[str]:
+        """URL encodes the signature params of many signatures.
+
+        Batch version of ``signature_to_url``. Produces exactly the same
+        URLs, but quotes the param names (and the ``extra`` keys of each
+        distinct set of ``extra`` keys) only once per batch.
+
+        :param items: Iterable of (signature, endpoint_url) pairs.
+        :param suffix: Suffix to add after the ``endpoint_url`` and before
+            the appended signature params.
+        :param key_id: Id of the key the signatures were made with (see
+            ``ska.keyring``).
+        :return:
+        """
+        reserved = {
+            self.signature_param,
+            self.auth_user_param,
+            self.valid_until_param,
+            self.extra_param,
+        }
+        if key_id is not None:
+            reserved.add(self.key_id_param)
+        signature_prefix = f"{quote_plus(str(self.signature_param))}="
+        auth_user_prefix = f"&{quote_plus(str(self.auth_user_param))}="
+        valid_until_prefix = f"&{quote_plus(str(self.valid_until_param))}="
+        extra_prefix = f"&{quote_plus(str(self.extra_param))}="
+        key_id_part = (
+            f"&{quote_plus(str(self.key_id_param))}={quote_plus(key_id)}"
+            if key_id is not None
+            else ""
+        )
+
+        # Extra keys -> (quoted ``extra`` param, quoted extra key prefixes)
+        extra_keys_cache = {}
+        # Extra value -> quoted extra value
+        quoted_values = {}
+
+        def quote_value(value):
+            if isinstance(value, bytes):
+                return quote_plus(value)
+            return quote_plus(str(value))
+
+        # Quoting of the ``valid_until`` value, typically shared by the
+        # whole batch.
+        last_valid_until, quoted_valid_until = None, ""
+
+        for signature, endpoint_url in items:
+            extra = signature.extra
+            extra_keys = tuple(extra)
+            try:
+                quoted_extra_keys, key_prefixes = extra_keys_cache[extra_keys]
+            except KeyError:
+                if reserved.intersection(extra_keys):
+                    # Extra values would override the signature params.
+                    # Leave that (rather exotic) case to the generic way.
+                    quoted_extra_keys, key_prefixes = None, None
+                else:
+                    quoted_extra_keys = quote_plus(
+                        dict_keys(extra, return_string=True)
+                    )
+                    key_prefixes = [
+                        f"&{quote_plus(str(key))}=" for key in extra_keys
+                    ]
+                extra_keys_cache[extra_keys] = (
+                    quoted_extra_keys,
+                    key_prefixes,
+                )
+
+            if key_prefixes is None:
+                yield self.signature_to_url(
+                    signature=signature,
+                    endpoint_url=endpoint_url,
+                    suffix=suffix,
+                    key_id=key_id,
+                )
+                continue
+
+            if signature.valid_until != last_valid_until:
+                last_valid_until = signature.valid_until
+                quoted_valid_until = quote_plus(str(last_valid_until))
+
+            parts = [
+                endpoint_url,
+                suffix,
+                signature_prefix,
+                quote_plus(signature.signature),
+                auth_user_prefix,
+                quote_plus(str(signature.auth_user)),
+                valid_until_prefix,
+                quoted_valid_until,
+                extra_prefix,
+                quoted_extra_keys,
+                key_id_part,
+            ]
+            for key_prefix, value in zip(key_prefixes, extra.values()):
+                parts.append(key_prefix)
+                # Extra values (provider, campaign, etc.) tend to repeat
+                # within a batch.
+                try:
+                    quoted_value = quoted_values[value]
+                except KeyError:
+                    quoted_value = quote_value(value)
+                    if len(quoted_values) >= QUOTED_VALUES_CACHE_SIZE:
+                        quoted_values.clear()
+                    quoted_values[value] = quoted_value
+                except TypeError:
+                    # Unhashable values
+                    quoted_value = quote_value(value)
+                parts.append(quoted_value)
+
+            yield "".join(parts)
+
     def signature_to_dict(
-        self, signature: AbstractSignature
+        self, signature: AbstractSignature, key_id: Optional[str] = None
     ) -> Dict[str, Union[bytes, str, float, int]]:
         """Put signature into a dictionary.
 
@@ -116,6 +270,8 @@ class RequestHelper(object):
          request) to the server.
 
         :param signature: Signature class.
+        :param key_id: Id of the key the signature was made with (see
+            ``ska.keyring``).
         :return:
 
         :example:
@@ -156,6 +312,8 @@ class RequestHelper(object):
             self.valid_until_param: signature.valid_until,
             self.extra_param: dict_keys(signature.extra, return_string=True),
         }
+        if key_id is not None:
+            data[self.key_id_param] = key_id
 
         data.update(signature.extra)
 
@@ -164,16 +322,33 @@ class RequestHelper(object):
     def validate_request_data(
         self,
         data: Dict[str, Union[bytes, str, float, int]],
-        secret_key: str,
+        secret_key: Union[str, KeyRing],
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        full_diagnostics: bool = False,
+        schema: Optional[SigningSchema] = None,
+        cache: Optional[ValidationCache] = None,
+        negative_cache: Optional[NegativeCache] = None,
+        replay_store: Optional[ReplayStore] = None,
     ) -> SignatureValidationResult:
         """Validate the request data.
 
         :param data:
-        :param secret_key:
+        :param secret_key: Secret key or key ring. Keys of key rings are
+            selected by the key id held in the request data.
         :param value_dumper:
         :param quoter:
+        :param full_diagnostics: If set to True, all errors are reported
+            (expired signatures are checked for validity as well).
+        :param schema: Compiled signing schema (see ``ska.schemas``).
+        :param cache: Cache of successful validations (see
+            ``ska.caches.ValidationCache``). Cached validations are not
+            recomputed until the signature expires.
+        :param negative_cache: Cache of failed validations (see
+            ``ska.caches.NegativeCache``). Signatures recently found invalid
+            are rejected without being recomputed.
+        :param replay_store: Replay store (see ``ska.replay``). Valid
+            signatures are accepted only once.
         :return:
 
         :example:
@@ -205,10 +380,44 @@ class RequestHelper(object):
         auth_user = data.get(self.auth_user_param, "")
         valid_until = data.get(self.valid_until_param, "")
 
+        if isinstance(secret_key, KeyRing):
+            secret_key = secret_key.get(data.get(self.key_id_param))
+            if secret_key is None:
+                return SignatureValidationResult(
+                    False, [error_codes.UNKNOWN_KEY_ID]
+                )
+
         extra = extract_signed_data(
             data=data, extra=data.get(self.extra_param, "").split(",")
         )
 
+        if cache is not None or negative_cache is not None:
+            cache_key = make_cache_key(
+                signature,
+                auth_user,
+                valid_until,
+                extra,
+                secret_key,
+                namespace=(
+                    id(self.signature_cls),
+                    id(value_dumper),
+                    id(quoter),
+                    id(schema),
+                ),
+            )
+            if cache is not None and cache.get(cache_key):
+                return self._check_replay(
+                    SignatureValidationResult(True),
+                    replay_store,
+                    signature,
+                    auth_user,
+                    valid_until,
+                )
+            if negative_cache is not None and negative_cache.get(cache_key):
+                return SignatureValidationResult(
+                    False, [error_codes.INVALID_SIGNATURE]
+                )
+
         validation_result = self.signature_cls.validate_signature(
             signature=signature,
             auth_user=auth_user,
@@ -218,27 +427,174 @@ class RequestHelper(object):
             extra=extra,
             value_dumper=value_dumper,
             quoter=quoter,
+            full_diagnostics=full_diagnostics,
+            schema=schema,
         )
 
+        if cache is not None and validation_result.result:
+            cache.set(
+                cache_key, self.signature_cls.parse_valid_until(valid_until)
+            )
+        elif negative_cache is not None and validation_result.errors == [
+            error_codes.INVALID_SIGNATURE
+        ]:
+            # Only signatures found invalid (neither expired, nor with
+            # malformed ``valid_until``) are worth caching.
+            timestamp = self.signature_cls.parse_valid_until(valid_until)
+            if timestamp is not None:
+                negative_cache.set(cache_key, timestamp)
+
+        return self._check_replay(
+            validation_result, replay_store, signature, auth_user, valid_until
+        )
+
+    @staticmethod
+    def _check_replay(
+        validation_result: SignatureValidationResult,
+        replay_store: Optional[ReplayStore],
+        signature: str,
+        auth_user: str,
+        valid_until: str,
+    ) -> SignatureValidationResult:
+        """Reject valid signatures already used."""
+        if (
+            replay_store is not None
+            and validation_result.result
+            and not replay_store.add(signature, auth_user, valid_until)
+        ):
+            return SignatureValidationResult(
+                False, [error_codes.SIGNATURE_ALREADY_USED]
+            )
         return validation_result
 
+    def validate_many(
+        self,
+        datas: Iterable[Mapping[str, Union[bytes, str, float, int]]],
+        secret_key: str,
+        value_dumper: Optional[Callable] = None,
+        quoter: Optional[Callable] = None,
+        clock: Optional[Callable[[], float]] = None,
+        schema: Optional[SigningSchema] = None,
+    ) -> BatchValidationResult:
+        """Validate many signed payloads signed with the same secret key.
+
+        The keyed signer and the param names are shared by the whole batch.
+        Expired payloads (as well as payloads with malformed ``valid_until``)
+        are rejected before hashing.
+
+        :param datas: Iterable of dictionaries (for instance, produced by
+            ``signature_to_dict``).
+        :param secret_key:
+        :param value_dumper:
+        :param quoter:
+        :param clock: Callable returning the current Unix timestamp. If not
+            given, the default clock (see ``ska.clocks``) is used. The clock
+            is read once per batch.
+        :param schema: Compiled signing schema (see ``ska.schemas``).
+        :return: A ``ska.BatchValidationResult`` object.
+
+        :example:
+
+        >>> from ska import RequestHelper
+        >>> request_helper = RequestHelper()
+        >>> validation_results = request_helper.validate_many(
+        >>>     datas=[item_1, item_2],
+        >>>     secret_key='your-secret-key'
+        >>> )
+        >>> list(validation_results)
+        [True, False]
+        """
+        signature_cls = self.signature_cls
+        signature_param = self.signature_param
+        auth_user_param = self.auth_user_param
+        valid_until_param = self.valid_until_param
+        extra_param = self.extra_param
+        iter_base = signature_cls.iter_base
+        parse_valid_until = signature_cls.parse_valid_until
+
+        if _uses_signer(signature_cls):
+            make_digest = signature_cls.get_signer(secret_key).digest_chunks
+        else:
+            make_digest = None
+
+        invalid_signature = int(error_codes.INVALID_SIGNATURE)
+        signature_expired = int(error_codes.SIGNATURE_TIMESTAMP_EXPIRED)
+
+        validation_results = BatchValidationResult()
+        append = validation_results.append
+        now = clock() if clock is not None else clocks.now()
+
+        for data in datas:
+            valid_until = data.get(valid_until_param, "")
+            expires = parse_valid_until(valid_until)
+            if expires is None:
+                append(False, invalid_signature)
+                continue
+            if expires <= now:
+                append(False, signature_expired)
+                continue
+
+            signature = data.get(signature_param, "")
+            if isinstance(signature, str):
+                signature = signature.encode()
+            auth_user = data.get(auth_user_param, "")
+            extra = extract_signed_data(
+                data=data, extra=data.get(extra_param, "").split(",")
+            )
+
+            if make_digest is not None:
+                raw_hmac = make_digest(
+                    iter_base(
+                        auth_user,
+                        valid_until,
+                        extra=extra,
+                        value_dumper=value_dumper,
+                        quoter=quoter,
+                        schema=schema,
+                    )
+                )
+            else:
+                raw_hmac = signature_cls.make_hash(
+                    auth_user,
+                    secret_key,
+                    valid_until,
+                    extra,
+                    value_dumper=value_dumper,
+                    quoter=quoter,
+                    **_schema_kwargs(schema),
+                )
+
+            if compare_digest(b64encode(raw_hmac), signature):
+                append(True)
+            else:
+                append(False, invalid_signature)
+
+        return validation_results
+
     def extract_signed_data(
         self,
         data: Dict[str, Union[bytes, str, float, int]],
-        secret_key: Optional[str] = None,
+        secret_key: Optional[Union[str, KeyRing]] = None,
         validate: bool = False,
         fail_silently: bool = False,
         value_dumper: Optional[Callable] = None,
         quoter: Optional[Callable] = None,
+        schema: Optional[SigningSchema] = None,
+        negative_cache: Optional[NegativeCache] = None,
+        replay_store: Optional[ReplayStore] = None,
     ) -> Dict[str, str]:
         """Extract signed data from the request.
 
         :param data:
-        :param secret_key:
+        :param secret_key: Secret key or key ring.
         :param validate:
         :param fail_silently:
         :param value_dumper:
         :param quoter:
+        :param schema: Compiled signing schema (see ``ska.schemas``).
+        :param negative_cache: Cache of failed validations (see
+            ``ska.caches.NegativeCache``).
+        :param replay_store: Replay store (see ``ska.replay``).
         :return:
         """
         if validate:
@@ -254,6 +610,9 @@ class RequestHelper(object):
                 secret_key,
                 value_dumper=value_dumper,
                 quoter=quoter,
+                schema=schema,
+                negative_cache=negative_cache,
+                replay_store=replay_store,
             )
             if not validation_result.result:
                 if fail_silently:
@@ -0,0 +1,250 @@
+"""
+Reusable validators.
+
+A ``Validator`` freezes everything but the request data at construction
+(secret key or key ring, param names, signature class, value dumper,
+quoter, caches and replay store), so that validating a request is a single
+call with the request data. Meant to be made once (for instance, at
+decoration time) and reused for every request, instead of calling
+``ska.validate_signed_request_data`` (which makes a new ``RequestHelper``
+each time).
+
+Validators for other secret keys (or caches) are derived with ``derive``.
+Derived validators are kept (at most ``VALIDATOR_CACHE_SIZE`` per
+validator), so that setups with many providers (each with its own secret
+key) make one validator per provider.
+
+:example:
+
+>>> from ska.validators import Validator
+>>> validator = Validator('your-secret-key')
+>>> validation_result = validator.validate(request.GET)
+"""
+
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, Hashable, Optional, Tuple, Type, Union
+
+from .base import AbstractSignature, SignatureValidationResult
+from .caches import NegativeCache, ValidationCache
+from .defaults import (
+    DEFAULT_AUTH_USER_PARAM,
+    DEFAULT_EXTRA_PARAM,
+    DEFAULT_KEY_ID_PARAM,
+    DEFAULT_SIGNATURE_PARAM,
+    DEFAULT_VALID_UNTIL_PARAM,
+    VALIDATOR_CACHE_SIZE,
+)
+from .exceptions import ImproperlyConfigured, InvalidData
+from .helpers import extract_signed_data
+from .keyring import KeyRing
+from .replay import ReplayStore
+from .schemas import SigningSchema
+from .signatures import Signature
+from .utils import RequestHelper
+
+__author__ = "Artur Barseghyan <artur.barseghyan@gmail.com>"
+__copyright__ = "2013-2023 Artur Barseghyan"
+__license__ = "GPL-2.0-only OR LGPL-2.1-or-later"
+__all__ = ("Validator",)
+
+
+class Validator:
+    """Validator of signed request data.
+
+    :param secret_key: The shared secret key or a key ring (see
+        ``ska.keyring``). Might be omitted in validators only used to
+        derive others from.
+    :param signature_param: Name of the (for example GET or POST) param
+        name which holds the ``signature`` value.
+    :param auth_user_param: Name of the (for example GET or POST) param
+        name which holds the ``auth_user`` value.
+    :param valid_until_param: Name of the (for example GET or POST) param
+        name which holds the ``valid_until`` value.
+    :param extra_param: Name of the (for example GET or POST) param name
+        which holds the ``extra`` keys value.
+    :param key_id_param: Name of the (for example GET or POST) param name
+        which holds the ``key_id`` value.
+    :param signature_cls:
+    :param value_dumper:
+    :param quoter:
+    :param full_diagnostics: If set to True, all errors are reported
+        (expired signatures are checked for validity as well).
+    :param schema: Compiled signing schema (see ``ska.schemas``).
+    :param cache: Cache of successful validations (see
+        ``ska.caches.ValidationCache``).
+    :param negative_cache: Cache of failed validations (see
+        ``ska.caches.NegativeCache``).
+    :param replay_store: Replay store (see ``ska.replay``). Valid
+        signatures are accepted only once.
+    """
+
+    def __init__(
+        self,
+        secret_key: Optional[Union[str, KeyRing]] = None,
+        signature_param: str = DEFAULT_SIGNATURE_PARAM,
+        auth_user_param: str = DEFAULT_AUTH_USER_PARAM,
+        valid_until_param: str = DEFAULT_VALID_UNTIL_PARAM,
+        extra_param: str = DEFAULT_EXTRA_PARAM,
+        key_id_param: str = DEFAULT_KEY_ID_PARAM,
+        signature_cls: Type[AbstractSignature] = Signature,
+        value_dumper: Optional[Callable] = None,
+        quoter: Optional[Callable] = None,
+        full_diagnostics: bool = False,
+        schema: Optional[SigningSchema] = None,
+        cache: Optional[ValidationCache] = None,
+        negative_cache: Optional[NegativeCache] = None,
+        replay_store: Optional[ReplayStore] = None,
+    ) -> None:
+        """Constructor."""
+        self.secret_key = secret_key
+        self.signature_param = signature_param
+        self.auth_user_param = auth_user_param
+        self.valid_until_param = valid_until_param
+        self.extra_param = extra_param
+        self.key_id_param = key_id_param
+        self.signature_cls = signature_cls
+        self.value_dumper = value_dumper
+        self.quoter = quoter
+        self.full_diagnostics = full_diagnostics
+        self.schema = schema
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.replay_store = replay_store
+
+        # What is validated (all but the caches). Validators with equal keys
+        # give equal results for the same data. The replay store is part of
+        # it, as it rejects signatures already used.
+        self.key: Tuple[Hashable, ...] = (
+            secret_key,
+            signature_param,
+            auth_user_param,
+            valid_until_param,
+            extra_param,
+            key_id_param,
+            signature_cls,
+            value_dumper,
+            quoter,
+            full_diagnostics,
+            schema,
+            replay_store,
+        )
+
+        self.request_helper = RequestHelper(
+            signature_param=signature_param,
+            auth_user_param=auth_user_param,
+            valid_until_param=valid_until_param,
+            extra_param=extra_param,
+            signature_cls=signature_cls,
+            key_id_param=key_id_param,
+        )
+        self._validate = partial(
+            self.request_helper.validate_request_data,
+            secret_key=secret_key,
+            value_dumper=value_dumper,
+            quoter=quoter,
+            full_diagnostics=full_diagnostics,
+            schema=schema,
+            cache=cache,
+            negative_cache=negative_cache,
+            replay_store=replay_store,
+        )
+        # Sorted options -> derived validator
+        self._derived: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.signature_cls.__name__}>"
+
+    def validate(
+        self, data: Dict[str, Union[bytes, str, float, int]]
+    ) -> SignatureValidationResult:
+        """Validate the signed request data.
+
+        :param data: Dictionary holding the (HTTP) request (for example
+            GET or POST) data.
+        :return: A ``ska.SignatureValidationResult`` object.
+        """
+        return self._validate(data)
+
+    def extract_signed_data(
+        self, data: Dict[str, Union[bytes, str, float, int]]
+    ) -> Dict[str, Union[bytes, str, float, int]]:
+        """Extract the signed data (no validation).
+
+        :param data:
+        :return:
+        """
+        return extract_signed_data(
+            data=data, extra=data.get(self.extra_param, "").split(",")
+        )
+
+    def extract(
+        self, data: Dict[str, Union[bytes, str, float, int]]
+    ) -> Dict[str, Union[bytes, str, float, int]]:
+        """Validate the signed request data and extract the signed data.
+
+        :param data:
+        :return:
+        :raise ska.exceptions.ImproperlyConfigured: If no secret key is set.
+        :raise ska.exceptions.InvalidData: If the data is not valid.
+        """
+        if not self.secret_key:
+            raise ImproperlyConfigured(
+                "You should provide `secret_key` to validate the data."
+            )
+        validation_result = self._validate(data)
+        if not validation_result.result:
+            raise InvalidData(validation_result.message)
+        return self.extract_signed_data(data)
+
+    def derive(self, **options) -> "Validator":
+        """Get validator with the options given replaced.
+
+        Derived validators are kept, so deriving the same options again
+        returns the same validator.
+
+        :param options: Constructor arguments to replace.
+        :return:
+
+        :example:
+
+        >>> validator = Validator(negative_cache=NegativeCache())
+        >>> validator.derive(secret_key='your-secret-key').validate(data)
+        """
+        key = tuple(sorted(options.items()))
+        validator = self._derived.get(key)
+        if validator is not None:
+            return validator
+
+        with self._lock:
+            validator = self._derived.get(key)
+            if validator is None:
+                validator = self.__class__(**{**self.get_options(), **options})
+                self._derived[key] = validator
+                while len(self._derived) > VALIDATOR_CACHE_SIZE:
+                    self._derived.popitem(last=False)
+            return validator
+
+    def get_options(self) -> Dict[str, object]:
+        """Constructor arguments of the validator.
+
+        :return:
+        """
+        return {
+            "secret_key": self.secret_key,
+            "signature_param": self.signature_param,
+            "auth_user_param": self.auth_user_param,
+            "valid_until_param": self.valid_until_param,
+            "extra_param": self.extra_param,
+            "key_id_param": self.key_id_param,
+            "signature_cls": self.signature_cls,
+            "value_dumper": self.value_dumper,
+            "quoter": self.quoter,
+            "full_diagnostics": self.full_diagnostics,
+            "schema": self.schema,
+            "cache": self.cache,
+            "negative_cache": self.negative_cache,
+            "replay_store": self.replay_store,
+        }